@@ -0,0 +1,118 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from txtai.embeddings import Embeddings
+
+from src.config import settings
+from src.services.batch_tuner import sample_texts
+from src.services.config_service import config_service
+from src.services.thread_profiles import apply_threads, cpu_count
+
+
+def powers_of_two(limit):
+    """1, 2, 4, ... up to and including limit"""
+    values, value = [], 1
+    while value < limit:
+        values.append(value)
+        value *= 2
+    return values + [limit]
+
+
+def run(embeddings, queries, concurrency):
+    """Run queries from concurrent workers, returning queries/sec and sorted latencies"""
+
+    def search(query):
+        start = time.perf_counter()
+        embeddings.search(query, 10)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(search, queries))
+    return len(queries) / (time.perf_counter() - start), latencies
+
+
+def main():
+    cores = cpu_count()
+    parser = argparse.ArgumentParser(
+        description="Sweep torch/Faiss thread counts against request concurrency"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=powers_of_two(cores),
+        help="Intra-op/Faiss thread counts to try",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=powers_of_two(cores * 2),
+        help="Concurrent request levels to try",
+    )
+    parser.add_argument("--documents", type=int, default=2000, help="Documents to index")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per measurement")
+    args = parser.parse_args()
+
+    config_service.settings = settings
+    asyncio.run(config_service.initialize())
+
+    # torch's inter-op pool can only be sized once, keep it at one thread
+    apply_threads(inter_op=1)
+
+    # Dense index only: this measures model inference and ANN search, the parts
+    # that run on the torch and Faiss thread pools. The content database and
+    # keyword index aren't safe to query from several threads.
+    config = copy.deepcopy(config_service.embeddings_config)
+    for key in ("content", "contentpath", "database", "hybrid", "scoring"):
+        config.pop(key, None)
+
+    print(f"Indexing {args.documents} documents on {cores} cores...")
+    embeddings = Embeddings(config)
+    texts = sample_texts(args.documents, 48)
+    embeddings.index([(str(i), text, None) for i, text in enumerate(texts)])
+    queries = sample_texts(args.queries, 8)
+
+    results = []
+    print(f"\n{'threads':>8} {'concurrency':>12} {'qps':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for threads in args.threads:
+        apply_threads(intra_op=threads, faiss=threads)
+        run(embeddings, queries[:10], 1)
+        for concurrency in args.concurrency:
+            qps, latencies = run(embeddings, queries, concurrency)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000
+            results.append((threads, concurrency, qps, p50, p95))
+            print(f"{threads:>8} {concurrency:>12} {qps:>10.1f} {p50:>10.1f} {p95:>10.1f}")
+
+    print("\nBest thread count per concurrency level:")
+    for concurrency in args.concurrency:
+        best = max((r for r in results if r[1] == concurrency), key=lambda r: r[2])
+        print(
+            f"  concurrency {concurrency}: {best[0]} threads "
+            f"({best[2]:.1f} qps, p95 {best[4]:.1f} ms)"
+        )
+
+    threads, concurrency, qps, _, p95 = max(results, key=lambda r: r[2])
+    print(
+        f"\nHighest throughput: {threads} threads at concurrency {concurrency} "
+        f"({qps:.1f} qps, p95 {p95:.1f} ms)"
+    )
+    print("Suggested settings:")
+    print(f"  EMBEDDINGS_INTRA_OP_THREADS={threads}")
+    print("  EMBEDDINGS_INTER_OP_THREADS=1")
+    print(f"  EMBEDDINGS_FAISS_THREADS={threads}")
+    embeddings.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from pydantic_settings import BaseSettings
 
 
@@ -10,7 +10,35 @@ class Settings(BaseSettings):
     EMBEDDINGS_CONTENT_PATH: str
     EMBEDDINGS_PREFIX: str = "txtai"
     EMBEDDINGS_BATCH_SIZE: int = 32
+    EMBEDDINGS_AUTOTUNE_BATCH: bool = False
+    EMBEDDINGS_AUTOTUNE_CANDIDATES: List[int] = [8, 16, 32, 64, 128, 256]
+    EMBEDDINGS_AUTOTUNE_SAMPLES: int = 512
+    EMBEDDINGS_AUTOTUNE_MAX_MEMORY_MB: Optional[int] = None
     EMBEDDINGS_MODEL: str = "sentence-transformers/nli-mpnet-base-v2"
+    EMBEDDINGS_CHUNK_MODE: Literal["none", "tokens", "sentences"] = "none"
+    EMBEDDINGS_CHUNK_SIZE: int = 256
+    EMBEDDINGS_CHUNK_OVERLAP: int = 32
+    EMBEDDINGS_COLLAPSE_OVERFETCH: int = 4
+    EMBEDDINGS_METADATA_FIELDS: Dict[str, Literal["str", "int", "float", "bool"]] = {}
+    EMBEDDINGS_FILTER_CANDIDATES: int = 10
+    EMBEDDINGS_ROUTER_ENABLED: bool = False
+    EMBEDDINGS_ROUTER_SPARSE_MAX_TOKENS: int = 2
+    EMBEDDINGS_ROUTER_DENSE_MIN_TOKENS: int = 12
+    EMBEDDINGS_ROUTER_RULES: List[Dict[str, str]] = []
+    EMBEDDINGS_EXPORT_BATCH_SIZE: int = 1000
+    EMBEDDINGS_DELETE_BATCH_SIZE: int = 1000
+    EMBEDDINGS_SHARDS: int = 1
+    EMBEDDINGS_COMPACT_RATIO: float = 0.3
+    EMBEDDINGS_COMPACT_MIN_DELETED: int = 1000
+    EMBEDDINGS_COMPACT_INTERVAL: float = 0.0
+    EMBEDDINGS_THREAD_PROFILE: Literal["default", "latency", "throughput"] = "default"
+    EMBEDDINGS_INTRA_OP_THREADS: Optional[int] = None
+    EMBEDDINGS_INTER_OP_THREADS: Optional[int] = None
+    EMBEDDINGS_FAISS_THREADS: Optional[int] = None
+    EMBEDDINGS_ENCODER_PROCESSES: int = 0
+    EMBEDDINGS_ENCODER_MIN_CHUNK: int = 32
+    EMBEDDINGS_VECTOR_CACHE_PATH: Optional[str] = None
+    EMBEDDINGS_VECTOR_CACHE_MAX_ENTRIES: int = 1_000_000
 
     # API settings
     API_KEY: str
@@ -25,6 +53,15 @@ class Settings(BaseSettings):
         "anthropic": "claude-3-sonnet-20240229",
         "openai": "gpt-4-turbo-preview",
     }
+    LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40000},
+        "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+    }
+    LLM_RATE_LIMIT_HEADROOM: float = 0.9
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    LLM_RETRY_MAX_DELAY: float = 30.0
+    LLM_COALESCE_REQUESTS: bool = True
 
     # Cloud settings
     GOOGLE_CLOUD_PROJECT: Optional[str] = None
@@ -33,6 +70,48 @@ class Settings(BaseSettings):
     # System prompts
     SYSTEM_PROMPTS: Dict[str, str]
 
+    # RAG settings
+    RAG_CONTEXT_MAX_TOKENS: int = 2000
+    RAG_DEDUP_THRESHOLD: float = 0.8
+    RAG_MIN_PASSAGE_TOKENS: int = 32
+    RAG_RERANK_MODEL: Optional[str] = None
+    RAG_RERANK_CANDIDATES: int = 20
+    RAG_RERANK_BUDGET_MS: float = 200.0
+    RAG_RERANK_WORKERS: int = 2
+
+    # Stream settings
+    STREAM_QUEUE_MAXSIZE: int = 100
+    STREAM_OVERFLOW_POLICY: Literal["block", "drop_oldest", "error"] = "block"
+    STREAM_IDLE_TTL: float = 300.0
+    STREAM_SWEEP_INTERVAL: float = 30.0
+    STREAM_HEARTBEAT_INTERVAL: float = 15.0
+
+    # Encoder settings
+    ENCODE_MAX_BATCH_SIZE: int = 256
+    ENCODE_MAX_WAIT_MS: float = 5.0
+    ENCODE_MAX_TEXTS: int = 1024
+
+    # Health settings
+    HEALTH_WARMUP_QUERIES: int = 16
+    HEALTH_PROBE_INTERVAL: float = 10.0
+    HEALTH_PROBE_WINDOW: int = 60
+    HEALTH_MAX_P95_MS: Optional[float] = None
+
+    # Scheduler settings
+    SCHEDULER_MAX_WORKERS: int = 8
+
+    # Snapshot settings
+    SNAPSHOT_BACKEND: Literal["local", "gcs"] = "local"
+    SNAPSHOT_PATH: str = "data/snapshots"
+    SNAPSHOT_WORKDIR: str = "data/index"
+    SNAPSHOT_CHUNK_SIZE: int = 4 * 1024 * 1024
+    SNAPSHOT_MAX_WORKERS: int = 8
+
+    # Namespace settings
+    NAMESPACES_PATH: str = "data/namespaces"
+    NAMESPACES_MAX_LOADED: int = 8
+    NAMESPACES_MEMORY_BUDGET_MB: int = 1024
+
     # Redis settings (optional)
     redis_host: Optional[str] = None
     redis_port: Optional[str] = None
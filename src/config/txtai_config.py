@@ -29,6 +29,7 @@ def create_embeddings_config(settings: Settings) -> Dict[str, Any]:
             "weights": {"hybrid": 0.7, "terms": 0.3},
         },
         "batch": settings.EMBEDDINGS_BATCH_SIZE,
+        "encodebatch": settings.EMBEDDINGS_BATCH_SIZE,
         "contentpath": settings.EMBEDDINGS_CONTENT_PATH,
         "database": True,
         "storetokens": True,
@@ -1,8 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from src.routes import embeddings, llm, rag, test
+from src.middleware.serialization import ContentNegotiationMiddleware, FastResponse
+from src.routes import embeddings, llm, namespaces, rag, stream, test
 import logging
-from src.services import registry, stream_service
+from src.services import (
+    registry,
+    stream_service,
+    namespace_service,
+    embeddings_service,
+    encoder_service,
+    health_service,
+    scheduler_service,
+)
+from src.services.encoder_pool import shutdown_encoder_pool
+from src.services.stream_service import StreamFullError
 import asyncio
 
 # Configure logging
@@ -14,6 +25,7 @@ app = FastAPI(
     title="txtai Service",
     description="API for semantic search and document embeddings using txtai",
     version="1.0.0",
+    default_response_class=FastResponse,
 )
 
 # Add CORS middleware
@@ -25,13 +37,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Serve msgpack to clients that ask for it
+app.add_middleware(ContentNegotiationMiddleware)
+
 # Include routers
 app.include_router(embeddings.router)
+app.include_router(namespaces.router)
 app.include_router(llm.router)
 app.include_router(rag.router)
+app.include_router(stream.router)
 app.include_router(test.router)
 
 
+@app.exception_handler(StreamFullError)
+async def stream_full_handler(request: Request, exc: StreamFullError):
+    """Tell clients to back off when a session stream is full"""
+    return FastResponse({"detail": str(exc)}, status_code=429)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
@@ -41,13 +64,40 @@ async def startup_event():
         logger.info("Services initialized")
 
         # Start stream service
-        asyncio.create_task(stream_service.start_listening())
+        stream_service.start_sweeper()
         logger.info("Stream service started")
+
+        # Start scheduled index compaction
+        embeddings_service.start_maintenance()
+
+        # Pick the encode batch size for this model and CPU
+        if embeddings_service.settings.EMBEDDINGS_AUTOTUNE_BATCH:
+            if embeddings_service.encoder_pool:
+                logger.warning("Skipping batch size tuning, not supported with encoder processes")
+            else:
+                await embeddings_service.autotune_batch_size()
+
+        # Warm the model and index up before reporting ready, then keep
+        # measuring search latency for the health check
+        await health_service.warmup()
+        health_service.start_probe()
     except Exception as e:
         logger.error(f"Failed to start services: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and persist namespace indexes on shutdown"""
+    await health_service.stop_probe()
+    await scheduler_service.shutdown()
+    await embeddings_service.stop_maintenance()
+    await encoder_service.shutdown()
+    shutdown_encoder_pool()
+    await namespace_service.shutdown()
+    logger.info("Namespaces saved")
+
+
 # Only used when running directly (not through uvicorn command)
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from fastapi import HTTPException, Security
+from fastapi import HTTPException, Security, WebSocket
 from fastapi.security import APIKeyHeader
 from ..services.config_service import config_service
 
@@ -55,3 +55,24 @@ async def get_api_key(api_key: str = Security(api_key_header)) -> str:
         return token
     except IndexError:
         raise HTTPException(status_code=403, detail="Invalid authorization header format")
+
+
+def verify_websocket_token(websocket: WebSocket) -> bool:
+    """Verify the API token for a WebSocket connection
+
+    Browsers cannot set headers on WebSocket handshakes, so the token may be
+    passed either as a "Bearer <token>" Authorization header or as a
+    ``token`` query parameter.
+
+    Args:
+        websocket: Incoming WebSocket connection
+
+    Returns:
+        True if valid, False otherwise
+    """
+    header = websocket.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        token = header[len("Bearer ") :]
+    else:
+        token = websocket.query_params.get("token")
+    return token == config_service.settings.API_KEY
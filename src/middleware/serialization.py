@@ -0,0 +1,138 @@
+from contextvars import ContextVar
+from typing import Any, Optional, Sequence
+
+import msgpack
+import numpy as np
+import orjson
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Media types a client can ask for msgpack responses with
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Accept header of the request being handled
+_accept: ContextVar[str] = ContextVar("accept", default="")
+
+
+class ContentNegotiationMiddleware:
+    """Record each request's Accept header for FastResponse"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept":
+                accept = value.decode("latin-1")
+                break
+
+        token = _accept.set(accept)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _accept.reset(token)
+
+
+def _quality(parameters: str) -> float:
+    """q-value of a media range's parameters, 1.0 if missing or invalid"""
+    for parameter in parameters.split(";"):
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return min(max(float(value), 0.0), 1.0)
+            except ValueError:
+                return 1.0
+    return 1.0
+
+
+def media_quality(accept: str, media: str, explicit: bool = False) -> float:
+    """q-value an Accept header gives a media type, 0.0 if it isn't accepted
+
+    The most specific matching range decides: type/subtype, then type/*, then
+    */*. With ``explicit``, only a range naming the media type itself counts.
+    """
+    best, quality = 0, 0.0
+    for media_range in accept.split(","):
+        name, _, parameters = media_range.partition(";")
+        name = name.strip().lower()
+        if name == media:
+            specificity = 3
+        elif explicit:
+            continue
+        elif name == media.split("/")[0] + "/*":
+            specificity = 2
+        elif name == "*/*":
+            specificity = 1
+        else:
+            continue
+
+        if specificity > best:
+            best, quality = specificity, _quality(parameters)
+        elif specificity == best:
+            quality = max(quality, _quality(parameters))
+    return quality
+
+
+def preferred_type(
+    accept: str, media_types: Sequence[str], over: Sequence[str] = ("application/json",)
+) -> Optional[str]:
+    """The one of ``media_types`` an Accept header prefers over the ``over`` types, if any
+
+    A media type is only chosen when named explicitly with a non-zero q-value
+    at least as high as every ``over`` type's, which wildcards do count for.
+    Ties between ``media_types`` go to the first listed.
+    """
+    qualities = [media_quality(accept, media, explicit=True) for media in media_types]
+    quality = max(qualities)
+    if quality > 0 and quality >= max(media_quality(accept, media) for media in over):
+        return media_types[qualities.index(quality)]
+    return None
+
+
+def wants_msgpack(accept: str) -> bool:
+    """True if an Accept header prefers msgpack over JSON
+
+    msgpack is only used when named explicitly with a non-zero q-value at least
+    as high as JSON's. JSON's q-value comes from the most specific of
+    application/json, application/* and */* in the header.
+    """
+    return preferred_type(accept, MSGPACK_TYPES) is not None
+
+
+def _default(value: Any) -> Any:
+    """Convert types neither serializer handles natively"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+class FastResponse(Response):
+    """Response serialized with orjson, or msgpack when the client accepts it
+
+    Returning one from a route directly also skips FastAPI's jsonable_encoder
+    pass, which dominates serialization time for large result lists.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # The encoding depends on the Accept header, so caches must key on it
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if wants_msgpack(_accept.get()):
+            self.media_type = "application/msgpack"
+            return msgpack.packb(content, default=_default)
+        return orjson.dumps(
+            content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
@@ -13,6 +13,7 @@ class MessageType(str, Enum):
     LLM_RESPONSE = "llm_response"
     EMBEDDINGS_REQUEST = "embeddings_request"
     EMBEDDINGS_RESPONSE = "embeddings_response"
+    HEARTBEAT = "heartbeat"
     ERROR = "error"
 
 
@@ -1,20 +1,51 @@
+import io
 import os
-from fastapi import APIRouter, HTTPException, Security
-from typing import Dict, List, Optional
-from pydantic import BaseModel
+import json
+import numpy as np
+from fastapi import (
+    APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, Security, UploadFile
+)
+from fastapi.responses import Response, StreamingResponse
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, ValidationError
 import logging
 
-from src.services.embeddings_service import embeddings_service
+from src.services.embeddings_service import EmbeddingsService, embeddings_service
+from src.services.encoder_service import encoder_service
+from src.services.namespace_service import NAMESPACE_PATTERN, namespace_service
+from src.services.snapshot_service import snapshot_service
 from src.middleware.auth import get_api_key
+from src.middleware.serialization import MSGPACK_TYPES, FastResponse, preferred_type
 
 logger = logging.getLogger(__name__)
 
+# Binary media types the encode route can return vectors in
+VECTOR_TYPES = ("application/x-npy", "application/octet-stream")
+
 router = APIRouter(
     prefix="/api/embeddings",
     tags=["embeddings"]
 )
 
+def get_namespace(request: Request, x_namespace: Optional[str] = Header(None)) -> Optional[str]:
+    """Namespace in the request path or X-Namespace header, None for the default index"""
+    return request.path_params.get("namespace") or x_namespace
+
+async def get_embeddings(namespace: Optional[str] = Depends(get_namespace)):
+    """Resolve the index for the namespace in the request path or X-Namespace header
+
+    Requests without a namespace use the default index.
+    """
+    if not namespace:
+        yield embeddings_service
+        return
+    if not NAMESPACE_PATTERN.match(namespace):
+        raise HTTPException(status_code=400, detail=f"Invalid namespace: {namespace}")
+    async with namespace_service.lease(namespace) as service:
+        yield service
+
 class Document(BaseModel):
+    id: Optional[str] = None
     text: str
     metadata: Optional[Dict] = {}
 
@@ -24,31 +55,295 @@ class Documents(BaseModel):
 class SearchQuery(BaseModel):
     query: str
     limit: Optional[int] = 10
+    collapse: Optional[bool] = False
+    filters: Optional[Dict[str, Any]] = None
+    cursor: Optional[str] = None
+    path: Optional[Literal["sparse", "dense", "hybrid"]] = None
+    raw_metadata: Optional[bool] = False
+
+class EncodeRequest(BaseModel):
+    texts: List[str]
+    category: Optional[Literal["query", "data"]] = None
+
+class AutotuneRequest(BaseModel):
+    texts: Optional[List[str]] = None
+
+class DeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    filters: Optional[Dict[str, Any]] = None
 
 @router.post("/add")
 async def add_documents(
     documents: Documents,
-    api_key: str = Security(get_api_key)
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
 ):
     """Add documents to the embeddings index"""
     try:
         # Convert to list of dicts format
-        docs = [{"text": doc.text, "metadata": doc.metadata} for doc in documents.documents]
-        count = embeddings_service.add(docs)
+        docs = [doc.model_dump(exclude_none=True) for doc in documents.documents]
+        count = await service.add(docs)
         return {"count": count}
     except Exception as e:
         logger.error(f"Failed to add documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/upsert")
+async def upsert_documents(
+    documents: Documents,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Insert or update documents, skipping re-encoding of unchanged documents"""
+    try:
+        docs = [doc.model_dump(exclude_none=True) for doc in documents.documents]
+        counts = await service.upsert(docs)
+        return counts
+    except Exception as e:
+        logger.error(f"Failed to upsert documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/vectors/upsert")
+async def upsert_vectors(
+    documents: str = Form(...),
+    vectors: UploadFile = File(...),
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Insert or update documents with precomputed vectors, skipping the model
+
+    ``documents`` is a JSON object like the /upsert body and ``vectors`` a
+    NumPy .npy file or raw little-endian float32 values, one row per document.
+    """
+    try:
+        docs = Documents.model_validate_json(documents)
+        array = service.decode_vectors(await vectors.read())
+        return await service.upsert_vectors(
+            [doc.model_dump(exclude_none=True) for doc in docs.documents], array
+        )
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to upsert vectors: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/vectors/search")
+async def search_vector(
+    request: Request,
+    limit: int = 10,
+    raw_metadata: bool = False,
+    filters: Optional[str] = None,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Search with a precomputed query vector sent as the request body
+
+    The body is a NumPy .npy file or raw little-endian float32 values.
+    ``filters`` is a JSON metadata filter, as in /search.
+    """
+    try:
+        vector = service.decode_vectors(await request.body())
+        results = await service.search_vector(
+            vector, limit, json.loads(filters) if filters else None, not raw_metadata
+        )
+        return FastResponse({"results": results})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Vector search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/encode")
+async def encode(
+    request: EncodeRequest,
+    accept: Optional[str] = Header(None),
+    api_key: str = Security(get_api_key)
+):
+    """Encode texts with the index model, batched with other concurrent callers
+
+    Returns JSON (or msgpack) by default. Send ``Accept: application/x-npy`` for
+    a NumPy .npy file or ``Accept: application/octet-stream`` for raw
+    little-endian float32 values, with the row width in ``X-Dimensions``.
+    A binary type is used when its q-value is at least that of JSON and msgpack.
+    """
+    try:
+        vectors = await encoder_service.encode(request.texts, request.category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Encoding failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {"X-Dimensions": str(vectors.shape[1])}
+    media_type = preferred_type(
+        accept or "", VECTOR_TYPES, over=("application/json", *MSGPACK_TYPES)
+    )
+    if media_type == "application/x-npy":
+        buffer = io.BytesIO()
+        np.save(buffer, vectors.astype("<f4"))
+        return Response(buffer.getvalue(), media_type=media_type, headers=headers)
+    if media_type == "application/octet-stream":
+        return Response(vectors.astype("<f4").tobytes(), media_type=media_type, headers=headers)
+    return FastResponse({"vectors": vectors, "dimensions": vectors.shape[1]}, headers=headers)
+
 @router.post("/hybrid-search")
 async def hybrid_search(
     query: SearchQuery,
-    api_key: str = Security(get_api_key)
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
 ):
     """Perform hybrid search on the embeddings index"""
     try:
-        results = embeddings_service.hybrid_search(query.query, query.limit)
-        return {"results": results}
+        results = await service.hybrid_search(
+            query.query, query.limit, query.collapse, query.filters
+        )
+        return FastResponse({"results": results})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/search")
+async def search(
+    query: SearchQuery,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Search the embeddings index, optionally filtered on declared metadata fields
+
+    Returns a page of results and a cursor to pass back for the next page. With
+    raw_metadata, each result's metadata is the stored JSON string, passed through
+    without being parsed and re-serialized.
+    """
+    try:
+        page = await service.search_page(
+            query.query,
+            query.limit,
+            query.cursor,
+            query.collapse,
+            query.filters,
+            query.path,
+            not query.raw_metadata,
+        )
+        return FastResponse(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Search failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/delete")
+async def delete_documents(
+    request: DeleteRequest,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Delete documents by id list or by metadata filter, in batches"""
+    if (request.ids is None) == (request.filters is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of ids or filters")
+    try:
+        if request.ids is not None:
+            return await service.delete(request.ids)
+        return await service.delete_where(request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Delete failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/compact")
+async def compact_index(
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Rebuild the index without deleted rows and swap it in"""
+    try:
+        return await service.compact()
+    except Exception as e:
+        logger.error(f"Compaction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/autotune")
+async def autotune_batch_size(
+    request: AutotuneRequest,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Measure encode throughput across batch sizes and use the fastest"""
+    try:
+        return await service.autotune_batch_size(request.texts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch size tuning failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/snapshot")
+async def create_snapshot(
+    name: str = "default",
+    namespace: Optional[str] = Depends(get_namespace),
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Upload the chunks of the index that changed since the last snapshot"""
+    try:
+        return await snapshot_service.snapshot(service, name, namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Snapshot failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/restore")
+async def restore_snapshot(
+    name: str = "default",
+    namespace: Optional[str] = Depends(get_namespace),
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Download the chunks missing locally for a snapshot and load it"""
+    try:
+        return await snapshot_service.restore(service, name, namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Restore failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/documents")
+async def list_documents(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """List indexed documents in id order, one page at a time"""
+    try:
+        return await service.list_documents(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to list documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/metrics")
+async def embeddings_metrics(
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Get query path latency, batch size tuning, cache and encoder pool metrics"""
+    return service.get_metrics()
+
+@router.get("/export")
+async def export_documents(
+    vectors: bool = False,
+    api_key: str = Security(get_api_key),
+    service: EmbeddingsService = Depends(get_embeddings)
+):
+    """Stream the whole index as newline-delimited JSON"""
+    async def lines():
+        async for doc in service.export(vectors):
+            yield json.dumps(doc) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
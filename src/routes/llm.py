@@ -3,7 +3,7 @@ from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 
 from ..middleware.auth import verify_token
-from ..services.llm_service import llm_service
+from ..services.llm_service import LLMRateLimitError, llm_service
 
 router = APIRouter(
     prefix="/api/llm",
@@ -24,8 +24,10 @@ class ContextRequest(BaseModel):
 async def generate(request: GenerateRequest):
     """Generate text from a prompt"""
     try:
-        response = llm_service.generate(request.prompt)
+        response = await llm_service.generate(request.prompt)
         return {"response": response}
+    except LLMRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -33,10 +35,17 @@ async def generate(request: GenerateRequest):
 async def generate_with_context(request: ContextRequest):
     """Generate text using RAG-style context"""
     try:
-        response = llm_service.generate_with_context(
+        response = await llm_service.generate_with_context(
             question=request.question,
             context=request.context
         )
         return {"response": response}
+    except LLMRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.get("/metrics")
+async def llm_metrics():
+    """Get provider call, coalescing and rate limiter metrics"""
+    return llm_service.get_metrics()
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Security
+import logging
+
+from src.routes import embeddings
+from src.services.namespace_service import namespace_service
+from src.middleware.auth import get_api_key
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/namespaces", tags=["namespaces"])
+
+
+@router.get("/metrics")
+async def namespace_metrics(api_key: str = Security(get_api_key)):
+    """Get loaded namespaces, load latency and eviction counts"""
+    return namespace_service.get_metrics()
+
+
+# Serve every embeddings route under /api/namespaces/{namespace}/embeddings
+for route in embeddings.router.routes:
+    router.add_api_route(
+        "/{namespace}/embeddings" + route.path[len(embeddings.router.prefix) :],
+        route.endpoint,
+        methods=list(route.methods),
+        tags=["embeddings"],
+    )
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Security
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 import logging
 
+from src.services.llm_service import LLMRateLimitError
 from src.services.rag_service import rag_service
 from src.middleware.auth import get_api_key
 
@@ -16,12 +17,38 @@ class RAGQuery(BaseModel):
     limit: Optional[int] = 3
 
 
+class RAGBatchQuery(BaseModel):
+    questions: List[str]
+    limit: Optional[int] = 3
+
+
 @router.post("/generate")
 async def generate_response(query: RAGQuery, api_key: str = Security(get_api_key)):
     """Generate response using RAG pipeline"""
     try:
-        response = rag_service.generate(query.question, query.limit)
+        response = await rag_service.generate(query.question, query.limit)
         return response
+    except LLMRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"RAG generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/generate-batch")
+async def generate_batch(query: RAGBatchQuery, api_key: str = Security(get_api_key)):
+    """Generate responses for many questions, queued behind interactive requests"""
+    try:
+        responses = await rag_service.generate_batch(query.questions, query.limit)
+        return {"responses": responses}
+    except LLMRateLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        logger.error(f"RAG batch generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/metrics")
+async def rag_metrics(api_key: str = Security(get_api_key)):
+    """Get rerank metrics"""
+    return rag_service.get_metrics()
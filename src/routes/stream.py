@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+from fastapi import APIRouter, Security, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncGenerator, Optional
+from uuid import uuid4
+from pydantic import ValidationError
+import logging
+
+from src.models.messages import Message, MessageType
+from src.services.scheduler_service import scheduler_service
+from src.services.stream_service import stream_service
+from src.services.config_service import config_service
+from src.middleware.auth import get_api_key, verify_websocket_token
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/stream", tags=["stream"])
+
+
+async def with_heartbeats(
+    messages: AsyncGenerator[Message, None], session_id: str, interval: float
+) -> AsyncGenerator[Message, None]:
+    """Yield messages as they arrive, inserting a heartbeat whenever the source is idle
+
+    The pending ``__anext__`` is kept as a task so a heartbeat never cancels
+    the underlying generator mid-step.
+    """
+    pending = asyncio.ensure_future(messages.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield Message(type=MessageType.HEARTBEAT, data={}, session_id=session_id)
+                continue
+            try:
+                message = pending.result()
+            except StopAsyncIteration:
+                return
+            yield message
+            pending = asyncio.ensure_future(messages.__anext__())
+    finally:
+        if not pending.done():
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        await messages.aclose()
+
+
+def to_sse(message: Message) -> str:
+    """Encode a message as a Server-Sent Event frame"""
+    if message.type == MessageType.HEARTBEAT:
+        return ": heartbeat\n\n"
+    return f"event: {message.type.value}\ndata: {message.model_dump_json()}\n\n"
+
+
+@router.get("/sse")
+async def stream_sse(
+    query: str,
+    session_id: Optional[str] = None,
+    api_key: str = Security(get_api_key),
+):
+    """Stream RAG messages for a query as Server-Sent Events"""
+    session_id = session_id or str(uuid4())
+    message = Message(type=MessageType.RAG_REQUEST, data={"query": query}, session_id=session_id)
+    interval = config_service.settings.STREAM_HEARTBEAT_INTERVAL
+
+    async def events() -> AsyncGenerator[str, None]:
+        # Close the stream as soon as the client goes away, which cancels the handler
+        async with contextlib.aclosing(
+            with_heartbeats(scheduler_service.dispatch(message), session_id, interval)
+        ) as responses:
+            async for response in responses:
+                yield to_sse(response)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket):
+    """Stream RAG messages over a WebSocket
+
+    Each client frame is a JSON ``Message``; every message yielded while
+    handling it is pushed back as a JSON text frame.
+    """
+    if not verify_websocket_token(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    interval = config_service.settings.STREAM_HEARTBEAT_INTERVAL
+    try:
+        while True:
+            payload = await websocket.receive_text()
+            try:
+                message = Message.model_validate_json(payload)
+            except ValidationError as e:
+                error = Message(type=MessageType.ERROR, data={"error": str(e)}, session_id="")
+                await websocket.send_text(error.model_dump_json())
+                continue
+
+            async with contextlib.aclosing(
+                with_heartbeats(scheduler_service.dispatch(message), message.session_id, interval)
+            ) as responses:
+                async for response in responses:
+                    await websocket.send_text(response.model_dump_json())
+    except WebSocketDisconnect:
+        logger.info("WebSocket client disconnected")
+
+
+@router.get("/metrics")
+async def stream_metrics(api_key: str = Security(get_api_key)):
+    """Get stream session gauges, scheduler queue wait and worker utilization"""
+    return {"streams": stream_service.get_metrics(), "scheduler": scheduler_service.get_metrics()}
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException
+from src.middleware.serialization import FastResponse
 from src.services.communication_service import communication_service
+from src.services.health_service import health_service
 
 router = APIRouter()
 
@@ -16,9 +18,20 @@ async def test_redis():
 
 @router.get("/health")
 async def health_check():
-    """Health check with Redis status"""
+    """Readiness check: warmup state and recent synthetic query latency
+
+    Returns 503 until warmup has finished and while search is degraded, so
+    load balancers only route to warm pods that are answering quickly.
+    """
     try:
-        redis_status = "connected" if communication_service.redis_client.ping() else "error"
-        return {"status": "healthy", "redis": redis_status}
+        status = health_service.get_status()
+        code = 200 if status["status"] == "healthy" else 503
+        return FastResponse(status, status_code=code)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/health/live")
+async def liveness_check():
+    """Liveness check: the process is up and serving requests"""
+    return {"status": "alive"}
@@ -5,10 +5,15 @@ from typing import Optional
 from .base_service import BaseService
 from .config_service import config_service
 from .embeddings_service import embeddings_service
+from .encoder_service import encoder_service
+from .health_service import health_service
+from .namespace_service import namespace_service
 from .llm_service import llm_service
 from .rag_service import rag_service
 from .stream_service import stream_service
 from .communication_service import communication_service
+from .scheduler_service import scheduler_service
+from .snapshot_service import snapshot_service
 from .txtai_service import txtai_service
 
 logger = logging.getLogger(__name__)
@@ -20,12 +25,38 @@ class ServiceRegistry:
     def __init__(self):
         self.config_service = config_service
         self.embeddings_service = embeddings_service
+        self.encoder_service = encoder_service
+        self.health_service = health_service
+        self.namespace_service = namespace_service
         self.llm_service = llm_service
         self.rag_service = rag_service
         self.stream_service = stream_service
         self.communication_service = communication_service
+        self.scheduler_service = scheduler_service
+        self.snapshot_service = snapshot_service
         self.txtai_service = txtai_service
 
+    async def initialize(self) -> None:
+        """Initialize all services in dependency order"""
+        if self.config_service.settings is None:
+            from src.config import settings
+
+            self.config_service.settings = settings
+
+        await self.config_service.initialize()
+        await self.embeddings_service.initialize()
+        await self.encoder_service.initialize()
+        await self.health_service.initialize()
+        await self.namespace_service.initialize()
+        await self.snapshot_service.initialize()
+        await self.llm_service.initialize()
+        await self.rag_service.initialize()
+        await self.stream_service.initialize()
+        await self.communication_service.initialize()
+        await self.scheduler_service.initialize()
+        await self.txtai_service.initialize()
+        logger.info("All services initialized")
+
 
 # Global registry instance
 registry = ServiceRegistry()
@@ -34,10 +65,15 @@ __all__ = [
     "BaseService",
     "config_service",
     "embeddings_service",
+    "encoder_service",
+    "health_service",
+    "namespace_service",
     "llm_service",
     "rag_service",
     "stream_service",
     "communication_service",
+    "scheduler_service",
+    "snapshot_service",
     "txtai_service",
     "registry",
 ]
@@ -0,0 +1,125 @@
+import logging
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Words used to build synthetic passages when no sample texts are given
+SAMPLE_WORDS = (
+    "search index vector model document passage query semantic retrieval text "
+    "language embedding similarity ranking context answer data network system"
+).split()
+
+
+def sample_texts(count: int, words: int) -> List[str]:
+    """Synthetic passages of roughly ``words`` words each"""
+    texts = []
+    for i in range(count):
+        texts.append(" ".join(SAMPLE_WORDS[(i + j * 7) % len(SAMPLE_WORDS)] for j in range(words)))
+    return texts
+
+
+def _status_mb(field: str) -> Optional[float]:
+    """A memory field of /proc/self/status in MB, None where procfs isn't available"""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process in MB, since the last reset_peak_memory"""
+    peak = _status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_memory() -> bool:
+    """Reset the peak to current resident memory, returning False where that isn't supported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as handle:
+            handle.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def memory_mb() -> float:
+    """Current resident memory of this process in MB, the peak where it can't be read"""
+    current = _status_mb("VmRSS")
+    return current if current is not None else peak_memory_mb()
+
+
+def tune_batch_size(
+    encode: Callable[[List[str], int], Any],
+    texts: List[str],
+    candidates: List[int],
+    max_memory_mb: Optional[float] = None,
+    patience: int = 2,
+) -> Dict[str, Any]:
+    """Measure encode throughput for each candidate batch size and pick the fastest
+
+    Candidates are tried smallest first. A candidate whose encode grows
+    resident memory by more than ``max_memory_mb`` at its peak is rejected and
+    ends the search, as is a run of ``patience`` candidates slower than the
+    best so far. Where the peak can't be reset (outside Linux), growth is
+    measured against the lifetime peak, which can only underestimate it.
+
+    Args:
+        encode: Function encoding a list of texts with the given batch size
+        texts: Sample texts to encode
+        candidates: Batch sizes to try
+        max_memory_mb: Optional limit on the memory one candidate's encode adds
+        patience: Number of slower candidates tolerated before stopping
+
+    Returns:
+        Chosen batch size, its docs/sec and the measurement for every candidate tried
+    """
+    results, best, slower = [], None, 0
+    for size in sorted(set(candidates)):
+        baseline = memory_mb() if reset_peak_memory() else peak_memory_mb()
+
+        # Warm up so one-off allocations aren't timed
+        encode(texts[:size], size)
+
+        start = time.perf_counter()
+        encode(texts, size)
+        elapsed = time.perf_counter() - start
+
+        measurement = {
+            "batch_size": size,
+            "docs_per_sec": len(texts) / elapsed if elapsed > 0 else float("inf"),
+            "peak_memory_mb": peak_memory_mb(),
+        }
+        measurement["memory_mb"] = max(0.0, measurement["peak_memory_mb"] - baseline)
+        results.append(measurement)
+        logger.info(f"Batch size {size}: {measurement['docs_per_sec']:.1f} docs/sec")
+
+        if max_memory_mb and measurement["memory_mb"] > max_memory_mb:
+            logger.info(f"Batch size {size} exceeds memory limit of {max_memory_mb} MB")
+            break
+
+        if best is None or measurement["docs_per_sec"] > best["docs_per_sec"]:
+            best, slower = measurement, 0
+        else:
+            slower += 1
+            if slower >= patience:
+                break
+
+    if best is None:
+        raise ValueError("No batch size candidate fits within the memory limit")
+
+    return {
+        "batch_size": best["batch_size"],
+        "docs_per_sec": best["docs_per_sec"],
+        "candidates": results,
+    }
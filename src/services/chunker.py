@@ -0,0 +1,50 @@
+import re
+from typing import List
+
+# Split after sentence-ending punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences"""
+    return [s for s in SENTENCE_BOUNDARY.split(text.strip()) if s]
+
+
+def _windows(units: List[str], size: int, overlap: int) -> List[List[str]]:
+    """Slide a window of size units over the list, stepping by size - overlap"""
+    if len(units) <= size:
+        return [units]
+    step = max(1, size - overlap)
+    windows = []
+    for start in range(0, len(units), step):
+        windows.append(units[start : start + size])
+        if start + size >= len(units):
+            break
+    return windows
+
+
+def chunk_text(text: str, mode: str, size: int, overlap: int) -> List[str]:
+    """Split text into overlapping passages
+
+    Args:
+        text: Text to split
+        mode: "tokens" to window over whitespace tokens, "sentences" to window over
+            sentences, or "none" to keep the text whole
+        size: Passage size in tokens or sentences
+        overlap: Number of tokens or sentences shared by consecutive passages
+
+    Returns:
+        List of passages
+    """
+    if mode == "none":
+        return [text]
+    if mode == "tokens":
+        units = text.split()
+    elif mode == "sentences":
+        units = split_sentences(text)
+    else:
+        raise ValueError(f"Unknown chunk mode: {mode}")
+
+    if not units:
+        return [text]
+    return [" ".join(window) for window in _windows(units, size, overlap)]
@@ -0,0 +1,87 @@
+import json
+import logging
+from contextlib import contextmanager
+from importlib.metadata import version
+from typing import Any, Dict, Iterator, List, Tuple
+
+from txtai.database import SQLite
+from txtai.database.embedded import Embedded
+from txtai.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# txtai major versions whose SQLite content schema update_tags was checked against
+TXTAI_VERSIONS = range(7, 10)
+
+# Columns of txtai's content tables that update_tags writes to or matches on
+SCHEMA = {"documents": {"id", "data", "tags"}, "sections": {"id", "tags"}}
+
+
+def txtai_major() -> int:
+    """Major version of the installed txtai"""
+    return int(version("txtai").split(".")[0])
+
+
+def content_schema(embeddings: Embeddings) -> Dict[str, set]:
+    """Columns of the content tables update_tags relies on, as found in an index"""
+    connection = embeddings.database.connection
+    return {
+        table: {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        for table in SCHEMA
+    }
+
+
+def supports_tag_updates(embeddings: Embeddings) -> bool:
+    """True if metadata can be rewritten in place in an index's content database
+
+    Requires txtai's SQLite content backend, a txtai version the schema was
+    checked against and the expected columns in the content tables.
+    """
+    if not isinstance(embeddings.database, SQLite) or txtai_major() not in TXTAI_VERSIONS:
+        return False
+    schema = content_schema(embeddings)
+    return all(columns <= schema[table] for table, columns in SCHEMA.items())
+
+
+def update_tags(embeddings: Embeddings, rows: List[Tuple[str, Dict[str, Any], str]]) -> bool:
+    """Rewrite the stored data and tags of existing rows without re-encoding them
+
+    This is the only place that writes to txtai's content tables directly,
+    txtai has no API for changing metadata without re-indexing the text.
+    Returns False, changing nothing, if the content database isn't one this
+    was checked against.
+    """
+    if not supports_tag_updates(embeddings):
+        logger.warning(f"In-place metadata updates not supported on txtai {version('txtai')}")
+        return False
+
+    connection = embeddings.database.connection
+    connection.executemany(
+        "UPDATE documents SET data = ?, tags = ? WHERE id = ?",
+        [(json.dumps(data, allow_nan=False), tags, row_id) for row_id, data, tags in rows],
+    )
+    connection.executemany(
+        "UPDATE sections SET tags = ? WHERE id = ?",
+        [(tags, row_id) for row_id, _, tags in rows],
+    )
+    connection.commit()
+    return True
+
+
+@contextmanager
+def keep_database(embeddings: Embeddings) -> Iterator[None]:
+    """Keep an index on its own content database while a copy of it is saved
+
+    txtai moves a content database that was never saved or loaded to the
+    first directory the index is saved to, so later writes would land in
+    that copy. Such a database is copied back to a new temporary database
+    once the save finishes.
+    """
+    database = embeddings.database
+    temporary = isinstance(database, Embedded) and not database.path
+    yield
+    if temporary and database.path:
+        saved = database.connection
+        database.session(connection=database.copy(""))
+        database.path = None
+        saved.close()
@@ -1,21 +1,71 @@
-from typing import List, Dict, Any, Optional
+from typing import AsyncGenerator, AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+from contextlib import ExitStack, asynccontextmanager, contextmanager, nullcontext
 from uuid import uuid4
+import asyncio
+import base64
+import copy
+import hashlib
+import io
 import json
 import logging
+import time
+import numpy as np
 from txtai.embeddings import Embeddings
 from .config_service import config_service
 from .base_service import BaseService
+from .batch_tuner import sample_texts, tune_batch_size
+from .chunker import chunk_text
+from .content_store import keep_database, update_tags
+from .encoder_pool import CachedPooledEmbeddings, EncoderPool, PooledEmbeddings, get_encoder_pool
+from .query_router import QueryRouter, path_search
+from .sharding import ShardedEmbeddings
+from .thread_profiles import apply_thread_profile
+from .vector_cache import CachedEmbeddings, VectorCache
 
 logger = logging.getLogger(__name__)
 
 
+def parse_bool(value: Any) -> bool:
+    """Cast a metadata value to bool, reading "true"/"false" style strings by their meaning"""
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in ("true", "1", "yes", "on"):
+            return True
+        if normalized in ("false", "0", "no", "off", ""):
+            return False
+        raise ValueError(f"Invalid boolean value: {value}")
+    return bool(value)
+
+
+# Metadata field types that can be declared in EMBEDDINGS_METADATA_FIELDS
+FIELD_TYPES = {"str": str, "int": int, "float": float, "bool": parse_bool}
+
+# Filter operators accepted in metadata filters
+FILTER_OPERATORS = {"eq": "=", "ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
 class EmbeddingsService(BaseService):
     """Service to manage txtai embeddings lifecycle"""
 
-    def __init__(self):
+    def __init__(self, models: Optional[Dict[str, Any]] = None):
         super().__init__()
         self.settings = None
-        self.embeddings: Optional[Embeddings] = None
+        self.embeddings: Optional[Union[Embeddings, ShardedEmbeddings]] = None
+        self.vector_cache: Optional[VectorCache] = None
+        self.encoder_pool: Optional[EncoderPool] = None
+        # txtai models cache shared by every index this service builds, so
+        # shards and rebuilt indexes reuse one loaded vector model. Namespace
+        # services pass in the global service's cache to share it too.
+        self.models: Dict[str, Any] = models if models is not None else {}
+        self.modified = False
+        self._write_lock = asyncio.Lock()
+        self._compaction: Optional[asyncio.Task] = None
+        self._maintenance: Optional[asyncio.Task] = None
+        self._compactions = 0
+        self._last_compaction_seconds = 0.0
+        self._batch_tuning: Optional[Dict[str, Any]] = None
+        self.router: Optional[QueryRouter] = None
+        self.threads: Dict[str, Optional[int]] = {}
 
     async def initialize(self):
         """Initialize embeddings with config"""
@@ -26,13 +76,32 @@ class EmbeddingsService(BaseService):
 
                 logger.info("\n=== Initializing Embeddings ===")
                 logger.info(f"Using config: {json.dumps(config, indent=2)}")
+                if self.settings.EMBEDDINGS_SHARDS > 1:
+                    logger.info(f"Using {self.settings.EMBEDDINGS_SHARDS} index shards")
 
-                # Create new embeddings instance
-                self.embeddings = Embeddings(config)
+                # Create new embeddings instance, backed by the vector cache if configured
+                if self.settings.EMBEDDINGS_VECTOR_CACHE_PATH:
+                    self.vector_cache = VectorCache(
+                        self.settings.EMBEDDINGS_VECTOR_CACHE_PATH,
+                        self.settings.EMBEDDINGS_VECTOR_CACHE_MAX_ENTRIES,
+                    )
+                    logger.info(
+                        f"Using vector cache at {self.settings.EMBEDDINGS_VECTOR_CACHE_PATH}"
+                    )
+
+                self.router = QueryRouter.from_settings(self.settings)
+
+                # Size torch and Faiss thread pools before the model is loaded
+                self.threads = apply_thread_profile(self.settings)
+
+                # Encode in worker processes if configured
+                self.encoder_pool = get_encoder_pool(self.settings, copy.deepcopy(config))
 
                 # Initialize database and create empty index
+                self.embeddings = self._create_embeddings()
                 self.embeddings.index([("init", "init", "{}")])
                 self.embeddings.delete(["init"])
+                self._create_metadata_indexes()
 
                 self._initialized = True
                 logger.info("Embeddings initialized successfully")
@@ -40,47 +109,526 @@ class EmbeddingsService(BaseService):
                 logger.error(f"Failed to initialize embeddings: {str(e)}")
                 raise
 
+    def _create_embeddings(self) -> Union[Embeddings, ShardedEmbeddings]:
+        """Create an empty index, sharded if configured"""
+
+        def factory() -> Embeddings:
+            # txtai stores index state such as the row offset in its config,
+            # so every instance needs its own copy
+            config = copy.deepcopy(config_service.embeddings_config)
+            models = self.models
+            if self.vector_cache and self.encoder_pool:
+                return CachedPooledEmbeddings(
+                    config, self.vector_cache, pool=self.encoder_pool, models=models
+                )
+            if self.vector_cache:
+                return CachedEmbeddings(config, self.vector_cache, models=models)
+            if self.encoder_pool:
+                return PooledEmbeddings(config, self.encoder_pool, models=models)
+            return Embeddings(config, models=models)
+
+        if self.settings.EMBEDDINGS_SHARDS > 1:
+            return ShardedEmbeddings(factory, self.settings.EMBEDDINGS_SHARDS)
+        return factory()
+
     async def add(self, documents: List[Dict[str, Any]]) -> int:
         """Add documents to embeddings index"""
         self._check_initialized()
+        async with self._write_lock:
+            try:
+                logger.info("\n=== Adding Documents ===")
+                logger.info(f"Processing {len(documents)} documents")
+
+                # Format documents for txtai indexing
+                formatted_docs = []
+                for doc in documents:
+                    doc_id = str(doc.get("id", str(uuid4())))
+                    for formatted_doc in self._format_document(
+                        doc_id, doc["text"], doc.get("metadata")
+                    ):
+                        formatted_docs.append(formatted_doc)
+                        logger.info(f"Formatted document: {formatted_doc}")
+
+                # Index the documents
+                logger.info("Indexing documents...")
+                self.embeddings.index(formatted_docs)
+                self._create_metadata_indexes()
+                self.modified = True
+                logger.info("Documents indexed")
+
+                # Verify indexing
+                verify_query = "SELECT COUNT(*) as count FROM txtai"
+                logger.info(f"Verifying with query: {verify_query}")
+                results = self.embeddings.search(verify_query)
+                count = results[0]["count"] if results else 0
+                logger.info(f"Verified count: {count}")
+
+                # Show sample document
+                if count > 0:
+                    sample = self.embeddings.search("SELECT id, text, tags FROM txtai LIMIT 1")
+                    logger.info(f"Sample document: {sample[0]}")
+
+                return count
+
+            except Exception as e:
+                logger.error(f"Failed to add documents: {str(e)}")
+                raise
+
+    def _format_document(
+        self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]]
+    ) -> List[tuple]:
+        """Format a document as txtai rows, splitting it into passages if chunking is enabled
+
+        Passages are indexed as ``<doc_id>#<n>`` with the parent id and passage
+        number stored alongside the document metadata. Every row carries the
+        hash of the full document text and its passage count, used to detect
+        unchanged documents on upsert.
+        """
+        metadata = metadata or {}
+        fields = self._metadata_fields(metadata)
+        content_hash = self._content_hash(text)
+        passages = chunk_text(
+            text,
+            self.settings.EMBEDDINGS_CHUNK_MODE,
+            self.settings.EMBEDDINGS_CHUNK_SIZE,
+            self.settings.EMBEDDINGS_CHUNK_OVERLAP,
+        )
+        if len(passages) == 1:
+            return [
+                (
+                    doc_id,
+                    {"text": text, "hash": content_hash, "chunks": 1, **fields},
+                    json.dumps(metadata),
+                )
+            ]
+
+        return [
+            (
+                f"{doc_id}#{n}",
+                {"text": passage, "hash": content_hash, "chunks": len(passages), **fields},
+                json.dumps({**metadata, "parent_id": doc_id, "chunk": n}),
+            )
+            for n, passage in enumerate(passages)
+        ]
+
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        """Hash of document text used for change detection"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _metadata_fields(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract declared metadata fields, cast to their configured types"""
+        fields = {}
+        for name, kind in self.settings.EMBEDDINGS_METADATA_FIELDS.items():
+            if metadata.get(name) is not None:
+                fields[name] = FIELD_TYPES[kind](metadata[name])
+        return fields
+
+    def _create_metadata_indexes(
+        self, embeddings: Optional[Union[Embeddings, ShardedEmbeddings]] = None
+    ) -> None:
+        """Create expression indexes on declared metadata fields in the content database
+
+        txtai resolves a column such as ``category`` to
+        ``json_extract(data, '$.category')``, so an index on the same
+        expression is used by filtered queries.
+        """
+        if not self.settings.EMBEDDINGS_METADATA_FIELDS:
+            return
+        for shard in self._shards(embeddings):
+            if not hasattr(shard.database, "connection"):
+                continue
+            for name in self.settings.EMBEDDINGS_METADATA_FIELDS:
+                shard.database.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS metadata_{name} "
+                    f"ON documents(json_extract(data, '$.{name}'))"
+                )
+            shard.database.connection.commit()
+
+    def _shards(
+        self, embeddings: Optional[Union[Embeddings, ShardedEmbeddings]] = None
+    ) -> List[Embeddings]:
+        """Underlying txtai indexes - one unless sharding is enabled"""
+        embeddings = embeddings or self.embeddings
+        if isinstance(embeddings, ShardedEmbeddings):
+            return embeddings.shards
+        return [embeddings]
+
+    def _owner(self, row_id: str) -> Embeddings:
+        """txtai index that stores a row id"""
+        if isinstance(self.embeddings, ShardedEmbeddings):
+            return self.embeddings.owner(row_id)
+        return self.embeddings
+
+    def _build_filter(self, filters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Build a SQL condition and bind parameters from a metadata filter
+
+        Each filter value is either a scalar (equality), a list (membership) or a
+        dict of operators: eq, ne, gt, gte, lt, lte, in.
+        """
+        clauses, parameters = [], {}
+        for name, condition in filters.items():
+            if name not in self.settings.EMBEDDINGS_METADATA_FIELDS:
+                raise ValueError(f"Unknown metadata filter field: {name}")
+            cast = FIELD_TYPES[self.settings.EMBEDDINGS_METADATA_FIELDS[name]]
+
+            if not isinstance(condition, dict):
+                condition = {"in" if isinstance(condition, list) else "eq": condition}
+
+            for op, value in condition.items():
+                key = f"f{len(parameters)}"
+                if op == "in":
+                    keys = [f"{key}_{i}" for i in range(len(value))]
+                    parameters.update({k: cast(v) for k, v in zip(keys, value)})
+                    placeholders = ", ".join(f":{k}" for k in keys)
+                    clauses.append(f"{name} IN ({placeholders})")
+                elif op in FILTER_OPERATORS:
+                    parameters[key] = cast(value)
+                    clauses.append(f"{name} {FILTER_OPERATORS[op]} :{key}")
+                else:
+                    raise ValueError(f"Unknown filter operator: {op}")
+
+        return " AND ".join(clauses), parameters
+
+    def _path_search(self, query: str, limit: Optional[int] = None, path: str = "hybrid", **kwargs):
+        """Run a query on one retrieval path, see query_router.path_search"""
+        if isinstance(self.embeddings, ShardedEmbeddings):
+            return self.embeddings.search(query, limit, path, **kwargs)
+        return path_search(self.embeddings, query, limit, path, **kwargs)
+
+    def _filtered_search(
+        self, query: str, limit: int, filters: Dict[str, Any], path: str = "hybrid"
+    ) -> List[Dict[str, Any]]:
+        """Run a similarity query with metadata filters applied inside the database
+
+        Similarity candidates are widened until ``limit`` rows pass the filter or
+        every document has been considered, so filtered searches return a full
+        page whenever enough matching documents exist.
+        """
+        condition, parameters = self._build_filter(filters)
+        parameters["query"] = query
+        total = self.embeddings.count()
+        candidates = min(limit * self.settings.EMBEDDINGS_FILTER_CANDIDATES, total)
+
+        while True:
+            results = self._path_search(
+                f"SELECT id, text, score, tags as metadata FROM txtai "
+                f"WHERE similar(:query, {max(candidates, 1)}) AND {condition} LIMIT {limit}",
+                limit,
+                path,
+                parameters=parameters,
+            )
+            if len(results) >= limit or candidates >= total:
+                return results
+            candidates = min(candidates * 4, total)
+
+    @staticmethod
+    def _row_ids(doc_id: str, chunks: int) -> List[str]:
+        """Ids of the rows a document with the given passage count is stored as"""
+        if chunks <= 1:
+            return [doc_id]
+        return [f"{doc_id}#{n}" for n in range(chunks)]
+
+    def _lookup(self, ids: List[str], batch: int = 500) -> Dict[str, Dict[str, Any]]:
+        """Fetch stored hash, passage count and tags for row ids"""
+        stored = {}
+        for start in range(0, len(ids), batch):
+            chunk = ids[start : start + batch]
+            placeholders = ", ".join(f":id{i}" for i in range(len(chunk)))
+            results = self.embeddings.search(
+                f"SELECT id, hash, chunks, tags FROM txtai WHERE id IN ({placeholders})",
+                limit=len(chunk),
+                parameters={f"id{i}": row_id for i, row_id in enumerate(chunk)},
+            )
+            stored.update({result["id"]: result for result in results})
+        return stored
+
+    def _update_metadata(self, rows: List[tuple]) -> None:
+        """Update stored metadata and metadata fields in place without re-encoding
+
+        Falls back to re-indexing the rows if the content database doesn't
+        support in-place updates.
+        """
+        owned: Dict[int, Tuple[Embeddings, List[tuple]]] = {}
+        for row in rows:
+            shard = self._owner(row[0])
+            owned.setdefault(id(shard), (shard, []))[1].append(row)
+
+        for shard, shard_rows in owned.values():
+            if not update_tags(shard, shard_rows):
+                shard.upsert(shard_rows)
+
+    async def upsert(self, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Insert or update documents, skipping documents whose text is unchanged
+
+        Unchanged documents with changed metadata have their metadata updated in
+        place. Only new and changed documents are encoded and written to the index.
+        """
+        self._check_initialized()
+        async with self._write_lock:
+            try:
+                logger.info(f"Upserting {len(documents)} documents")
+
+                formatted = []
+                for doc in documents:
+                    doc_id = str(doc.get("id", str(uuid4())))
+                    formatted.append(
+                        (doc_id, self._format_document(doc_id, doc["text"], doc.get("metadata")))
+                    )
+
+                # A document is stored either whole or as passages starting at #0
+                stored = self._lookup(
+                    [row_id for doc_id, _ in formatted for row_id in (doc_id, f"{doc_id}#0")]
+                )
+
+                counts = {"new": 0, "updated": 0, "metadata_updated": 0, "skipped": 0}
+                upserts, metadata_updates, stale = [], [], []
+                for doc_id, rows in formatted:
+                    previous = stored.get(doc_id) or stored.get(f"{doc_id}#0")
+                    if previous is None:
+                        counts["new"] += 1
+                        upserts.extend(rows)
+                    elif previous["hash"] == rows[0][1]["hash"] and previous["chunks"] == len(rows):
+                        if previous["tags"] == rows[0][2]:
+                            counts["skipped"] += 1
+                        else:
+                            counts["metadata_updated"] += 1
+                            metadata_updates.extend(rows)
+                    else:
+                        counts["updated"] += 1
+                        upserts.extend(rows)
+                        new_ids = {row_id for row_id, _, _ in rows}
+                        old_ids = self._row_ids(doc_id, previous["chunks"] or 1)
+                        stale.extend(row_id for row_id in old_ids if row_id not in new_ids)
+
+                if stale:
+                    self.embeddings.delete(stale)
+                if upserts:
+                    self.embeddings.upsert(upserts)
+                if metadata_updates:
+                    self._update_metadata(metadata_updates)
+                self.modified = self.modified or bool(stale or upserts or metadata_updates)
+                self._maybe_compact()
+
+                logger.info(f"Upsert results: {counts}")
+                return counts
+
+            except Exception as e:
+                logger.error(f"Failed to upsert documents: {str(e)}")
+                raise
+
+    @staticmethod
+    def decode_vectors(payload: bytes) -> np.ndarray:
+        """Decode a NumPy ``.npy`` file or raw little-endian float32 values into an array"""
+        if payload.startswith(b"\x93NUMPY"):
+            try:
+                vectors = np.load(io.BytesIO(payload), allow_pickle=False)
+            except ValueError as e:
+                raise ValueError(f"Invalid .npy payload: {e}")
+            if not np.issubdtype(vectors.dtype, np.number):
+                raise ValueError(f"Vectors must be numeric, got {vectors.dtype}")
+            return np.atleast_2d(vectors).astype(np.float32)
+
+        if len(payload) % 4:
+            raise ValueError("Raw vector payload size must be a multiple of 4 bytes")
+        return np.frombuffer(payload, dtype="<f4").astype(np.float32)
+
+    def _check_vectors(self, vectors: np.ndarray, count: Optional[int] = None) -> np.ndarray:
+        """Shape vectors as rows of the index dimension, raising ValueError on a mismatch"""
+        dimensions = self.embeddings.config.get("dimensions")
+        if vectors.ndim == 1:
+            if not vectors.size or vectors.size % dimensions:
+                raise ValueError(
+                    f"Vector payload of {vectors.size} values is not a multiple of "
+                    f"the index dimension {dimensions}"
+                )
+            vectors = vectors.reshape(-1, dimensions)
+        if vectors.ndim != 2 or vectors.shape[1] != dimensions:
+            raise ValueError(
+                f"Expected vectors of dimension {dimensions}, got shape {tuple(vectors.shape)}"
+            )
+        if count is not None and vectors.shape[0] != count:
+            raise ValueError(f"Expected {count} vectors, got {vectors.shape[0]}")
+        if not np.isfinite(vectors).all():
+            raise ValueError("Vectors must be finite")
+        return vectors
+
+    @contextmanager
+    def _precomputed(self, texts: List[str], vectors: np.ndarray, category: str = "data"):
+        """Serve precomputed vectors for texts in place of encoding them with the model
+
+        Wraps each vectors model's encode method. Texts without a precomputed
+        vector, such as concurrent queries, are still encoded by the model.
+        """
+        patched = []
+        for shard in self._shards():
+            model = shard.model
+            encode = model.encode
+            lookup = {model.prepare(text, category): vector for text, vector in zip(texts, vectors)}
+
+            def precomputed(data, category=None, encode=encode, lookup=lookup):
+                missing = [i for i, item in enumerate(data) if item not in lookup]
+                if len(missing) == len(data):
+                    return encode(data, category)
+
+                output = np.empty((len(data), vectors.shape[1]), dtype=np.float32)
+                for i, item in enumerate(data):
+                    if item in lookup:
+                        output[i] = lookup[item]
+                if missing:
+                    output[missing] = encode([data[i] for i in missing], category)
+                return output
+
+            # encode is an instance attribute when wrapped by the vector cache
+            patched.append((model, vars(model).get("encode")))
+            model.encode = precomputed
         try:
-            logger.info("\n=== Adding Documents ===")
-            logger.info(f"Processing {len(documents)} documents")
+            yield
+        finally:
+            for model, original in patched:
+                if original is None:
+                    del model.encode
+                else:
+                    model.encode = original
 
-            # Format documents for txtai indexing
-            formatted_docs = []
-            for doc in documents:
-                doc_id = str(doc.get("id", str(uuid4())))
-                text = doc["text"]
-                metadata_str = json.dumps(doc.get("metadata", {}))
-                formatted_doc = (doc_id, text, metadata_str)
-                formatted_docs.append(formatted_doc)
-                logger.info(f"Formatted document: {formatted_doc}")
-
-            # Index the documents
-            logger.info("Indexing documents...")
-            self.embeddings.index(formatted_docs)
-            logger.info("Documents indexed")
-
-            # Verify indexing
-            verify_query = "SELECT COUNT(*) as count FROM txtai"
-            logger.info(f"Verifying with query: {verify_query}")
-            results = self.embeddings.search(verify_query)
-            count = results[0]["count"] if results else 0
-            logger.info(f"Verified count: {count}")
-
-            # Show sample document
-            if count > 0:
-                sample = self.embeddings.search("SELECT id, text, tags FROM txtai LIMIT 1")
-                logger.info(f"Sample document: {sample[0]}")
-
-            return count
+    async def upsert_vectors(
+        self, documents: List[Dict[str, Any]], vectors: np.ndarray
+    ) -> Dict[str, int]:
+        """Insert or update documents with precomputed vectors, bypassing the model
 
-        except Exception as e:
-            logger.error(f"Failed to add documents: {str(e)}")
-            raise
+        ``vectors`` holds one row per document, in order, computed with the
+        configured model. Documents are stored whole, without chunking, and
+        always rewritten.
+        """
+        self._check_initialized()
+        vectors = self._check_vectors(vectors, len(documents))
+        async with self._write_lock:
+            try:
+                logger.info(f"Upserting {len(documents)} documents with precomputed vectors")
+
+                rows, texts = [], []
+                for doc, vector in zip(documents, vectors):
+                    doc_id = str(doc.get("id", str(uuid4())))
+                    metadata = doc.get("metadata") or {}
+                    content_hash = hashlib.sha256(
+                        doc["text"].encode("utf-8") + vector.tobytes()
+                    ).hexdigest()
+                    data = {
+                        "text": doc["text"],
+                        "hash": content_hash,
+                        "chunks": 1,
+                        **self._metadata_fields(metadata),
+                    }
+                    rows.append((doc_id, data, json.dumps(metadata)))
+                    texts.append(doc["text"])
+
+                # Remove passages left over from a previously chunked version
+                stored = self._lookup([f"{doc_id}#0" for doc_id, _, _ in rows])
+                stale = [
+                    row_id
+                    for doc_id, _, _ in rows
+                    if f"{doc_id}#0" in stored
+                    for row_id in self._row_ids(doc_id, stored[f"{doc_id}#0"]["chunks"])
+                ]
+                if stale:
+                    self.embeddings.delete(stale)
+
+                with self._precomputed(texts, vectors):
+                    self.embeddings.upsert(rows)
+                self.modified = True
+                self._maybe_compact()
+
+                return {"documents": len(rows), "stale_passages": len(stale)}
+
+            except Exception as e:
+                logger.error(f"Failed to upsert vectors: {str(e)}")
+                raise
+
+    async def _encode_query(self, query: str, path: str = "hybrid") -> Optional[np.ndarray]:
+        """Encode a query on the encoder pool without blocking the event loop
+
+        Searches run on the event loop, where waiting on the pool would stall
+        every other request. The query is encoded on a thread first and the
+        search is then served the vector with ``_precomputed``. Returns None,
+        leaving the search to encode the query, without a pool or when the
+        path doesn't use vectors.
+        """
+        if not self.encoder_pool or path == "sparse":
+            return None
+        model = self._shards()[0].model
+        return await asyncio.to_thread(model.encode, [model.prepare(query, "query")], "query")
+
+    def _query_vector(self, query: str, vector: Optional[np.ndarray]):
+        """Context serving a query vector from _encode_query to the search, if there is one"""
+        if vector is None:
+            return nullcontext()
+        return self._precomputed([query], vector, "query")
+
+    async def search_vector(
+        self,
+        vector: np.ndarray,
+        limit: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        parse_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Search the dense index with a precomputed query vector, bypassing the model"""
+        self._check_initialized()
+        vector = self._check_vectors(vector, 1)[0]
+        if self.embeddings.config.get("normalize"):
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+
+        start = time.perf_counter()
+        if filters:
+            results = self._filtered_search(vector, limit, filters, "dense")
+        else:
+            results = self._path_search(
+                f"SELECT id, text, score, tags as metadata FROM txtai "
+                f"WHERE similar(:query) LIMIT {int(limit)}",
+                limit,
+                "dense",
+                parameters={"query": vector},
+            )
+        self.router.record("dense", time.perf_counter() - start)
+        return self._format_results(results, parse_metadata)
+
+    @staticmethod
+    def _format_results(
+        results: List[Dict[str, Any]], parse_metadata: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Format raw search rows, with metadata parsed or as the stored JSON string"""
+        formatted_results = []
+        for result in results:
+            metadata = result.get("metadata") or "{}"
+            formatted_results.append(
+                {
+                    "id": result["id"],
+                    "text": result["text"],
+                    "score": result["score"],
+                    "metadata": json.loads(metadata) if parse_metadata else metadata,
+                }
+            )
+        return formatted_results
 
-    async def hybrid_search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def _collapse(self, results: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Collapse passage results to their parent documents, keeping the best passage"""
+        parents: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            metadata = dict(result["metadata"])
+            parent_id = metadata.pop("parent_id", result["id"])
+            metadata.pop("chunk", None)
+            if parent_id not in parents:
+                parents[parent_id] = {**result, "id": parent_id, "metadata": metadata}
+        collapsed = sorted(parents.values(), key=lambda r: r["score"], reverse=True)
+        return collapsed[:limit]
+
+    async def hybrid_search(
+        self,
+        query: str,
+        limit: int = 10,
+        collapse: bool = False,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """Perform hybrid search"""
         self._check_initialized()
         try:
@@ -94,8 +642,14 @@ class EmbeddingsService(BaseService):
             doc_count = count_result[0]["count"] if count_result else 0
             logger.info(f"Documents in index: {doc_count}")
 
-            # Perform search
-            results = self.embeddings.search(query, limit)
+            # Perform search, over-fetching passages when collapsing to parents
+            fetch = limit * self.settings.EMBEDDINGS_COLLAPSE_OVERFETCH if collapse else limit
+            vector = await self._encode_query(query)
+            with self._query_vector(query, vector):
+                if filters:
+                    results = self._filtered_search(query, fetch, filters)
+                else:
+                    results = self.embeddings.search(query, fetch)
             logger.info(f"Raw search results: {json.dumps(results, indent=2)}")
 
             # Format results with metadata
@@ -123,39 +677,69 @@ class EmbeddingsService(BaseService):
                         }
                     )
 
+            if collapse:
+                formatted_results = self._collapse(formatted_results, limit)
+
             return formatted_results
 
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             raise
 
-    async def search(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
-        """Search for documents using hybrid search by default"""
+    async def search(
+        self,
+        query: str,
+        limit: int = 3,
+        collapse: bool = False,
+        filters: Optional[Dict[str, Any]] = None,
+        path: Optional[str] = None,
+        parse_metadata: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Search for documents using hybrid search by default
+
+        Returns passages when chunking is enabled, or parent documents with
+        their best matching passage when ``collapse`` is set. ``filters`` are
+        applied to declared metadata fields inside the query. ``path`` selects
+        the sparse, dense or hybrid index; when not given, the query router
+        picks one if EMBEDDINGS_ROUTER_ENABLED is set. Without
+        ``parse_metadata``, metadata is returned as the stored JSON string.
+        """
         self._check_initialized()
         try:
-            logger.info(f"Searching for: {query} (limit: {limit})")
+            if path is None:
+                enabled = self.settings.EMBEDDINGS_ROUTER_ENABLED
+                path = self.router.route(query) if enabled else "hybrid"
+            logger.info(f"Searching for: {query} (limit: {limit}, path: {path})")
+            fetch = limit * self.settings.EMBEDDINGS_COLLAPSE_OVERFETCH if collapse else limit
+            start = time.perf_counter()
+            vector = await self._encode_query(query, path)
 
-            # Format search query
-            search_query = f"""
-            SELECT id, text, score, tags as metadata
-            FROM txtai
-            WHERE similar('{query}')
-            LIMIT {limit}
-            """
+            with self._query_vector(query, vector):
+                if filters:
+                    results = self._filtered_search(query, fetch, filters, path)
+                else:
+                    # Format search query, binding the query text as a parameter
+                    search_query = f"""
+                    SELECT id, text, score, tags as metadata
+                    FROM txtai
+                    WHERE similar(:query)
+                    LIMIT {fetch}
+                    """
 
-            # Execute search
-            results = self.embeddings.search(search_query)
+                    # Execute search
+                    results = self._path_search(
+                        search_query, path=path, parameters={"query": query}
+                    )
+            self.router.record(path, time.perf_counter() - start)
 
-            # Format results
-            formatted_results = []
-            for result in results:
-                formatted_result = {
-                    "id": result["id"],
-                    "text": result["text"],
-                    "score": result["score"],
-                    "metadata": json.loads(result["metadata"]) if result.get("metadata") else {},
-                }
-                formatted_results.append(formatted_result)
+            # Format results, collapsing needs the parent ids in the metadata
+            formatted_results = self._format_results(results, parse_metadata or collapse)
+
+            if collapse:
+                formatted_results = self._collapse(formatted_results, limit)
+                if not parse_metadata:
+                    for result in formatted_results:
+                        result["metadata"] = json.dumps(result["metadata"])
 
             logger.info(f"Found {len(formatted_results)} results")
             return formatted_results
@@ -164,25 +748,422 @@ class EmbeddingsService(BaseService):
             logger.error(f"Search failed: {str(e)}")
             raise
 
-    async def delete(self, ids: List[str]) -> None:
-        """Delete documents by ID"""
+    @staticmethod
+    def _encode_cursor(position: Dict[str, Any]) -> str:
+        """Encode a pagination position as an opaque cursor"""
+        return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, key: str, kind: type) -> Any:
+        """Decode an opaque cursor back into its pagination position
+
+        Search cursors hold an ``offset`` and listing cursors an ``id``; a cursor
+        that doesn't decode to the expected kind raises ValueError.
+        """
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, UnicodeError):
+            raise ValueError("Invalid cursor")
+
+        if not isinstance(position, dict) or set(position) != {key}:
+            raise ValueError("Invalid cursor")
+        value = position[key]
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError("Invalid cursor")
+        if kind is int and value < 0:
+            raise ValueError("Invalid cursor")
+        return value
+
+    async def search_page(
+        self,
+        query: str,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        collapse: bool = False,
+        filters: Optional[Dict[str, Any]] = None,
+        path: Optional[str] = None,
+        parse_metadata: bool = True,
+    ) -> Dict[str, Any]:
+        """Search returning one page of results and a cursor for the next page
+
+        Similarity results have no stable sort key, so the cursor records how
+        many results have been returned and the next page re-runs the query
+        with a wider limit.
+        """
+        offset = self._decode_cursor(cursor, "offset", int) if cursor else 0
+        results = await self.search(
+            query, offset + limit + 1, collapse, filters, path, parse_metadata
+        )
+
+        page = results[offset : offset + limit]
+        more = len(results) > offset + limit
+        next_cursor = self._encode_cursor({"offset": offset + limit}) if more else None
+        return {"results": page, "next_cursor": next_cursor}
+
+    async def list_documents(
+        self, limit: int = 100, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List indexed documents in id order using keyset pagination"""
+        self._check_initialized()
+        after = self._decode_cursor(cursor, "id", str) if cursor else ""
+        results = self.embeddings.search(
+            f"SELECT id, text, tags FROM txtai WHERE id > :after ORDER BY id LIMIT {int(limit)}",
+            limit=limit,
+            parameters={"after": after},
+        )
+
+        documents = [
+            {
+                "id": result["id"],
+                "text": result["text"],
+                "metadata": json.loads(result["tags"]) if result.get("tags") else {},
+            }
+            for result in results
+        ]
+        next_cursor = (
+            self._encode_cursor({"id": results[-1]["id"]}) if len(results) == limit else None
+        )
+        return {"documents": documents, "next_cursor": next_cursor}
+
+    async def export(self, vectors: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream every document in the index, one keyset page at a time
+
+        Only one page is held in memory. Vectors are recomputed from the
+        text with the index's vector model on a worker thread. Rows added
+        through upsert_vectors were stored with the caller's vectors, so
+        their exported vectors can differ from the ones in the ANN index.
+        """
+        self._check_initialized()
+        batch_size = self.settings.EMBEDDINGS_EXPORT_BATCH_SIZE
+        cursor = None
+        while True:
+            page = await self.list_documents(limit=batch_size, cursor=cursor)
+            documents = page["documents"]
+            if vectors and documents:
+                encoded = await asyncio.to_thread(
+                    self.embeddings.batchtransform, [doc["text"] for doc in documents], "data"
+                )
+                for doc, vector in zip(documents, encoded):
+                    doc["vector"] = vector.tolist()
+
+            for doc in documents:
+                yield doc
+
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+    async def delete(self, ids: List[str]) -> Dict[str, int]:
+        """Delete documents by id, including all of their passages
+
+        Ids are resolved and deleted in batches of EMBEDDINGS_DELETE_BATCH_SIZE,
+        taking the write lock per batch so large purges don't stall other writes.
+        """
         self._check_initialized()
         try:
-            # Convert list to tuple for SQL IN clause
-            if isinstance(ids, str):
-                # If it's a SQL query, use it directly
-                delete_query = ids
-            else:
-                # If it's a list of IDs, create IN clause
-                id_tuple = tuple(ids)
-                delete_query = f"DELETE FROM txtai WHERE id IN {id_tuple}"
-
-            self.embeddings.delete(delete_query)
-            logger.info(f"Deleted documents with query: {delete_query}")
+            ids = list(dict.fromkeys(str(doc_id) for doc_id in ids))
+            batch_size = self.settings.EMBEDDINGS_DELETE_BATCH_SIZE
+            counts = {"documents": 0, "rows": 0, "batches": 0}
+
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start : start + batch_size]
+                async with self._write_lock:
+                    # A document is stored either whole or as passages starting at #0
+                    stored = self._lookup(
+                        [row_id for doc_id in batch for row_id in (doc_id, f"{doc_id}#0")]
+                    )
+                    rows = []
+                    for doc_id in batch:
+                        previous = stored.get(doc_id) or stored.get(f"{doc_id}#0")
+                        if previous is not None:
+                            counts["documents"] += 1
+                            rows.extend(self._row_ids(doc_id, previous["chunks"] or 1))
+                    if rows:
+                        counts["rows"] += len(self.embeddings.delete(rows))
+                        self.modified = True
+                counts["batches"] += 1
+                await asyncio.sleep(0)
+
+            self._maybe_compact()
+            logger.info(f"Deleted documents by id: {counts}")
+            return counts
         except Exception as e:
             logger.error(f"Failed to delete documents: {e}")
             raise
 
+    async def delete_where(self, filters: Dict[str, Any]) -> Dict[str, int]:
+        """Delete every document matching a metadata filter on declared fields
+
+        Matching rows are fetched and deleted EMBEDDINGS_DELETE_BATCH_SIZE at a
+        time, so no query or id list grows with the number of matches.
+        """
+        self._check_initialized()
+        if not filters:
+            raise ValueError("At least one metadata filter is required")
+        condition, parameters = self._build_filter(filters)
+        try:
+            batch_size = self.settings.EMBEDDINGS_DELETE_BATCH_SIZE
+            counts = {"documents": 0, "rows": 0, "batches": 0}
+
+            while True:
+                async with self._write_lock:
+                    results = self.embeddings.search(
+                        f"SELECT id, tags FROM txtai WHERE {condition} LIMIT {batch_size}",
+                        limit=batch_size,
+                        parameters=parameters,
+                    )
+                    deleted = self.embeddings.delete([result["id"] for result in results])
+                    if deleted:
+                        self.modified = True
+                if not deleted:
+                    break
+
+                # Count each document once, by its whole row or its first passage
+                for result in results:
+                    tags = json.loads(result["tags"]) if result.get("tags") else {}
+                    if tags.get("chunk", 0) == 0:
+                        counts["documents"] += 1
+                counts["rows"] += len(deleted)
+                counts["batches"] += 1
+                await asyncio.sleep(0)
+
+            self._maybe_compact()
+            logger.info(f"Deleted documents matching {filters}: {counts}")
+            return counts
+        except Exception as e:
+            logger.error(f"Failed to delete documents: {e}")
+            raise
+
+    def dead_rows(self) -> Tuple[int, int]:
+        """Deleted or replaced rows still held by the ANN index, and total rows it holds
+
+        txtai's ``offset`` counts every row appended since the index was built,
+        while ``count`` only counts live rows.
+        """
+        total = sum(shard.config.get("offset", 0) for shard in self._shards())
+        return total - self.embeddings.count(), total
+
+    def _maybe_compact(self) -> None:
+        """Start a background compaction once enough of the index is dead rows"""
+        dead, total = self.dead_rows()
+        if (
+            dead >= self.settings.EMBEDDINGS_COMPACT_MIN_DELETED
+            and dead / total >= self.settings.EMBEDDINGS_COMPACT_RATIO
+            and (self._compaction is None or self._compaction.done())
+        ):
+            logger.info(f"Index has {dead}/{total} dead rows, starting compaction")
+            self._compaction = asyncio.create_task(self.compact())
+
+    def _read_rows(self) -> List[tuple]:
+        """Read every live row back from the content database as txtai index rows"""
+        rows = []
+        for shard in self._shards():
+            for row_id, text, tags, data in shard.database.connection.execute(
+                "SELECT s.id, s.text, s.tags, d.data FROM sections s "
+                "LEFT JOIN documents d ON d.id = s.id ORDER BY s.indexid"
+            ):
+                rows.append((row_id, json.loads(data) if data else text, tags))
+        return rows
+
+    def _build(self, rows: List[tuple]) -> Union[Embeddings, ShardedEmbeddings]:
+        """Build a fresh index from rows"""
+        embeddings = self._create_embeddings()
+        embeddings.index(rows or [("init", "init", "{}")])
+        if not rows:
+            embeddings.delete(["init"])
+        return embeddings
+
+    async def compact(self) -> Dict[str, Any]:
+        """Rebuild the index from the content database and swap it in
+
+        The new index is built on a worker thread, which also retrains trained
+        ANN backends. Searches keep using the current index until the swap;
+        writes wait for the rebuild so none are lost.
+        """
+        self._check_initialized()
+        async with self._write_lock:
+            start = time.perf_counter()
+            dead, _ = self.dead_rows()
+            rows = await asyncio.to_thread(self._read_rows)
+            embeddings = await asyncio.to_thread(self._build, rows)
+
+            previous, self.embeddings = self.embeddings, embeddings
+            self._create_metadata_indexes()
+            previous.close()
+            self.modified = True
+
+            elapsed = time.perf_counter() - start
+            self._compactions += 1
+            self._last_compaction_seconds = elapsed
+            logger.info(f"Compacted index: {len(rows)} rows, {dead} removed in {elapsed:.2f}s")
+            return {"rows": len(rows), "removed": dead, "seconds": elapsed}
+
+    async def _maintain(self) -> None:
+        """Periodically compact the index if it holds dead rows"""
+        while True:
+            await asyncio.sleep(self.settings.EMBEDDINGS_COMPACT_INTERVAL)
+            try:
+                if self.dead_rows()[0] > 0:
+                    await self.compact()
+            except Exception as e:
+                logger.error(f"Index maintenance failed: {e}")
+
+    def start_maintenance(self) -> None:
+        """Start scheduled background compaction if an interval is configured"""
+        self._check_initialized()
+        if self.settings.EMBEDDINGS_COMPACT_INTERVAL <= 0:
+            return
+        if self._maintenance is None or self._maintenance.done():
+            self._maintenance = asyncio.create_task(self._maintain())
+            logger.info("Index maintenance started")
+
+    async def stop_maintenance(self) -> None:
+        """Stop scheduled background compaction"""
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            try:
+                await self._maintenance
+            except asyncio.CancelledError:
+                pass
+            self._maintenance = None
+            logger.info("Index maintenance stopped")
+
+    def save(self, path: str) -> None:
+        """Persist the index to a directory"""
+        self._check_initialized()
+        self.embeddings.save(path)
+        self.modified = False
+
+    def save_copy(self, path: str) -> None:
+        """Save a copy of the index to a directory without changing where it is stored
+
+        Unlike ``save`` the index stays modified and keeps its own content
+        database, so it is still persisted to its usual location later.
+        """
+        self._check_initialized()
+        with ExitStack() as stack:
+            for shard in self._shards():
+                stack.enter_context(keep_database(shard))
+            self.embeddings.save(path)
+
+    def load(self, path: str) -> bool:
+        """Load a previously saved index from a directory, returning False if none exists
+
+        The index is loaded into a new instance and swapped in, so searches
+        against the current index are unaffected while it loads.
+        """
+        self._check_initialized()
+        embeddings = self._create_embeddings()
+        if not embeddings.exists(path):
+            embeddings.close()
+            return False
+        embeddings.load(path)
+        self._create_metadata_indexes(embeddings)
+
+        previous, self.embeddings = self.embeddings, embeddings
+        previous.close()
+        self.modified = False
+        return True
+
+    def _encode(self, texts: List[str], batch_size: int) -> Any:
+        """Encode texts with the vector model at a given batch size, bypassing the vector cache
+
+        Encodes through a copy of the vectors wrapper sharing the loaded model,
+        so the batch size of the model serving queries isn't changed mid-tuning.
+        """
+        model = copy.copy(self._shards()[0].model)
+        model.encodebatch = batch_size
+        return type(model).encode(model, texts)
+
+    async def autotune_batch_size(self, texts: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Measure encode throughput across candidate batch sizes and lock in the fastest
+
+        Uses ``texts`` as the sample if given, otherwise synthetic passages. The
+        chosen size is applied to the current index and to the shared
+        embeddings config, so rebuilt and namespace indexes use it too.
+
+        Not supported with an encoder pool: its workers encode with the batch
+        size they were started with and memory is only measured here.
+        """
+        self._check_initialized()
+        if self.encoder_pool:
+            raise ValueError(
+                "Batch size tuning isn't supported with encoder processes, "
+                "set EMBEDDINGS_ENCODER_PROCESSES=0 to tune"
+            )
+        if not texts:
+            words = (
+                self.settings.EMBEDDINGS_CHUNK_SIZE
+                if self.settings.EMBEDDINGS_CHUNK_MODE == "tokens"
+                else 128
+            )
+            texts = sample_texts(self.settings.EMBEDDINGS_AUTOTUNE_SAMPLES, words)
+
+        async with self._write_lock:
+            result = await asyncio.to_thread(
+                tune_batch_size,
+                self._encode,
+                texts,
+                self.settings.EMBEDDINGS_AUTOTUNE_CANDIDATES,
+                self.settings.EMBEDDINGS_AUTOTUNE_MAX_MEMORY_MB,
+            )
+
+            batch_size = result["batch_size"]
+            config_service.embeddings_config["encodebatch"] = batch_size
+            for shard in self._shards():
+                shard.config["encodebatch"] = batch_size
+                shard.model.encodebatch = batch_size
+
+        self._batch_tuning = result
+        logger.info(
+            f"Encode batch size set to {batch_size} ({result['docs_per_sec']:.1f} docs/sec)"
+        )
+        return result
+
+    @asynccontextmanager
+    async def exclusive(self) -> AsyncIterator[None]:
+        """Hold off writes, e.g. while taking a consistent copy of the index"""
+        self._check_initialized()
+        async with self._write_lock:
+            yield
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held in memory by the index: vectors plus content database"""
+        self._check_initialized()
+        usage = 0
+        for shard in self._shards():
+            usage += shard.count() * (shard.config.get("dimensions") or 0) * 4
+            if hasattr(shard.database, "connection"):
+                connection = shard.database.connection
+                (pages,) = connection.execute("PRAGMA page_count").fetchone()
+                (page_size,) = connection.execute("PRAGMA page_size").fetchone()
+                usage += pages * page_size
+        return usage
+
+    def close(self) -> None:
+        """Release the index"""
+        if self.embeddings:
+            self.embeddings.close()
+        self.embeddings = None
+        self._initialized = False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get embeddings service metrics"""
+        return {
+            "vector_cache": self.vector_cache.get_metrics() if self.vector_cache else None,
+            "shard_sizes": [shard.count() for shard in self._shards()] if self.embeddings else [],
+            "dead_rows": self.dead_rows()[0] if self.embeddings else 0,
+            "compactions": self._compactions,
+            "last_compaction_seconds": self._last_compaction_seconds,
+            "encode_batch_size": (
+                self.embeddings.config.get("encodebatch") if self.embeddings else None
+            ),
+            "batch_tuning": self._batch_tuning,
+            "query_paths": self.router.get_metrics() if self.router else {},
+            "threads": self.threads,
+            "encoder_pool": self.encoder_pool.get_metrics() if self.encoder_pool else None,
+        }
+
 
 # Global service instance
 embeddings_service = EmbeddingsService()
@@ -0,0 +1,229 @@
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from txtai.embeddings import Embeddings
+from txtai.vectors import Vectors
+
+from .thread_profiles import apply_threads, cpu_count
+from .vector_cache import CachedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# Vectors model loaded in each worker process
+_model = None
+
+
+def _load(config: Dict[str, Any], threads: int) -> None:
+    """Worker initializer: load the vectors model once per process"""
+    global _model
+    apply_threads(intra_op=threads, inter_op=1)
+    _model = Embeddings(config).model
+
+
+def _dimensions() -> int:
+    """Width of the vectors the worker's model produces"""
+    return _model.encode(["dimensions"]).shape[1]
+
+
+def _encode_rows(texts: List[str], category: Optional[str]) -> np.ndarray:
+    """Encode texts and return the vectors, for batches too small to be worth a shared buffer"""
+    return _model.encode(texts, category) if category else _model.encode(texts)
+
+
+def _encode(texts: List[str], category: Optional[str], name: str, offset: int) -> int:
+    """Encode texts into rows of a shared buffer starting at ``offset``
+
+    Only the texts and the buffer name cross the process boundary, the vectors
+    are written straight into shared memory. The buffer is detached again
+    after the write, so a segment the caller unlinks isn't kept mapped here.
+    """
+    vectors = _encode_rows(texts, category)
+    buffer = shared_memory.SharedMemory(name=name)
+    output = np.ndarray(
+        (offset + len(texts), vectors.shape[1]), dtype=np.float32, buffer=buffer.buf
+    )
+    try:
+        output[offset:] = vectors
+    finally:
+        del output
+        buffer.close()
+    return len(texts)
+
+
+class EncoderPool:
+    """Worker processes running the vectors model outside the API process
+
+    Tokenization and tensor preparation hold the GIL, so encoding in the API
+    process is limited to about one core. Batches are split across the pool
+    and each worker writes its vectors into a shared-memory buffer owned by
+    the caller, so results come back without being pickled. Buffers are kept
+    and reused by later batches. Batches of up to ``min_chunk`` texts, such as
+    queries, go to one worker and their vectors are returned directly, which
+    is cheaper than a shared buffer at that size. Cores are divided between
+    the workers' torch thread pools so they don't oversubscribe.
+
+    ``encode`` blocks until the vectors are ready, so callers on an event
+    loop run it on a thread.
+    """
+
+    def __init__(self, config: Dict[str, Any], processes: int, min_chunk: int = 32):
+        self.processes = processes
+        self.min_chunk = min_chunk
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load,
+            initargs=(config, max(1, cpu_count() // processes)),
+        )
+        self.dimensions = self.executor.submit(_dimensions).result()
+        self._buffers: List[shared_memory.SharedMemory] = []
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.buffers = 0
+        logger.info(f"Started {processes} encoder processes ({self.dimensions} dimensions)")
+
+    def _acquire(self, nbytes: int) -> shared_memory.SharedMemory:
+        """Take the smallest idle buffer of at least ``nbytes``, creating one if none fits"""
+        with self._lock:
+            fits = [buffer for buffer in self._buffers if buffer.size >= nbytes]
+            if fits:
+                buffer = min(fits, key=lambda b: b.size)
+                self._buffers.remove(buffer)
+                return buffer
+            self.buffers += 1
+
+        # Round up so batches of similar size share buffers
+        return shared_memory.SharedMemory(create=True, size=1 << (nbytes - 1).bit_length())
+
+    def _release(self, buffer: shared_memory.SharedMemory) -> None:
+        """Return a buffer for reuse, keeping at most two idle buffers per process"""
+        with self._lock:
+            if len(self._buffers) < 2 * self.processes:
+                self._buffers.append(buffer)
+                return
+            self.buffers -= 1
+        buffer.close()
+        buffer.unlink()
+
+    def encode(self, texts: List[str], category: Optional[str] = None) -> np.ndarray:
+        """Encode texts across the pool, as the vectors model's encode would"""
+        if len(texts) <= self.min_chunk:
+            vectors = self.executor.submit(_encode_rows, texts, category).result()
+        else:
+            vectors = self._encode_shared(texts, category)
+
+        self.batches += 1
+        self.texts += len(texts)
+        return vectors
+
+    def _encode_shared(self, texts: List[str], category: Optional[str]) -> np.ndarray:
+        """Encode texts in chunks across the pool into a shared buffer"""
+        size = max(self.min_chunk, math.ceil(len(texts) / self.processes))
+        buffer = self._acquire(len(texts) * self.dimensions * 4)
+        futures = []
+        try:
+            for start in range(0, len(texts), size):
+                futures.append(
+                    self.executor.submit(
+                        _encode, texts[start : start + size], category, buffer.name, start
+                    )
+                )
+            for future in futures:
+                future.result()
+
+            return np.ndarray(
+                (len(texts), self.dimensions), dtype=np.float32, buffer=buffer.buf
+            ).copy()
+        finally:
+            # Wait out chunks still writing after a failure before the buffer is reused
+            for future in futures:
+                if not future.cancel():
+                    future.exception()
+            self._release(buffer)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            buffers, self._buffers = self._buffers, []
+        for buffer in buffers:
+            buffer.close()
+            buffer.unlink()
+        logger.info("Encoder processes stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "batches": self.batches,
+            "texts": self.texts,
+            "buffers": self.buffers,
+        }
+
+
+class PooledVectors(Vectors):
+    """txtai vectors model encoding on an EncoderPool, without loading the model here
+
+    Tokenization, instructions, normalization and quantization still run in
+    this process as for any txtai vectors model, only ``encode`` is sent to
+    the workers.
+    """
+
+    def __init__(self, config: Dict[str, Any], scoring, models, pool: EncoderPool):
+        self.pool = pool
+        super().__init__(config, scoring, models)
+
+    def load(self, path):
+        # Skip the models cache too, the model is only loaded in the workers
+        return None
+
+    def encode(self, data, category=None):
+        return self.pool.encode(list(data), category)
+
+
+class PooledEmbeddings(Embeddings):
+    """Embeddings that encode text on an EncoderPool
+
+    txtai recreates its vectors model on every index/load, so a PooledVectors
+    model is created in ``loadvectors`` in place of the configured one.
+    """
+
+    def __init__(self, config: Dict[str, Any], pool: Optional[EncoderPool] = None, **kwargs):
+        self.pool = pool
+        super().__init__(config, **kwargs)
+
+    def loadvectors(self):
+        if not self.pool:
+            return super().loadvectors()
+        return PooledVectors(self.config, self.scoring, self.models, self.pool)
+
+
+class CachedPooledEmbeddings(CachedEmbeddings, PooledEmbeddings):
+    """Embeddings checking the vector cache first and encoding misses on the pool"""
+
+
+# Pool shared by every index in this process
+_pool: Optional[EncoderPool] = None
+
+
+def get_encoder_pool(settings, config: Dict[str, Any]) -> Optional[EncoderPool]:
+    """Shared encoder pool, started on first use, or None if disabled"""
+    global _pool
+    if _pool is None and settings.EMBEDDINGS_ENCODER_PROCESSES > 0:
+        _pool = EncoderPool(
+            config, settings.EMBEDDINGS_ENCODER_PROCESSES, settings.EMBEDDINGS_ENCODER_MIN_CHUNK
+        )
+    return _pool
+
+
+def shutdown_encoder_pool() -> None:
+    """Stop the shared encoder pool"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
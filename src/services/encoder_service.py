@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .base_service import BaseService
+from .config_service import config_service
+from .embeddings_service import embeddings_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Request:
+    """Texts from one caller waiting to be encoded"""
+
+    texts: List[str]
+    category: Optional[str]
+    future: asyncio.Future
+    submitted: float = field(default_factory=time.monotonic)
+
+
+class EncoderService(BaseService):
+    """Encode texts with the index's vectors model, batching concurrent callers
+
+    Requests are queued and a single worker drains the queue into batches of
+    up to ENCODE_MAX_BATCH_SIZE texts, waiting at most ENCODE_MAX_WAIT_MS for
+    more requests after the first one arrives. Each batch is encoded in one
+    model call and the vectors are split back out to their callers. Requests
+    larger than a batch are split into batch-sized parts.
+    """
+
+    def __init__(self):
+        """Initialize encoder service"""
+        super().__init__()
+        self.config_service = config_service
+        self.embeddings_service = embeddings_service
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Request taken off the queue that didn't fit in the previous batch
+        self._carry: Optional[_Request] = None
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._wait_total = 0.0
+        self._encode_seconds = 0.0
+
+    async def initialize(self) -> None:
+        """Initialize encoder service"""
+        if not self.initialized:
+            try:
+                self.settings = self.config_service.settings
+                self._initialized = True
+                logger.info("Encoder service initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize encoder service: {e}")
+                raise
+
+    def _ensure_worker(self) -> None:
+        """Start the batching worker on the running event loop if it is not already running there"""
+        loop = asyncio.get_running_loop()
+        if self._worker and not self._worker.done() and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._carry = None
+        self._worker = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Stop the batching worker"""
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def encode(self, texts: List[str], category: Optional[str] = None) -> np.ndarray:
+        """Encode texts into normalized vectors, as stored in the index
+
+        Args:
+            texts: Texts to encode
+            category: Instruction category, "query" (default) or "data"
+
+        Returns:
+            float32 array with one row per text
+        """
+        self._check_initialized()
+        if not texts:
+            raise ValueError("No texts to encode")
+        if len(texts) > self.settings.ENCODE_MAX_TEXTS:
+            raise ValueError(f"Too many texts: {len(texts)} (max {self.settings.ENCODE_MAX_TEXTS})")
+
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        size = self.settings.ENCODE_MAX_BATCH_SIZE
+        requests = [
+            _Request(texts[start : start + size], category, loop.create_future())
+            for start in range(0, len(texts), size)
+        ]
+        for request in requests:
+            self._queue.put_nowait(request)
+
+        try:
+            vectors = await asyncio.gather(*(request.future for request in requests))
+        finally:
+            # Parts still queued after a failure or cancellation are skipped by the worker
+            for request in requests:
+                request.future.cancel()
+        return vectors[0] if len(vectors) == 1 else np.concatenate(vectors)
+
+    async def _collect(self) -> List[_Request]:
+        """Wait for a request, then gather more until the batch is full or the wait expires"""
+        batch = [self._carry or await self._queue.get()]
+        self._carry = None
+        size = len(batch[0].texts)
+        deadline = time.monotonic() + self.settings.ENCODE_MAX_WAIT_MS / 1000
+
+        while size < self.settings.ENCODE_MAX_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if size + len(request.texts) > self.settings.ENCODE_MAX_BATCH_SIZE:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _encode(self, texts: List[str], category: Optional[str]) -> np.ndarray:
+        return self.embeddings_service.embeddings.batchtransform(
+            [(None, text, None) for text in texts], category
+        )
+
+    async def _run(self) -> None:
+        """Encode queued requests in batches"""
+        while True:
+            batch = [request for request in await self._collect() if not request.future.done()]
+
+            # One model call per instruction category in the batch
+            categories: Dict[Optional[str], List[_Request]] = {}
+            for request in batch:
+                categories.setdefault(request.category, []).append(request)
+
+            for category, requests in categories.items():
+                texts = [text for request in requests for text in request.texts]
+                start = time.monotonic()
+                try:
+                    vectors = await asyncio.to_thread(self._encode, texts, category)
+                except Exception as e:
+                    logger.error(f"Failed to encode batch of {len(texts)} texts: {e}")
+                    for request in requests:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+
+                self._batches += 1
+                self._encode_seconds += time.monotonic() - start
+                offset = 0
+                for request in requests:
+                    self._requests += 1
+                    self._texts += len(request.texts)
+                    self._wait_total += start - request.submitted
+                    if not request.future.done():
+                        request.future.set_result(vectors[offset : offset + len(request.texts)])
+                    offset += len(request.texts)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get batching and encode latency metrics"""
+        return {
+            "requests": self._requests,
+            "texts": self._texts,
+            "batches": self._batches,
+            "avg_batch_texts": self._texts / self._batches if self._batches else 0.0,
+            "avg_wait_ms": self._wait_total * 1000 / self._requests if self._requests else 0.0,
+            "avg_encode_ms": (
+                self._encode_seconds * 1000 / self._batches if self._batches else 0.0
+            ),
+            "queued_requests": self._queue.qsize() if self._queue else 0,
+        }
+
+
+# Global service instance
+encoder_service = EncoderService()
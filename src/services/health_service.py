@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .base_service import BaseService
+from .batch_tuner import sample_texts
+from .config_service import config_service
+from .embeddings_service import embeddings_service
+
+logger = logging.getLogger(__name__)
+
+
+class HealthService(BaseService):
+    """Warm the index up before serving and track synthetic query latency
+
+    ``warmup`` runs synthetic encodes and searches so model weights, kernels
+    and caches are loaded before the service reports ready. A background probe
+    then runs one lightweight search every HEALTH_PROBE_INTERVAL seconds and
+    keeps the latencies of the last HEALTH_PROBE_WINDOW probes, so readiness
+    checks reflect how fast search actually is rather than whether the process
+    is up.
+    """
+
+    def __init__(self):
+        """Initialize health service"""
+        super().__init__()
+        self.config_service = config_service
+        self.embeddings_service = embeddings_service
+        self.ready = False
+        self._queries: List[str] = []
+        self._latencies: deque = deque()
+        self._probes = 0
+        self._errors = 0
+        self._last_error: Optional[str] = None
+        self._warmup: Dict[str, Any] = {}
+        self._probe: Optional[asyncio.Task] = None
+
+    async def initialize(self) -> None:
+        """Initialize health service"""
+        if not self.initialized:
+            try:
+                self.settings = self.config_service.settings
+                self._queries = sample_texts(max(1, self.settings.HEALTH_WARMUP_QUERIES), 8)
+                self._latencies = deque(maxlen=self.settings.HEALTH_PROBE_WINDOW)
+                self._initialized = True
+                logger.info("Health service initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize health service: {e}")
+                raise
+
+    def _search(self, query: str) -> float:
+        """Run one synthetic search against the live index, returning its latency"""
+        start = time.perf_counter()
+        self.embeddings_service.embeddings.search(query, 1)
+        return time.perf_counter() - start
+
+    async def warmup(self) -> Dict[str, Any]:
+        """Run synthetic encodes and searches, then mark the service ready"""
+        self._check_initialized()
+        start = time.perf_counter()
+        embeddings = self.embeddings_service.embeddings
+
+        # Encode at the index batch size and one query at a time, the two
+        # shapes the model sees while serving
+        passages = sample_texts(self.settings.HEALTH_WARMUP_QUERIES, 128)
+        await asyncio.to_thread(
+            embeddings.batchtransform, [(None, text, None) for text in passages], "data"
+        )
+        for query in self._queries:
+            self._search(query)
+
+        self._warmup = {"queries": len(self._queries), "seconds": time.perf_counter() - start}
+        self.ready = True
+        logger.info(
+            f"Warmup finished: {len(self._queries)} queries in {self._warmup['seconds']:.2f}s"
+        )
+        return self._warmup
+
+    async def probe(self) -> Optional[float]:
+        """Run one synthetic query and record its latency, returning None if it failed"""
+        self._check_initialized()
+        query = self._queries[self._probes % len(self._queries)]
+        self._probes += 1
+        try:
+            seconds = self._search(query)
+        except Exception as e:
+            self._errors += 1
+            self._last_error = str(e)
+            logger.error(f"Health probe failed: {e}")
+            return None
+
+        self._last_error = None
+        self._latencies.append(seconds)
+        return seconds
+
+    async def _run_probe(self) -> None:
+        """Probe search latency on a fixed interval"""
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.settings.HEALTH_PROBE_INTERVAL)
+
+    def start_probe(self) -> None:
+        """Start the background latency probe if an interval is configured"""
+        self._check_initialized()
+        if self.settings.HEALTH_PROBE_INTERVAL <= 0:
+            return
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.create_task(self._run_probe())
+            logger.info("Health probe started")
+
+    async def stop_probe(self) -> None:
+        """Stop the background latency probe"""
+        if self._probe is not None:
+            self._probe.cancel()
+            try:
+                await self._probe
+            except asyncio.CancelledError:
+                pass
+            self._probe = None
+            logger.info("Health probe stopped")
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> float:
+        index = min(int(len(values) * percentile), len(values) - 1)
+        return values[index] * 1000
+
+    def get_status(self) -> Dict[str, Any]:
+        """Readiness and recent probe latency
+
+        Status is "starting" until warmup finishes, "degraded" if the last
+        probe failed or the p95 latency exceeds HEALTH_MAX_P95_MS, and
+        "healthy" otherwise.
+        """
+        latencies = sorted(self._latencies)
+        p50 = self._percentile(latencies, 0.5) if latencies else None
+        p95 = self._percentile(latencies, 0.95) if latencies else None
+
+        limit = self.settings.HEALTH_MAX_P95_MS if self.initialized else None
+        if not self.ready:
+            status = "starting"
+        elif self._last_error or (limit and p95 is not None and p95 > limit):
+            status = "degraded"
+        else:
+            status = "healthy"
+
+        return {
+            "status": status,
+            "ready": self.ready,
+            "warmup": self._warmup,
+            "probe": {
+                "samples": len(latencies),
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "max_p95_ms": limit,
+                "probes": self._probes,
+                "errors": self._errors,
+                "last_error": self._last_error,
+            },
+        }
+
+
+# Global service instance
+health_service = HealthService()
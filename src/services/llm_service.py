@@ -1,14 +1,22 @@
 from typing import List, Optional, Union, Dict, Any
-from litellm import completion
+from litellm import acompletion, token_counter, RateLimitError
 from txtai import LLM
+import asyncio
+import json
 import logging
+import random
 from .base_service import BaseService
+from .rate_limiter import Priority, RateLimiter, RateLimiterRegistry
 from src.config.settings import Settings
 from .config_service import config_service  # Import directly
 
 logger = logging.getLogger(__name__)
 
 
+class LLMRateLimitError(Exception):
+    """The provider kept rate limiting a completion after all retries"""
+
+
 class LLMService(BaseService):
     """Service for managing LLM operations"""
 
@@ -18,6 +26,11 @@ class LLMService(BaseService):
         self._llm = None
         self._config = None
         self.config_service = config_service  # Set config service directly
+        self.rate_limiters = RateLimiterRegistry()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._callers: Dict[str, int] = {}
+        self._provider_calls = 0
+        self._coalesced_calls = 0
 
     async def initialize(self):
         """Initialize LLM service"""
@@ -40,7 +53,97 @@ class LLMService(BaseService):
                 logger.error(f"Failed to initialize LLM: {str(e)}")
                 raise
 
-    async def generate(self, prompt: Union[str, List[Dict[str, str]]]) -> str:
+    def count_tokens(self, text: str) -> int:
+        """Count tokens in text using the configured model's tokenizer"""
+        self._check_initialized()
+        return token_counter(model=self._config["path"], text=text)
+
+    def _get_rate_limiter(self) -> RateLimiter:
+        """Get the rate limiter for the configured provider/model"""
+        provider = self.settings.LLM_PROVIDER
+        limits = self.settings.LLM_RATE_LIMITS[provider]
+        headroom = self.settings.LLM_RATE_LIMIT_HEADROOM
+        return self.rate_limiters.get(
+            f"{provider}/{self._config['path']}",
+            limits["requests_per_minute"] * headroom,
+            limits["tokens_per_minute"] * headroom,
+        )
+
+    async def _complete(self, messages: List[Dict[str, str]], priority: Priority) -> str:
+        """Run a completion, sharing the result of an identical in-flight request"""
+        if not self.settings.LLM_COALESCE_REQUESTS:
+            return await self._call_provider(messages, priority)
+
+        key = json.dumps([self._config["path"], messages], sort_keys=True)
+        task = self._inflight.get(key)
+        if task is None:
+            # The provider call belongs to no single caller, so one caller
+            # going away doesn't cancel it for the others
+            task = asyncio.create_task(self._call_provider(messages, priority))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._coalesced_calls += 1
+            logger.info("Coalesced request with identical in-flight completion")
+
+        self._callers[key] = self._callers.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._callers[key] -= 1
+            if not self._callers[key]:
+                del self._callers[key]
+                if not task.done():
+                    # Every caller was cancelled, nobody is left to use the result
+                    self._forget(key, task)
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Stop sharing an in-flight completion with new callers"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _call_provider(self, messages: List[Dict[str, str]], priority: Priority) -> str:
+        """Run a completion under the rate limiter, retrying rate-limit errors with backoff"""
+        self._provider_calls += 1
+        model = self._config["path"]
+        limiter = self._get_rate_limiter()
+        estimated = token_counter(model=model, messages=messages)
+
+        for attempt in range(self.settings.LLM_MAX_RETRIES + 1):
+            await limiter.acquire(estimated, priority)
+            try:
+                response = await acompletion(
+                    model=model,
+                    messages=messages,
+                    api_key=self._config["api_key"],
+                )
+            except RateLimitError:
+                limiter.penalize()
+                if attempt == self.settings.LLM_MAX_RETRIES:
+                    raise
+                # Full jitter keeps retrying callers from synchronising
+                delay = random.uniform(
+                    0,
+                    min(
+                        self.settings.LLM_RETRY_MAX_DELAY,
+                        self.settings.LLM_RETRY_BASE_DELAY * 2**attempt,
+                    ),
+                )
+                logger.warning(f"Rate limited by {model}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                limiter.record_usage(estimated, usage.total_tokens)
+            return response.choices[0].message.content
+
+    async def generate(
+        self,
+        prompt: Union[str, List[Dict[str, str]]],
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
         """Generate text from prompt"""
         self._check_initialized()
 
@@ -58,21 +161,20 @@ class LLMService(BaseService):
 
             logger.info(f"Formatted messages: {messages}")
 
-            # Generate response - litellm.completion is synchronous
-            response = completion(
-                model=self._config["path"],
-                messages=messages,
-                api_key=self._config["api_key"],
-            )
-            response_text = response.choices[0].message.content
+            response_text = await self._complete(messages, priority)
             logger.info(f"Generated response: {response_text}")
             return response_text
 
+        except RateLimitError as e:
+            logger.error(f"Generation rate limited after retries: {e}")
+            raise LLMRateLimitError(str(e)) from e
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             return f"Error: {str(e)}"
 
-    async def generate_with_context(self, question: str, context: str) -> str:
+    async def generate_with_context(
+        self, question: str, context: str, priority: Priority = Priority.INTERACTIVE
+    ) -> str:
         """Generate text with context"""
         self._check_initialized()
 
@@ -91,20 +193,26 @@ class LLMService(BaseService):
 
             logger.info(f"Formatted messages: {messages}")
 
-            # Generate response - litellm.completion is synchronous
-            response = completion(
-                model=self._config["path"],
-                messages=messages,
-                api_key=self._config["api_key"],
-            )
-            response_text = response.choices[0].message.content
+            response_text = await self._complete(messages, priority)
             logger.info(f"Generated response: {response_text}")
             return response_text
 
+        except RateLimitError as e:
+            logger.error(f"Generation rate limited after retries: {e}")
+            raise LLMRateLimitError(str(e)) from e
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             return f"Error: {str(e)}"
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get provider call, coalescing and rate limiter metrics"""
+        return {
+            "provider_calls": self._provider_calls,
+            "coalesced_calls": self._coalesced_calls,
+            "inflight_requests": len(self._inflight),
+            "rate_limiters": self.rate_limiters.get_metrics(),
+        }
+
 
 # Global service instance
 llm_service = LLMService()
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+from .base_service import BaseService
+from .config_service import config_service
+from .embeddings_service import EmbeddingsService, embeddings_service
+
+logger = logging.getLogger(__name__)
+
+# Namespaces are used as directory names
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class NamespaceService(BaseService):
+    """Per-tenant embeddings indexes persisted on disk and loaded on demand
+
+    Loaded namespaces are kept in least recently used order. When more than
+    NAMESPACES_MAX_LOADED are loaded, or their estimated memory exceeds
+    NAMESPACES_MEMORY_BUDGET_MB, the coldest namespaces not serving a request
+    are saved (if modified) and unloaded.
+
+    Every namespace index shares the global index's txtai models cache, so the
+    vector model is loaded once for all tenants and the memory budget only has
+    to cover each namespace's index data.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.config_service = config_service
+        self._loaded: "OrderedDict[str, EmbeddingsService]" = OrderedDict()
+        self._leases: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loads = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+        self._max_load_seconds = 0.0
+
+    async def initialize(self) -> None:
+        """Initialize namespace service"""
+        if not self.initialized:
+            self.settings = self.config_service.settings
+            self._initialized = True
+            logger.info(f"Namespace service initialized at {self.settings.NAMESPACES_PATH}")
+
+    def _path(self, namespace: str) -> str:
+        """Directory a namespace's index is saved to"""
+        if not NAMESPACE_PATTERN.match(namespace):
+            raise ValueError(f"Invalid namespace: {namespace}")
+        return os.path.join(self.settings.NAMESPACES_PATH, namespace)
+
+    @asynccontextmanager
+    async def lease(self, namespace: str) -> AsyncIterator[EmbeddingsService]:
+        """Use a namespace's index, loading it if needed
+
+        A leased namespace is never evicted, so requests in progress keep a
+        usable index.
+        """
+        self._check_initialized()
+        self._leases[namespace] = self._leases.get(namespace, 0) + 1
+        try:
+            yield await self._get(namespace)
+        finally:
+            self._leases[namespace] -= 1
+            if not self._leases[namespace]:
+                del self._leases[namespace]
+
+    async def _get(self, namespace: str) -> EmbeddingsService:
+        """Get a loaded namespace, loading it from disk on a miss"""
+        path = self._path(namespace)
+        if namespace in self._loaded:
+            self._loaded.move_to_end(namespace)
+            return self._loaded[namespace]
+
+        lock = self._locks.setdefault(namespace, asyncio.Lock())
+        async with lock:
+            if namespace in self._loaded:
+                self._loaded.move_to_end(namespace)
+                return self._loaded[namespace]
+
+            start = time.perf_counter()
+            service = EmbeddingsService(models=embeddings_service.models)
+            await service.initialize()
+            loaded = await asyncio.to_thread(service.load, path)
+            elapsed = time.perf_counter() - start
+
+            self._loads += 1
+            self._load_seconds += elapsed
+            self._max_load_seconds = max(self._max_load_seconds, elapsed)
+            logger.info(
+                f"{'Loaded' if loaded else 'Created'} namespace {namespace} in {elapsed:.3f}s"
+            )
+
+            self._loaded[namespace] = service
+            await self._enforce_budget()
+            return service
+
+    def _memory_usage(self) -> int:
+        return sum(service.memory_usage() for service in self._loaded.values())
+
+    async def _enforce_budget(self) -> None:
+        """Unload least recently used namespaces until within the configured limits"""
+        budget = self.settings.NAMESPACES_MEMORY_BUDGET_MB * 1024 * 1024
+        while (
+            len(self._loaded) > self.settings.NAMESPACES_MAX_LOADED or self._memory_usage() > budget
+        ):
+            # The most recently used namespace always stays loaded
+            cold = [
+                namespace for namespace in list(self._loaded)[:-1] if namespace not in self._leases
+            ]
+            if not cold:
+                break
+            await self.unload(cold[0])
+            self._evictions += 1
+
+    async def unload(self, namespace: str) -> None:
+        """Save a namespace if modified and release its index"""
+        # Hold the namespace lock so it isn't reloaded from disk mid-save
+        async with self._locks.setdefault(namespace, asyncio.Lock()):
+            service = self._loaded.pop(namespace, None)
+            if service is None:
+                return
+            if service.modified:
+                await asyncio.to_thread(service.save, self._path(namespace))
+            service.close()
+            logger.info(f"Unloaded namespace {namespace}")
+
+    async def flush(self) -> None:
+        """Save every modified namespace"""
+        for namespace, service in list(self._loaded.items()):
+            if service.modified:
+                await asyncio.to_thread(service.save, self._path(namespace))
+
+    async def shutdown(self) -> None:
+        """Save and unload every namespace"""
+        for namespace in list(self._loaded):
+            await self.unload(namespace)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get namespace load and eviction metrics"""
+        return {
+            "loaded": list(self._loaded),
+            "memory_bytes": self._memory_usage(),
+            "loads": self._loads,
+            "evictions": self._evictions,
+            "avg_load_seconds": self._load_seconds / self._loads if self._loads else 0.0,
+            "max_load_seconds": self._max_load_seconds,
+        }
+
+
+# Global service instance
+namespace_service = NamespaceService()
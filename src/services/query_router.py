@@ -0,0 +1,116 @@
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from txtai.embeddings import Embeddings
+from txtai.embeddings.search import Search
+
+# Retrieval paths a query can be sent down
+PATHS = ("sparse", "dense", "hybrid")
+
+# Tokens that look like identifiers, codes or versions rather than words
+ID_TOKEN = re.compile(r"^(?=.*\d)[\w./:#-]+$|^\w+[_/:#.-][\w./:#-]*\w$")
+
+# Number of recent latencies kept per path for percentiles
+LATENCY_WINDOW = 1000
+
+
+def path_search(
+    embeddings: Embeddings, query: str, limit: Optional[int] = None, path: str = "hybrid", **kwargs
+) -> List[Any]:
+    """Run a query against one retrieval path of a hybrid index
+
+    A sparse search skips encoding the query with the vector model and a dense
+    search skips BM25 scoring. Falls back to a regular search when the index
+    doesn't have both a sparse and a dense index.
+    """
+    if path not in PATHS:
+        raise ValueError(f"Unknown search path: {path}")
+    if path == "hybrid" or not (embeddings.ann and embeddings.issparse()):
+        return embeddings.search(query, limit, **kwargs)
+
+    search = Search(embeddings)
+    if path == "sparse":
+        search.ann = None
+    else:
+        search.scoring = None
+
+    results = search([query], limit, kwargs.get("weights"), None, [kwargs.get("parameters")])
+    return results[0] if results else results
+
+
+class QueryRouter:
+    """Classify queries onto the sparse, dense or hybrid retrieval path
+
+    Rules (``{"pattern": <regex>, "path": <path>}``) are checked first and the
+    first match wins. Otherwise queries containing identifier-like tokens or
+    with at most ``sparse_max_tokens`` words go to the BM25 index only, queries
+    of at least ``dense_min_tokens`` words to the dense index only, and
+    everything else to hybrid search.
+    """
+
+    def __init__(
+        self,
+        sparse_max_tokens: int = 2,
+        dense_min_tokens: int = 12,
+        rules: Optional[List[Dict[str, str]]] = None,
+    ):
+        self.sparse_max_tokens = sparse_max_tokens
+        self.dense_min_tokens = dense_min_tokens
+        self.rules = []
+        for rule in rules or []:
+            if rule["path"] not in PATHS:
+                raise ValueError(f"Unknown search path in router rule: {rule['path']}")
+            self.rules.append((re.compile(rule["pattern"]), rule["path"]))
+
+        self._latencies: Dict[str, Deque[float]] = {
+            path: deque(maxlen=LATENCY_WINDOW) for path in PATHS
+        }
+        self._counts: Dict[str, int] = {path: 0 for path in PATHS}
+
+    @classmethod
+    def from_settings(cls, settings) -> "QueryRouter":
+        return cls(
+            settings.EMBEDDINGS_ROUTER_SPARSE_MAX_TOKENS,
+            settings.EMBEDDINGS_ROUTER_DENSE_MIN_TOKENS,
+            settings.EMBEDDINGS_ROUTER_RULES,
+        )
+
+    def route(self, query: str) -> str:
+        """Retrieval path for a query"""
+        for pattern, path in self.rules:
+            if pattern.search(query):
+                return path
+
+        tokens = query.split()
+        if not tokens:
+            return "hybrid"
+        if len(tokens) <= self.sparse_max_tokens:
+            return "sparse"
+        if any(ID_TOKEN.match(token.strip("\"'()[]{},;?!")) for token in tokens):
+            return "sparse"
+        if len(tokens) >= self.dense_min_tokens:
+            return "dense"
+        return "hybrid"
+
+    def record(self, path: str, seconds: float) -> None:
+        """Record the latency of a query on a path"""
+        self._counts[path] += 1
+        self._latencies[path].append(seconds)
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> float:
+        index = min(int(len(values) * percentile), len(values) - 1)
+        return values[index] * 1000
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get query count and latency percentiles (over recent queries) per path"""
+        metrics = {}
+        for path in PATHS:
+            latencies = sorted(self._latencies[path])
+            metrics[path] = {
+                "queries": self._counts[path],
+                "p50_ms": self._percentile(latencies, 0.5) if latencies else 0.0,
+                "p95_ms": self._percentile(latencies, 0.95) if latencies else 0.0,
+            }
+        return metrics
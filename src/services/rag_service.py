@@ -1,9 +1,15 @@
+import asyncio
 import logging
-from typing import List, Dict, Any
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from .base_service import BaseService
 from .embeddings_service import embeddings_service
 from .config_service import config_service
 from .llm_service import llm_service
+from .rate_limiter import Priority
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +23,14 @@ class RAGService(BaseService):
         self.embeddings_service = embeddings_service
         self.config_service = config_service
         self.llm_service = llm_service
+        # Scores (query, texts) and returns (index, score) pairs, best first
+        self.reranker: Optional[Callable[[str, List[str]], List[Tuple[int, float]]]] = None
+        self._rerank_pool: Optional[ThreadPoolExecutor] = None
+        self._rerank_slots: Optional[threading.BoundedSemaphore] = None
+        self._reranks = 0
+        self._rerank_fallbacks = 0
+        self._rerank_skips = 0
+        self._rerank_seconds = 0.0
 
     async def initialize(self) -> None:
         """Initialize RAG service"""
@@ -24,13 +38,24 @@ class RAGService(BaseService):
             try:
                 # Get settings from config service
                 self.settings = self.config_service.settings
+                if self.settings.RAG_RERANK_MODEL and self.reranker is None:
+                    from txtai.pipeline import Similarity
+
+                    self.reranker = Similarity(self.settings.RAG_RERANK_MODEL, crossencode=True)
+                workers = max(1, self.settings.RAG_RERANK_WORKERS)
+                self._rerank_pool = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="rerank"
+                )
+                self._rerank_slots = threading.BoundedSemaphore(workers)
                 self._initialized = True
                 logger.info("RAG service initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize RAG service: {e}")
                 raise
 
-    async def generate(self, query: str) -> str:
+    async def generate(
+        self, query: str, limit: int = 3, priority: Priority = Priority.INTERACTIVE
+    ) -> str:
         """Generate response using RAG"""
         self._check_initialized()
 
@@ -39,29 +64,76 @@ class RAGService(BaseService):
 
         try:
             # Get context
-            context = await self.get_context(query)
-            if not context:
-                return "No relevant context found to answer the question."
-
-            # Generate response using LLM with context
-            response = await self.llm_service.generate_with_context(query, context)
-            return response
+            context = await self.get_context(query, limit)
+            return await self.generate_from_context(query, context, priority)
 
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             raise
 
+    async def generate_from_context(
+        self, query: str, context: str, priority: Priority = Priority.INTERACTIVE
+    ) -> str:
+        """Generate a response from context that was already built for the query"""
+        self._check_initialized()
+        if not context:
+            return "No relevant context found to answer the question."
+
+        # Generate response using LLM with context
+        return await self.llm_service.generate_with_context(query, context, priority)
+
+    async def generate_batch(self, queries: List[str], limit: int = 3) -> List[str]:
+        """Generate responses for a batch of queries at batch priority
+
+        Batch completions queue behind interactive requests for LLM capacity,
+        so offline jobs don't slow down users.
+        """
+        self._check_initialized()
+        return await asyncio.gather(
+            *[self.generate(query, limit, Priority.BATCH) for query in queries]
+        )
+
     async def search_context(
-        self, query: str, limit: int = 3, min_score: float = 0.3
+        self,
+        query: str,
+        limit: int = 3,
+        min_score: float = 0.3,
+        rerank: Optional[bool] = None,
+        budget_ms: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
-        """Search for relevant context"""
+        """Search for relevant context
+
+        With a reranker configured, RAG_RERANK_CANDIDATES results are retrieved
+        and reranked, and the top ``limit`` by rerank score are returned. The
+        min_score cutoff only applies to first-stage scores, so it isn't used
+        on reranked results. If reranking takes longer than the budget, or
+        every rerank worker is busy, the first-stage results are used instead.
+
+        Args:
+            query: Search query
+            limit: Number of passages to return
+            min_score: Minimum first-stage score
+            rerank: Rerank candidates, defaults to True when a reranker is configured
+            budget_ms: Rerank time budget, defaults to RAG_RERANK_BUDGET_MS
+        """
         self._check_initialized()
         try:
+            rerank = self.reranker is not None if rerank is None else rerank
+            if rerank and self.reranker is None:
+                raise ValueError("No rerank model configured")
+
             # Search for documents
-            results = await self.embeddings_service.search(query, limit=limit)
+            candidates = max(limit, self.settings.RAG_RERANK_CANDIDATES) if rerank else limit
+            results = await self.embeddings_service.search(query, limit=candidates)
+
+            if rerank and results:
+                reranked = await self._rerank(query, results, budget_ms)
+                if reranked is not None:
+                    logger.info(f"Reranked {len(results)} candidates")
+                    return reranked[:limit]
 
             # Filter by minimum score
-            filtered_results = [r for r in results if r["score"] > min_score]
+            filtered_results = [r for r in results if r["score"] > min_score][:limit]
             logger.info(f"Found {len(filtered_results)} relevant documents above score threshold")
 
             return filtered_results
@@ -70,23 +142,159 @@ class RAGService(BaseService):
             logger.error(f"Context search failed: {e}")
             raise
 
+    async def _rerank(
+        self, query: str, results: List[Dict[str, Any]], budget_ms: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rerank results within a time budget
+
+        Scoring runs on RAG_RERANK_WORKERS dedicated threads. A scoring thread
+        can't be interrupted, so one that overruns the budget keeps its worker
+        until it finishes and its scores are discarded. Requests arriving while
+        every worker is busy skip reranking rather than queue behind them.
+
+        Returns None if reranking was skipped or exceeded the budget.
+        """
+        budget = self.settings.RAG_RERANK_BUDGET_MS if budget_ms is None else budget_ms
+        slots = self._rerank_slots
+        if not slots.acquire(blocking=False):
+            self._rerank_skips += 1
+            logger.warning("All rerank workers busy, using first-stage order")
+            return None
+
+        def score(texts: List[str]) -> List[Tuple[int, float]]:
+            try:
+                return self.reranker(query, texts)
+            finally:
+                slots.release()
+
+        start = time.perf_counter()
+        try:
+            future = self._rerank_pool.submit(score, [r["text"] for r in results])
+        except BaseException:
+            slots.release()
+            raise
+        try:
+            scores = await asyncio.wait_for(asyncio.wrap_future(future), timeout=budget / 1000)
+        except asyncio.TimeoutError:
+            self._rerank_fallbacks += 1
+            logger.warning(f"Rerank exceeded {budget}ms budget, using first-stage order")
+            return None
+
+        self._reranks += 1
+        self._rerank_seconds += time.perf_counter() - start
+        return [
+            {**results[index], "score": float(score), "retrieval_score": results[index]["score"]}
+            for index, score in scores
+        ]
+
     async def get_context(self, query: str, limit: int = 3) -> str:
         """Get context for query"""
+        context = await self.build_context(query, limit=limit)
+        return context["context"]
+
+    async def build_context(self, query: str, limit: int = 3) -> Dict[str, Any]:
+        """Pack the most relevant passages into the configured token budget
+
+        Passages are taken in score order, near-duplicates of already packed
+        passages are dropped, and a passage that overflows the remaining
+        budget is truncated if enough budget is left, otherwise skipped.
+        """
         self._check_initialized()
         try:
             # Search for relevant documents
             results = await self.search_context(query, limit=limit)
+            results = sorted(results, key=lambda r: r["score"], reverse=True)
 
-            # Combine context from relevant documents
-            context = " ".join([r["text"] for r in results])
-            logger.info(f"Generated context of length: {len(context)}")
+            budget = self.settings.RAG_CONTEXT_MAX_TOKENS
+            passages: List[str] = []
+            shingles: List[Set[str]] = []
+            documents: List[str] = []
+            tokens = 0
+            dropped = 0
 
-            return context
+            for result in results:
+                text = result["text"].strip()
+                shingle = self._shingles(text)
+                if any(
+                    self._similarity(shingle, packed) >= self.settings.RAG_DEDUP_THRESHOLD
+                    for packed in shingles
+                ):
+                    dropped += 1
+                    continue
+
+                remaining = budget - tokens
+                count = self.llm_service.count_tokens(text)
+                if count > remaining:
+                    if remaining < self.settings.RAG_MIN_PASSAGE_TOKENS:
+                        dropped += 1
+                        continue
+                    text = self._truncate(text, remaining)
+                    if not text:
+                        dropped += 1
+                        continue
+                    count = self.llm_service.count_tokens(text)
+
+                passages.append(text)
+                shingles.append(shingle)
+                documents.append(result["id"])
+                tokens += count
+
+            context = "\n\n".join(passages)
+            logger.info(
+                f"Packed {len(passages)} passages into {tokens}/{budget} tokens "
+                f"({dropped} dropped)"
+            )
+
+            return {
+                "context": context,
+                "tokens": tokens,
+                "documents": documents,
+                "dropped": dropped,
+            }
 
         except Exception as e:
             logger.error(f"Failed to get context: {e}")
             raise
 
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Truncate text on word boundaries to at most max_tokens tokens"""
+        words = text.split()
+        count = self.llm_service.count_tokens(text)
+        keep = int(len(words) * max_tokens / count)
+        while keep > 0:
+            truncated = " ".join(words[:keep])
+            if self.llm_service.count_tokens(truncated) <= max_tokens:
+                return truncated
+            keep = int(keep * 0.9)
+        return ""
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> Set[str]:
+        """Word n-gram shingles used for near-duplicate detection"""
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < size:
+            return {" ".join(words)}
+        return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _similarity(a: Set[str], b: Set[str]) -> float:
+        """Jaccard similarity of two shingle sets"""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get rerank metrics"""
+        return {
+            "reranker": self.settings.RAG_RERANK_MODEL if self.reranker else None,
+            "reranks": self._reranks,
+            "rerank_fallbacks": self._rerank_fallbacks,
+            "rerank_skips": self._rerank_skips,
+            "avg_rerank_ms": (
+                self._rerank_seconds * 1000 / self._reranks if self._reranks else 0.0
+            ),
+        }
+
 
 # Global service instance
 rag_service = RAGService()
@@ -0,0 +1,138 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Request priority - lower values are served first"""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Take tokens from the bucket, allowing it to go into debt"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the provider reports a rate limit"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min limiter with a priority wait queue
+
+    Only the highest priority (then oldest) waiter may take capacity, so
+    interactive requests overtake queued batch requests.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._waiters: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for capacity"""
+        return len(self._waiters)
+
+    async def acquire(self, tokens: int, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Wait until one request and ``tokens`` tokens can be taken"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        entry = (int(priority), next(self._counter))
+        async with self._condition:
+            heapq.heappush(self._waiters, entry)
+            self._condition.notify_all()
+            try:
+                while True:
+                    if self._waiters[0] == entry:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait == 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            return
+                    else:
+                        wait = None
+
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def record_usage(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the real token usage is known"""
+        if actual > estimated:
+            self.tokens.consume(actual - estimated)
+        elif actual < estimated:
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + estimated - actual)
+
+    def penalize(self) -> None:
+        """Stop all callers until the buckets refill after a provider rate limit"""
+        self.requests.drain()
+        self.tokens.drain()
+
+
+class RateLimiterRegistry:
+    """Rate limiters keyed by provider/model"""
+
+    def __init__(self):
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def get(self, key: str, requests_per_minute: float, tokens_per_minute: float) -> RateLimiter:
+        """Get or create the limiter for a provider/model key"""
+        if key not in self._limiters:
+            self._limiters[key] = RateLimiter(requests_per_minute, tokens_per_minute)
+            logger.info(
+                f"Created rate limiter for {key}: "
+                f"{requests_per_minute:.0f} req/min, {tokens_per_minute:.0f} tokens/min"
+            )
+        return self._limiters[key]
+
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Get queue depth and available capacity per limiter"""
+        return {
+            key: {
+                "queued": limiter.queued,
+                "available_requests": limiter.requests.tokens,
+                "available_tokens": limiter.tokens.tokens,
+            }
+            for key, limiter in self._limiters.items()
+        }
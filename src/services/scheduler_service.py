@@ -0,0 +1,185 @@
+import logging
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Deque, Dict, Any, List, Optional, Set
+from .base_service import BaseService
+from .communication_service import communication_service
+from .config_service import config_service
+from src.models.messages import Message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    """A message waiting to be handled and the queue its responses go to"""
+
+    message: Message
+    submitted: float = field(default_factory=time.monotonic)
+    responses: asyncio.Queue = field(default_factory=asyncio.Queue)
+    abandoned: bool = False
+    handler: Optional[asyncio.Task] = None
+
+
+_DONE = object()
+
+
+class SchedulerService(BaseService):
+    """Worker-pool dispatcher in front of the communication service
+
+    Messages from different sessions are handled concurrently by up to
+    ``SCHEDULER_MAX_WORKERS`` workers, while messages within a session are
+    handled strictly in submission order. When the consumer of a message's
+    responses goes away, its handler is cancelled, or skipped if it hasn't
+    started, so disconnected clients don't hold workers.
+    """
+
+    def __init__(self):
+        """Initialize scheduler service"""
+        super().__init__()
+        self.communication_service = communication_service
+        self.config_service = config_service
+        self._pending: Dict[str, Deque[_Job]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scheduled: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+        self._busy_workers = 0
+        self._busy_time = 0.0
+        self._started = 0.0
+        self._processed = 0
+        self._abandoned = 0
+        self._dequeued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def initialize(self) -> None:
+        """Initialize scheduler service"""
+        if not self.initialized:
+            try:
+                # Get settings from config service
+                self.settings = self.config_service.settings
+                self._initialized = True
+                logger.info("Scheduler service initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize scheduler service: {e}")
+                raise
+
+    def _ensure_workers(self) -> None:
+        """Start the worker pool on the running event loop if it is not already running there"""
+        loop = asyncio.get_running_loop()
+        if self._workers and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._ready = asyncio.Queue()
+        self._pending.clear()
+        self._scheduled.clear()
+        self._started = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.settings.SCHEDULER_MAX_WORKERS)
+        ]
+        logger.info(f"Started {len(self._workers)} scheduler workers")
+
+    async def shutdown(self) -> None:
+        """Stop the worker pool"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Scheduler workers stopped")
+
+    async def dispatch(self, message: Message) -> AsyncGenerator[Message, None]:
+        """Queue a message for handling and yield its responses as they are produced"""
+        self._check_initialized()
+        self._ensure_workers()
+        job = _Job(message=message)
+        self._pending.setdefault(message.session_id, deque()).append(job)
+        if message.session_id not in self._scheduled:
+            self._scheduled.add(message.session_id)
+            self._ready.put_nowait(message.session_id)
+
+        try:
+            while True:
+                response = await job.responses.get()
+                if response is _DONE:
+                    break
+                yield response
+        finally:
+            job.abandoned = True
+            if job.handler is not None and not job.handler.done():
+                job.handler.cancel()
+
+    async def _handle(self, job: _Job) -> None:
+        """Handle a job's message, queueing its responses"""
+        async for response in self.communication_service.handle_message(job.message):
+            job.responses.put_nowait(response)
+
+    def _release(self, session_id: str) -> None:
+        """Requeue a session at the back if it has more messages, so other sessions get a turn"""
+        if self._pending[session_id]:
+            self._ready.put_nowait(session_id)
+        else:
+            del self._pending[session_id]
+            self._scheduled.discard(session_id)
+
+    async def _worker(self, worker_id: int) -> None:
+        """Take the next ready session and handle its oldest message"""
+        while True:
+            session_id = await self._ready.get()
+            job = self._pending[session_id].popleft()
+
+            # Skip messages whose consumer went away while they were queued
+            if job.abandoned:
+                self._abandoned += 1
+                self._release(session_id)
+                continue
+
+            wait = time.monotonic() - job.submitted
+            self._dequeued += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+            self._busy_workers += 1
+            start = time.monotonic()
+            # The handler runs as its own task so dispatch can cancel it
+            job.handler = asyncio.create_task(self._handle(job))
+            try:
+                await asyncio.wait({job.handler})
+            finally:
+                # Only still running here when the worker itself was cancelled
+                if not job.handler.done():
+                    job.handler.cancel()
+                job.responses.put_nowait(_DONE)
+                self._busy_workers -= 1
+                self._busy_time += time.monotonic() - start
+                self._processed += 1
+                self._release(session_id)
+
+            if job.handler.cancelled():
+                self._abandoned += 1
+            elif job.handler.exception():
+                logger.error(
+                    f"Worker {worker_id} failed handling message: {job.handler.exception()}"
+                )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue wait and worker utilization metrics"""
+        workers = len(self._workers)
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            "workers": workers,
+            "busy_workers": self._busy_workers,
+            "queued_messages": sum(len(jobs) for jobs in self._pending.values()),
+            "processed_messages": self._processed,
+            "abandoned_messages": self._abandoned,
+            "avg_wait_seconds": self._wait_total / self._dequeued if self._dequeued else 0.0,
+            "max_wait_seconds": self._wait_max,
+            "utilization": (self._busy_time / (workers * elapsed) if workers and elapsed else 0.0),
+        }
+
+
+# Global service instance
+scheduler_service = SchedulerService()
@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from txtai.embeddings import Embeddings
+
+from .query_router import path_search
+
+logger = logging.getLogger(__name__)
+
+# Patterns used to merge per-shard SQL results
+COUNT_QUERY = re.compile(r"^\s*select\s+count\s*\(", re.IGNORECASE)
+ORDER_BY_ID = re.compile(r"\border\s+by\s+id\b", re.IGNORECASE)
+LIMIT_CLAUSE = re.compile(r"\blimit\s+(\d+)\s*$", re.IGNORECASE)
+
+# Query text of similar() clauses, as a string literal or a bound parameter
+SIMILAR_LITERAL = re.compile(r"\bsimilar\s*\(\s*'([^']*)'", re.IGNORECASE)
+SIMILAR_PARAMETER = re.compile(r"\bsimilar\s*\(\s*:(\w+)", re.IGNORECASE)
+
+
+def shard_key(row_id: str) -> str:
+    """Key a row is partitioned on - passages (``<doc_id>#<n>``) stay with their document"""
+    return str(row_id).split("#", 1)[0]
+
+
+class ShardedEmbeddings:
+    """Hash-partitioned set of txtai Embeddings indexes searched in parallel
+
+    Rows are routed to the shard owning their document id. Searches fan out to
+    every shard on a thread pool (Faiss releases the GIL) and per-shard results
+    are merged: by score for similarity queries, by id for ``ORDER BY id``
+    listings and summed for ``COUNT(*)``.
+
+    The factory should give every shard the same txtai ``models`` cache so the
+    vector model is loaded once. Query text is encoded once per search and the
+    vector handed to every shard instead of each shard encoding it again.
+    Encoding through the shared model is serialized, so writes, which encode
+    their documents, go to one shard at a time.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], shards: int):
+        self.shards: List[Embeddings] = [factory() for _ in range(shards)]
+        self.pool = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="shard")
+        # Query vectors encoded for searches in progress, keyed by query text
+        self._queries: Dict[str, np.ndarray] = {}
+        # The shared vector model's tokenizer isn't safe to call from several threads
+        self._encode_lock = threading.RLock()
+        self._batchtransform = [shard.batchtransform for shard in self.shards]
+        for shard in self.shards:
+            shard.batchtransform = self._shared_batchtransform(shard.batchtransform)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.shards[0].config
+
+    def shard_index(self, row_id: str) -> int:
+        """Position of the shard that stores a row id"""
+        digest = hashlib.md5(shard_key(row_id).encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % len(self.shards)
+
+    def owner(self, row_id: str) -> Embeddings:
+        """Shard that stores a row id"""
+        return self.shards[self.shard_index(row_id)]
+
+    def _partition(self, items: List[Any], key: Callable[[Any], str]) -> Dict[int, List[Any]]:
+        """Group items by the position of their owning shard"""
+        partitions: Dict[int, List[Any]] = {i: [] for i in range(len(self.shards))}
+        for item in items:
+            partitions[self.shard_index(key(item))].append(item)
+        return partitions
+
+    def _map(self, function: Callable[[int, Embeddings], Any]) -> List[Any]:
+        """Run a function against every shard in parallel"""
+        futures = [self.pool.submit(function, i, shard) for i, shard in enumerate(self.shards)]
+        return [future.result() for future in futures]
+
+    def index(self, documents: List[tuple]) -> None:
+        """Rebuild every shard from its partition of the documents"""
+        partitions = self._partition(list(documents), lambda row: row[0])
+        self._map(lambda i, shard: self._locked(self._rebuild, shard, partitions[i]))
+
+    def _locked(self, function: Callable, *args) -> Any:
+        """Run a write that encodes documents while holding the shared model"""
+        with self._encode_lock:
+            return function(*args)
+
+    @staticmethod
+    def _rebuild(shard: Embeddings, documents: List[tuple]) -> None:
+        # txtai drops the content database when indexing nothing, so empty
+        # shards are reset the same way the service creates an empty index
+        if documents:
+            shard.index(documents)
+        else:
+            shard.index([("init", "init", "{}")])
+            shard.delete(["init"])
+
+    def upsert(self, documents: List[tuple]) -> None:
+        """Append or replace documents on their owning shards"""
+        partitions = self._partition(list(documents), lambda row: row[0])
+        self._map(
+            lambda i, shard: self._locked(shard.upsert, partitions[i]) if partitions[i] else None
+        )
+
+    def delete(self, ids: List[str]) -> List[str]:
+        """Delete ids from their owning shards"""
+        partitions = self._partition(list(ids), lambda row_id: row_id)
+        deleted = self._map(lambda i, shard: shard.delete(partitions[i]) if partitions[i] else [])
+        return [row_id for shard_deleted in deleted for row_id in shard_deleted]
+
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards)
+
+    def batchtransform(self, documents, category: Optional[str] = None):
+        return self.shards[0].batchtransform(documents, category)
+
+    def _shared_batchtransform(self, batchtransform: Callable) -> Callable:
+        """Wrap a shard's batchtransform to use query vectors already encoded for this search"""
+
+        def shared(documents, category=None, index=None):
+            documents = list(documents)
+            if category in (None, "query") and documents and self._queries:
+                vectors = [self._queries.get(self._text(document)) for document in documents]
+                if all(vector is not None for vector in vectors):
+                    return np.array(vectors, dtype=np.float32)
+            with self._encode_lock:
+                return batchtransform(documents, category, index)
+
+        return shared
+
+    @staticmethod
+    def _text(document: Any) -> Optional[str]:
+        text = document[1] if isinstance(document, tuple) else document
+        return text if isinstance(text, str) else None
+
+    @staticmethod
+    def _similar_texts(query: str, parameters: Optional[Dict[str, Any]]) -> List[str]:
+        """Query texts a search will encode, best effort - missed texts are encoded per shard"""
+        if not query.lstrip().lower().startswith("select"):
+            return [query]
+        texts = SIMILAR_LITERAL.findall(query)
+        for name in SIMILAR_PARAMETER.findall(query):
+            value = (parameters or {}).get(name)
+            if isinstance(value, str):
+                texts.append(value)
+        return texts
+
+    def search(
+        self, query: str, limit: Optional[int] = None, path: str = "hybrid", **kwargs
+    ) -> List[Any]:
+        """Scatter a query to every shard and gather the merged top results"""
+        texts = []
+        if path != "sparse" and self.shards[0].ann:
+            texts = [t for t in self._similar_texts(query, kwargs.get("parameters")) if t]
+
+        # Encode the query once, on the calling thread, for every shard to share
+        if texts:
+            with self._encode_lock:
+                vectors = self._batchtransform[0]([(None, text, None) for text in texts])
+            self._queries.update(zip(texts, vectors))
+        try:
+            results = self._map(lambda i, shard: path_search(shard, query, limit, path, **kwargs))
+        finally:
+            for text in texts:
+                self._queries.pop(text, None)
+
+        if COUNT_QUERY.match(query):
+            merged = dict(results[0][0]) if results[0] else {}
+            for key in merged:
+                merged[key] = sum(rows[0][key] for rows in results if rows)
+            return [merged]
+
+        rows = [row for shard_rows in results for row in shard_rows]
+        if ORDER_BY_ID.search(query):
+            rows.sort(key=lambda row: row["id"])
+        elif rows and isinstance(rows[0], dict) and "score" in rows[0]:
+            rows.sort(key=lambda row: row["score"], reverse=True)
+        elif rows and isinstance(rows[0], tuple):
+            rows.sort(key=lambda row: row[1], reverse=True)
+
+        # Same default as txtai: an explicit limit, else the SQL LIMIT clause, else 3
+        if limit is None:
+            match = LIMIT_CLAUSE.search(query.strip())
+            limit = int(match.group(1)) if match else 3
+        return rows[:limit]
+
+    def save(self, path: str) -> None:
+        """Save every shard under ``path``"""
+        self._map(lambda i, shard: shard.save(os.path.join(path, f"shard-{i}")))
+
+    def load(self, path: str) -> None:
+        """Load every shard saved under ``path``"""
+        self._map(lambda i, shard: shard.load(os.path.join(path, f"shard-{i}")))
+
+    def exists(self, path: str) -> bool:
+        return all(
+            shard.exists(os.path.join(path, f"shard-{i}")) for i, shard in enumerate(self.shards)
+        )
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .base_service import BaseService
+from .config_service import config_service
+from .embeddings_service import EmbeddingsService
+from .snapshot_store import SnapshotStore, checksum, create_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+# Snapshot names are used in store keys and local directory names
+SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Location of a chunk in a local file: (path, offset, length)
+Location = Tuple[str, int, int]
+
+
+class SnapshotService(BaseService):
+    """Incremental index snapshots in a content-addressed object store
+
+    A saved index directory is split into fixed-size chunks keyed by their
+    sha256. A snapshot uploads only chunks the store doesn't already have and
+    writes a manifest listing each file's chunks. Restoring reuses chunks that
+    already exist in the local copy and downloads only the rest. Transfers run
+    in parallel and every downloaded chunk is verified against its checksum.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.config_service = config_service
+        self.store: Optional[SnapshotStore] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._uploaded_chunks = 0
+        self._skipped_chunks = 0
+        self._downloaded_chunks = 0
+        self._reused_chunks = 0
+        self._uploaded_bytes = 0
+        self._downloaded_bytes = 0
+
+    async def initialize(self) -> None:
+        """Initialize snapshot store"""
+        if not self.initialized:
+            try:
+                self.settings = self.config_service.settings
+                self.store = create_snapshot_store(self.settings)
+                self._initialized = True
+                logger.info(f"Snapshot service initialized with {self.settings.SNAPSHOT_BACKEND}")
+            except Exception as e:
+                logger.error(f"Failed to initialize snapshot service: {e}")
+                raise
+
+    @staticmethod
+    def _key(name: str, namespace: Optional[str] = None) -> str:
+        """Store prefix of a snapshot, scoped to the namespace of the index it was taken from
+
+        Snapshots of the default index live under "default" and namespace
+        snapshots under "namespaces/<namespace>", so a namespace can't read or
+        overwrite another index's snapshots.
+        """
+        if not SNAPSHOT_NAME.match(name):
+            raise ValueError(f"Invalid snapshot name: {name}")
+        if namespace is None:
+            return f"default/{name}"
+        if not SNAPSHOT_NAME.match(namespace):
+            raise ValueError(f"Invalid namespace: {namespace}")
+        return f"namespaces/{namespace}/{name}"
+
+    def _workdir(self, key: str) -> str:
+        """Local directory a snapshot is saved to and restored from"""
+        return os.path.join(self.settings.SNAPSHOT_WORKDIR, *key.split("/"))
+
+    @staticmethod
+    def _scan(directory: str, chunk_size: int) -> Tuple[Dict[str, Any], Dict[str, Location]]:
+        """Hash every file under a directory into chunks
+
+        Returns the manifest file entries and where each chunk can be read locally.
+        """
+        files, locations = {}, {}
+        for root, _, names in os.walk(directory):
+            for filename in sorted(names):
+                # Skip partial files left by an interrupted restore
+                if filename.endswith(".restore"):
+                    continue
+                path = os.path.join(root, filename)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                hashes = []
+                with open(path, "rb") as handle:
+                    offset = 0
+                    while data := handle.read(chunk_size):
+                        digest = checksum(data)
+                        hashes.append(digest)
+                        locations.setdefault(digest, (path, offset, len(data)))
+                        offset += len(data)
+                files[relative] = {"size": offset, "chunks": hashes}
+        return files, locations
+
+    @staticmethod
+    def _read(location: Location) -> bytes:
+        path, offset, length = location
+        with open(path, "rb") as handle:
+            handle.seek(offset)
+            return handle.read(length)
+
+    async def _parallel(self, function: Callable[..., Any], items: Iterable[Any]) -> List[Any]:
+        """Run a blocking function over items on worker threads, bounded by SNAPSHOT_MAX_WORKERS"""
+        semaphore = asyncio.Semaphore(self.settings.SNAPSHOT_MAX_WORKERS)
+
+        async def run(item):
+            async with semaphore:
+                return await asyncio.to_thread(function, item)
+
+        return await asyncio.gather(*[run(item) for item in items])
+
+    def _manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        key = f"manifests/{key}.json"
+        if not self.store.exists(key):
+            return None
+        return json.loads(self.store.get(key))
+
+    async def snapshot(
+        self, service: EmbeddingsService, name: str = "default", namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Save a copy of an index and upload the chunks that changed since the last snapshot
+
+        ``namespace`` is the namespace the index belongs to, None for the default index.
+        """
+        self._check_initialized()
+        key = self._key(name, namespace)
+        workdir = self._workdir(key)
+        chunk_size = self.settings.SNAPSHOT_CHUNK_SIZE
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            # The copy leaves the index modified and on its own storage, so it
+            # is still saved to its usual location later
+            async with service.exclusive():
+                await asyncio.to_thread(service.save_copy, workdir)
+            files, locations = await asyncio.to_thread(self._scan, workdir, chunk_size)
+
+            # Chunks in the previous manifest are known to be stored already
+            previous = await asyncio.to_thread(self._manifest, key)
+            known = set()
+            if previous and previous["chunk_size"] == chunk_size:
+                known = {
+                    digest for entry in previous["files"].values() for digest in entry["chunks"]
+                }
+
+            def upload(digest: str) -> int:
+                key = f"chunks/{digest}"
+                if self.store.exists(key):
+                    return 0
+                data = self._read(locations[digest])
+                if checksum(data) != digest:
+                    raise ValueError(f"Chunk {digest} changed during snapshot")
+                self.store.put(key, data)
+                return len(data)
+
+            pending = [digest for digest in locations if digest not in known]
+            sizes = await self._parallel(upload, pending)
+            uploaded = sum(1 for size in sizes if size)
+
+            manifest = {"name": name, "chunk_size": chunk_size, "files": files}
+            await asyncio.to_thread(
+                self.store.put, f"manifests/{key}.json", json.dumps(manifest).encode("utf-8")
+            )
+
+            self._uploaded_chunks += uploaded
+            self._skipped_chunks += len(locations) - uploaded
+            self._uploaded_bytes += sum(sizes)
+            result = {
+                "files": len(files),
+                "chunks": len(locations),
+                "uploaded": uploaded,
+                "bytes": sum(sizes),
+            }
+            logger.info(f"Snapshot {key}: {result}")
+            return result
+
+    async def restore(
+        self, service: EmbeddingsService, name: str = "default", namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Fetch the chunks missing locally for a snapshot and load it into an index
+
+        Only snapshots taken from the same ``namespace`` can be restored.
+        """
+        self._check_initialized()
+        key = self._key(name, namespace)
+        workdir = self._workdir(key)
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            manifest = await asyncio.to_thread(self._manifest, key)
+            if manifest is None:
+                raise ValueError(f"Snapshot not found: {name}")
+            chunk_size = manifest["chunk_size"]
+
+            def write(item: Tuple[str, int, str]) -> int:
+                temp, offset, digest = item
+                data = self._read(local[digest]) if digest in local else None
+                fetched = 0
+                if data is None or checksum(data) != digest:
+                    data = self.store.get(f"chunks/{digest}")
+                    fetched = len(data)
+                    if checksum(data) != digest:
+                        raise ValueError(f"Checksum mismatch for chunk {digest}")
+                with open(temp, "r+b") as handle:
+                    handle.seek(offset)
+                    handle.write(data)
+                return fetched
+
+            # Writes wait until the restored index is swapped in
+            async with service.exclusive():
+                local: Dict[str, Location] = {}
+                if os.path.isdir(workdir):
+                    _, local = await asyncio.to_thread(self._scan, workdir, chunk_size)
+
+                # Rebuild each file into a temporary copy, reusing chunks from
+                # the current local files where possible
+                writes = []
+                for relative, entry in manifest["files"].items():
+                    temp = os.path.join(workdir, *relative.split("/")) + ".restore"
+                    os.makedirs(os.path.dirname(temp), exist_ok=True)
+                    with open(temp, "wb") as handle:
+                        handle.truncate(entry["size"])
+                    writes.extend(
+                        (temp, index * chunk_size, digest)
+                        for index, digest in enumerate(entry["chunks"])
+                    )
+
+                sizes = await self._parallel(write, writes)
+                await asyncio.to_thread(self._commit, workdir, manifest["files"])
+                await asyncio.to_thread(service.load, workdir)
+                # The restored index differs from what's saved at its usual location
+                service.modified = True
+
+            downloaded = sum(1 for size in sizes if size)
+            self._downloaded_chunks += downloaded
+            self._reused_chunks += len(sizes) - downloaded
+            self._downloaded_bytes += sum(sizes)
+            result = {
+                "files": len(manifest["files"]),
+                "chunks": len(sizes),
+                "downloaded": downloaded,
+                "bytes": sum(sizes),
+            }
+            logger.info(f"Restored snapshot {key}: {result}")
+            return result
+
+    @staticmethod
+    def _commit(workdir: str, files: Dict[str, Any]) -> None:
+        """Move restored files into place and remove files not in the snapshot"""
+        expected = set()
+        for relative in files:
+            path = os.path.join(workdir, *relative.split("/"))
+            os.replace(f"{path}.restore", path)
+            expected.add(os.path.normpath(path))
+
+        for root, _, names in os.walk(workdir):
+            for filename in names:
+                path = os.path.normpath(os.path.join(root, filename))
+                if path not in expected:
+                    os.remove(path)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get snapshot transfer metrics"""
+        return {
+            "uploaded_chunks": self._uploaded_chunks,
+            "skipped_chunks": self._skipped_chunks,
+            "downloaded_chunks": self._downloaded_chunks,
+            "reused_chunks": self._reused_chunks,
+            "uploaded_bytes": self._uploaded_bytes,
+            "downloaded_bytes": self._downloaded_bytes,
+        }
+
+
+# Global service instance
+snapshot_service = SnapshotService()
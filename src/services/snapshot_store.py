@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Key/value object store snapshots are written to
+
+    Keys are slash-separated paths. Implementations must be safe to call from
+    multiple threads, as chunks are transferred in parallel.
+    """
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+
+class LocalSnapshotStore(SnapshotStore):
+    """Snapshot store backed by a local directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as handle:
+            return handle.read()
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so readers never see a partial object
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as handle:
+            handle.write(data)
+        os.replace(temp, path)
+
+
+class GCSSnapshotStore(SnapshotStore):
+    """Snapshot store backed by a Google Cloud Storage bucket"""
+
+    def __init__(self, bucket: str, prefix: str = "", project: Optional[str] = None):
+        from google.cloud import storage
+
+        self.bucket = storage.Client(project=project).bucket(bucket)
+        self.prefix = prefix.strip("/")
+
+    def _blob(self, key: str):
+        return self.bucket.blob(f"{self.prefix}/{key}" if self.prefix else key)
+
+    def exists(self, key: str) -> bool:
+        return self._blob(key).exists()
+
+    def get(self, key: str) -> bytes:
+        return self._blob(key).download_as_bytes(checksum="crc32c")
+
+    def put(self, key: str, data: bytes) -> None:
+        self._blob(key).upload_from_string(data, checksum="crc32c")
+
+
+def create_snapshot_store(settings) -> SnapshotStore:
+    """Create the snapshot store configured in settings"""
+    if settings.SNAPSHOT_BACKEND == "local":
+        return LocalSnapshotStore(settings.SNAPSHOT_PATH)
+    if settings.SNAPSHOT_BACKEND == "gcs":
+        if not settings.GOOGLE_CLOUD_BUCKET:
+            raise ValueError("GOOGLE_CLOUD_BUCKET is required for the gcs snapshot backend")
+        return GCSSnapshotStore(
+            settings.GOOGLE_CLOUD_BUCKET,
+            f"{settings.EMBEDDINGS_PREFIX}/snapshots",
+            settings.GOOGLE_CLOUD_PROJECT,
+        )
+    raise ValueError(f"Unknown snapshot backend: {settings.SNAPSHOT_BACKEND}")
+
+
+def checksum(data: bytes) -> str:
+    """Content address of a chunk"""
+    return hashlib.sha256(data).hexdigest()
@@ -1,7 +1,8 @@
 import logging
 import asyncio
 import json
-from typing import AsyncGenerator, Dict, Any
+import time
+from typing import AsyncGenerator, Dict, Any, Optional
 from .base_service import BaseService
 from .rag_service import rag_service
 from .config_service import config_service
@@ -10,6 +11,14 @@ from src.models.messages import Message, MessageType
 logger = logging.getLogger(__name__)
 
 
+class StreamFullError(asyncio.QueueFull):
+    """A session stream is full under the "error" overflow policy"""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Stream full for session {session_id}")
+        self.session_id = session_id
+
+
 class StreamService(BaseService):
     """Service for handling streaming operations"""
 
@@ -19,6 +28,11 @@ class StreamService(BaseService):
         self.rag_service = rag_service
         self.config_service = config_service
         self._streams: Dict[str, asyncio.Queue] = {}
+        self._last_active: Dict[str, float] = {}
+        self._consumers: Dict[str, int] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._dropped_messages = 0
+        self._evicted_sessions = 0
 
     async def initialize(self) -> None:
         """Initialize stream service"""
@@ -36,7 +50,8 @@ class StreamService(BaseService):
         """Create a new stream for a session"""
         self._check_initialized()
         if session_id not in self._streams:
-            self._streams[session_id] = asyncio.Queue()
+            self._streams[session_id] = asyncio.Queue(maxsize=self.settings.STREAM_QUEUE_MAXSIZE)
+            self._touch(session_id)
             logger.info(f"Created stream for session: {session_id}")
 
     async def delete_stream(self, session_id: str) -> None:
@@ -44,15 +59,34 @@ class StreamService(BaseService):
         self._check_initialized()
         if session_id in self._streams:
             del self._streams[session_id]
+            self._last_active.pop(session_id, None)
             logger.info(f"Deleted stream for session: {session_id}")
 
     async def send_message(self, message: Message) -> None:
-        """Send a message to a stream"""
+        """Send a message to a stream, applying the configured overflow policy"""
         self._check_initialized()
         if message.session_id not in self._streams:
             await self.create_stream(message.session_id)
 
-        await self._streams[message.session_id].put(message)
+        queue = self._streams[message.session_id]
+        policy = self.settings.STREAM_OVERFLOW_POLICY
+        self._touch(message.session_id)
+
+        if policy == "drop_oldest":
+            if queue.full():
+                queue.get_nowait()
+                queue.task_done()
+                self._dropped_messages += 1
+                logger.warning(f"Dropped oldest message for session {message.session_id}")
+            queue.put_nowait(message)
+        elif policy == "error":
+            if queue.full():
+                logger.warning(f"Stream full for session {message.session_id}")
+                raise StreamFullError(message.session_id)
+            queue.put_nowait(message)
+        else:
+            await queue.put(message)
+
         logger.info(f"Sent message to session {message.session_id}: {message.type}")
 
     async def get_messages(self, session_id: str) -> AsyncGenerator[Message, None]:
@@ -61,15 +95,91 @@ class StreamService(BaseService):
         if session_id not in self._streams:
             await self.create_stream(session_id)
 
+        queue = self._streams[session_id]
+        self._consumers[session_id] = self._consumers.get(session_id, 0) + 1
         try:
             while True:
-                message = await self._streams[session_id].get()
+                message = await queue.get()
+                self._touch(session_id)
                 yield message
-                self._streams[session_id].task_done()
+                queue.task_done()
         except asyncio.CancelledError:
             logger.info(f"Stream cancelled for session: {session_id}")
             await self.delete_stream(session_id)
             raise
+        finally:
+            self._consumers[session_id] -= 1
+            if not self._consumers[session_id]:
+                del self._consumers[session_id]
+
+    def _touch(self, session_id: str) -> None:
+        """Record activity on a session"""
+        self._last_active[session_id] = time.monotonic()
+
+    async def evict_idle_streams(self) -> int:
+        """Delete streams idle for longer than the configured TTL
+
+        Sessions with an attached consumer are never evicted.
+        """
+        self._check_initialized()
+        cutoff = time.monotonic() - self.settings.STREAM_IDLE_TTL
+        idle = [
+            session_id
+            for session_id, last_active in self._last_active.items()
+            if last_active < cutoff and session_id not in self._consumers
+        ]
+        for session_id in idle:
+            await self.delete_stream(session_id)
+        if idle:
+            self._evicted_sessions += len(idle)
+            logger.info(f"Evicted {len(idle)} idle streams")
+        return len(idle)
+
+    async def _sweep(self) -> None:
+        """Periodically evict idle streams"""
+        while True:
+            await asyncio.sleep(self.settings.STREAM_SWEEP_INTERVAL)
+            try:
+                await self.evict_idle_streams()
+            except Exception as e:
+                logger.error(f"Stream sweep failed: {e}")
+
+    def start_sweeper(self) -> None:
+        """Start the background idle-stream sweeper"""
+        self._check_initialized()
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+            logger.info("Stream sweeper started")
+
+    async def stop_sweeper(self) -> None:
+        """Stop the background idle-stream sweeper"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+            logger.info("Stream sweeper stopped")
+
+    @property
+    def active_sessions(self) -> int:
+        """Number of open session streams"""
+        return len(self._streams)
+
+    @property
+    def queued_messages(self) -> int:
+        """Total messages waiting across all session streams"""
+        return sum(queue.qsize() for queue in self._streams.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get stream gauges and counters"""
+        return {
+            "active_sessions": self.active_sessions,
+            "queued_messages": self.queued_messages,
+            "dropped_messages": self._dropped_messages,
+            "evicted_sessions": self._evicted_sessions,
+        }
 
     async def process_rag_request(self, message: Message) -> AsyncGenerator[Message, None]:
         """Process a RAG request and stream responses"""
@@ -81,18 +191,18 @@ class StreamService(BaseService):
                 raise ValueError("Query not found in message data")
 
             # Get context
-            context = await self.rag_service.get_context(query)
+            context = await self.rag_service.build_context(query)
 
             # Send context message
             context_message = Message(
                 type=MessageType.RAG_CONTEXT,
-                data={"context": context},
+                data={"context": context["context"], "tokens": context["tokens"]},
                 session_id=message.session_id,
             )
             yield context_message
 
-            # Generate response
-            response = await self.rag_service.generate(query)
+            # Generate response from the same context the client was sent
+            response = await self.rag_service.generate_from_context(query, context["context"])
 
             # Send response message
             response_message = Message(
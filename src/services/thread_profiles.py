@@ -0,0 +1,90 @@
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Threading profiles: "latency" gives each request every core, suited to few
+# concurrent requests. "throughput" runs each request on one core and gets
+# parallelism from concurrent requests instead, avoiding oversubscription.
+# "default" leaves the libraries' own defaults alone.
+PROFILES = ("default", "latency", "throughput")
+
+
+def cpu_count() -> int:
+    """Cores this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_threads(settings, cores: Optional[int] = None) -> Dict[str, Optional[int]]:
+    """Thread counts for the configured profile, with explicit settings taking precedence
+
+    Returns intra-op, inter-op and Faiss OpenMP thread counts. None means leave
+    the library default.
+    """
+    profile = settings.EMBEDDINGS_THREAD_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown thread profile: {profile}")
+
+    cores = cores or cpu_count()
+    threads = {
+        "default": {"intra_op": None, "inter_op": None, "faiss": None},
+        "latency": {"intra_op": cores, "inter_op": 1, "faiss": cores},
+        "throughput": {"intra_op": 1, "inter_op": 1, "faiss": 1},
+    }[profile]
+
+    overrides = {
+        "intra_op": settings.EMBEDDINGS_INTRA_OP_THREADS,
+        "inter_op": settings.EMBEDDINGS_INTER_OP_THREADS,
+        "faiss": settings.EMBEDDINGS_FAISS_THREADS,
+    }
+    threads.update({name: value for name, value in overrides.items() if value})
+    return threads
+
+
+def apply_threads(
+    intra_op: Optional[int] = None, inter_op: Optional[int] = None, faiss: Optional[int] = None
+) -> Dict[str, Optional[int]]:
+    """Set torch and Faiss thread pools, returning the thread counts in effect
+
+    torch only allows the inter-op pool to be sized before it is first used,
+    so a later change is logged and skipped.
+    """
+    applied: Dict[str, Optional[int]] = {"intra_op": None, "inter_op": None, "faiss": None}
+
+    try:
+        import torch
+
+        if intra_op and torch.get_num_threads() != intra_op:
+            torch.set_num_threads(intra_op)
+        if inter_op and torch.get_num_interop_threads() != inter_op:
+            try:
+                torch.set_num_interop_threads(inter_op)
+            except RuntimeError as e:
+                logger.warning(f"Could not set torch inter-op threads to {inter_op}: {e}")
+        applied["intra_op"] = torch.get_num_threads()
+        applied["inter_op"] = torch.get_num_interop_threads()
+    except ImportError:
+        logger.info("torch not installed, skipping torch thread settings")
+
+    try:
+        import faiss as faisslib
+
+        if faiss:
+            faisslib.omp_set_num_threads(faiss)
+        applied["faiss"] = faisslib.omp_get_max_threads()
+    except ImportError:
+        logger.info("faiss not installed, skipping Faiss thread settings")
+
+    return applied
+
+
+def apply_thread_profile(settings) -> Dict[str, Optional[int]]:
+    """Apply the configured threading profile"""
+    threads = resolve_threads(settings)
+    applied = apply_threads(**threads)
+    logger.info(f"Thread profile {settings.EMBEDDINGS_THREAD_PROFILE}: {applied}")
+    return applied
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from txtai.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class VectorCache:
+    """SQLite-backed cache of (model, text hash) -> vector
+
+    Entries beyond ``max_entries`` are evicted least recently used first.
+    Access times of hits are kept in memory and written with the next put,
+    or once ``flush_every`` are pending, so lookups don't write to SQLite.
+    """
+
+    def __init__(self, path: str, max_entries: int, flush_every: int = 1000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                model TEXT,
+                key TEXT,
+                dtype TEXT,
+                vector BLOB,
+                accessed REAL,
+                PRIMARY KEY (model, key)
+            )
+            """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS vectors_accessed ON vectors(accessed)")
+        self.connection.commit()
+        (self.entries,) = self.connection.execute("SELECT COUNT(*) FROM vectors").fetchone()
+        self._accessed: Dict[Tuple[str, str], float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(text: str, category: Optional[str] = None) -> str:
+        """Cache key for text encoded under an instruction category"""
+        return hashlib.sha256(f"{category or ''}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _select(self, model: str, keys: List[str]) -> List[tuple]:
+        """Rows of (key, dtype, vector) stored for keys"""
+        rows = []
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            query = (
+                "SELECT key, dtype, vector FROM vectors "
+                f"WHERE model = ? AND key IN ({', '.join('?' * len(batch))})"
+            )
+            rows.extend(self.connection.execute(query, [model, *batch]).fetchall())
+        return rows
+
+    def _flush(self) -> None:
+        """Write pending access times, the caller holds the lock and commits"""
+        if self._accessed:
+            self.connection.executemany(
+                "UPDATE vectors SET accessed = ? WHERE model = ? AND key = ?",
+                [(accessed, model, key) for (model, key), accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def get(self, model: str, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Get cached vectors for keys, refreshing their access time"""
+        found = {}
+        with self.lock:
+            for key, dtype, vector in self._select(model, keys):
+                found[key] = np.frombuffer(vector, dtype=dtype)
+
+            now = time.time()
+            self._accessed.update(((model, key), now) for key in found)
+            if len(self._accessed) >= self.flush_every:
+                self._flush()
+                self.connection.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors and evict the least recently used entries over the size limit"""
+        now = time.time()
+        with self.lock:
+            stored = {key for key, _, _ in self._select(model, list(vectors))}
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?, ?)",
+                [
+                    (model, key, vector.dtype.str, vector.tobytes(), now)
+                    for key, vector in vectors.items()
+                ],
+            )
+            self.entries += len(vectors.keys() - stored)
+
+            if self.entries > self.max_entries:
+                # Eviction order needs the access times of recent hits
+                self._flush()
+                excess = self.entries - self.max_entries
+                self.connection.execute(
+                    "DELETE FROM vectors WHERE rowid IN "
+                    "(SELECT rowid FROM vectors ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                self.entries -= excess
+                self.evictions += excess
+            self.connection.commit()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache hit, miss and eviction counts"""
+        return {
+            "entries": self.entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that consult a VectorCache before encoding document text
+
+    txtai recreates its vectors model on every index/load, so the cache is
+    attached in ``loadvectors``.
+    """
+
+    def __init__(self, config: Dict[str, Any], cache: VectorCache, **kwargs):
+        self.cache = cache
+        super().__init__(config, **kwargs)
+
+    def loadvectors(self):
+        model = super().loadvectors()
+        if model is not None:
+            self._attach(model)
+        return model
+
+    def _attach(self, model) -> None:
+        """Wrap the vectors model's encode method with cache lookups"""
+        encode = model.encode
+        cache = self.cache
+        name = self.config.get("path") or self.config.get("method") or "default"
+
+        def cached_encode(data, category=None):
+            # Only document text is cached. Queries are mostly one-off and would
+            # evict the vectors index rebuilds reuse.
+            if category != "data" or not data or not all(isinstance(x, str) for x in data):
+                return encode(data, category) if category else encode(data)
+
+            keys = [cache.key(text, category) for text in data]
+            found = cache.get(name, keys)
+            missing = [i for i, key in enumerate(keys) if key not in found]
+
+            if missing:
+                texts = [data[i] for i in missing]
+                vectors = encode(texts, category) if category else encode(texts)
+                vectors = np.asarray(vectors)
+                cache.put(name, {keys[i]: vectors[n] for n, i in enumerate(missing)})
+                found.update({keys[i]: vectors[n] for n, i in enumerate(missing)})
+
+            return np.stack([found[key] for key in keys])
+
+        model.encode = cached_encode
@@ -47,10 +47,15 @@ async def initialized_services(test_settings):
         registry.config_service.settings = test_settings
         await registry.config_service.initialize()
         await registry.embeddings_service.initialize()
+        await registry.encoder_service.initialize()
+        await registry.health_service.initialize()
+        await registry.namespace_service.initialize()
+        await registry.snapshot_service.initialize()
         await registry.llm_service.initialize()
         await registry.rag_service.initialize()
         await registry.stream_service.initialize()
         await registry.communication_service.initialize()
+        await registry.scheduler_service.initialize()
         await registry.txtai_service.initialize()
         logger.info("All services initialized successfully")
         return registry
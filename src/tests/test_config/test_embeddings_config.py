@@ -81,6 +81,7 @@ def test_batch_size_config(base_settings):
     config = create_embeddings_config(base_settings)
 
     assert config["batch"] == 64
+    assert config["encodebatch"] == 64
 
 
 def test_model_config(base_settings):
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.routes import embeddings, llm, namespaces, rag, stream
+
+AUTH = {"Authorization": "Bearer test-key"}
+
+
+@pytest.fixture
+def client(initialized_services):
+    """Client for an app serving every router that exposes metrics"""
+    app = FastAPI()
+    for module in (embeddings, llm, namespaces, rag, stream):
+        app.include_router(module.router)
+    return TestClient(app)
+
+
+def test_embeddings_metrics(client, setup_test_data):
+    """Test query path latency and batch size tuning are served"""
+    client.post("/api/embeddings/search", json={"query": "machine learning"}, headers=AUTH)
+    response = client.get("/api/embeddings/metrics", headers=AUTH)
+
+    assert response.status_code == 200
+    metrics = response.json()
+    assert "batch_tuning" in metrics and "encode_batch_size" in metrics
+    assert sum(path["queries"] for path in metrics["query_paths"].values()) >= 1
+
+
+def test_service_metrics(client):
+    """Test stream, LLM and RAG metrics are served"""
+    streams = client.get("/api/stream/metrics", headers=AUTH).json()["streams"]
+    assert {"active_sessions", "queued_messages"} <= set(streams)
+
+    assert "coalesced_calls" in client.get("/api/llm/metrics", headers=AUTH).json()
+    assert "reranks" in client.get("/api/rag/metrics", headers=AUTH).json()
+
+
+def test_metrics_require_auth(client):
+    """Test metrics are not served without an API key"""
+    for path in ("/api/embeddings/metrics", "/api/llm/metrics", "/api/rag/metrics"):
+        assert client.get(path).status_code in (401, 403)
@@ -0,0 +1,150 @@
+import io
+import msgpack
+import numpy as np
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.middleware.serialization import (
+    ContentNegotiationMiddleware,
+    FastResponse,
+    preferred_type,
+    wants_msgpack,
+)
+from src.routes import embeddings
+
+AUTH = {"Authorization": "Bearer test-key"}
+
+
+@pytest.fixture
+def client(initialized_services):
+    """Client for an app serving the embeddings routes with content negotiation"""
+    app = FastAPI(default_response_class=FastResponse)
+    app.add_middleware(ContentNegotiationMiddleware)
+    app.include_router(embeddings.router)
+
+    @app.get("/numpy")
+    async def numpy_values():
+        return FastResponse(
+            {"array": np.arange(3, dtype=np.float32), "scalar": np.int64(7), "ids": ("a", "b")}
+        )
+
+    return TestClient(app)
+
+
+def test_json_response(client, setup_test_data):
+    """Test results are rendered as JSON by default"""
+    response = client.post(
+        "/api/embeddings/hybrid-search",
+        json={"query": "machine learning", "limit": 2},
+        headers=AUTH,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["vary"] == "Accept"
+    results = orjson.loads(response.content)["results"]
+    assert len(results) == 2
+    assert all(isinstance(result["score"], float) for result in results)
+
+
+def test_msgpack_response(client, setup_test_data):
+    """Test results are rendered as msgpack when the client asks for it"""
+    response = client.post(
+        "/api/embeddings/hybrid-search",
+        json={"query": "machine learning", "limit": 2},
+        headers={**AUTH, "Accept": "application/msgpack"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    expected = client.post(
+        "/api/embeddings/hybrid-search",
+        json={"query": "machine learning", "limit": 2},
+        headers=AUTH,
+    )
+    assert msgpack.unpackb(response.content) == orjson.loads(expected.content)
+
+
+def test_numpy_values(client):
+    """Test numpy arrays, scalars and tuples are converted in both encodings"""
+    expected = {"array": [0.0, 1.0, 2.0], "scalar": 7, "ids": ["a", "b"]}
+
+    response = client.get("/numpy")
+    assert orjson.loads(response.content) == expected
+
+    response = client.get("/numpy", headers={"Accept": "application/x-msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == expected
+
+
+def test_msgpack_refused(client):
+    """Test msgpack with q=0 or ranked below JSON isn't used"""
+    for accept in ("application/msgpack;q=0", "application/json, application/msgpack;q=0.5"):
+        response = client.get("/numpy", headers={"Accept": accept})
+        assert response.headers["content-type"] == "application/json"
+
+
+def test_wants_msgpack():
+    """Test Accept header q-values decide between msgpack and JSON"""
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("text/html, application/vnd.msgpack;q=0.9, */*;q=0.8")
+    assert wants_msgpack("application/msgpack, application/json")
+    assert not wants_msgpack("")
+    assert not wants_msgpack("*/*")
+    assert not wants_msgpack("application/msgpack; q=0")
+    assert not wants_msgpack("application/msgpack;q=0.5, application/*")
+
+
+def test_preferred_type():
+    """Test explicit media types are weighed against JSON by q-value"""
+    binary = ("application/x-npy", "application/octet-stream")
+    assert preferred_type("application/x-npy", binary) == "application/x-npy"
+    assert preferred_type("application/x-npy;q=0.5, application/octet-stream", binary) == (
+        "application/octet-stream"
+    )
+    assert preferred_type("application/*", binary) is None
+    assert preferred_type("application/x-npy;q=0", binary) is None
+    assert preferred_type("application/json, application/x-npy;q=0.5", binary) is None
+    assert preferred_type("application/msgpack, application/x-npy;q=0.5", binary) == (
+        "application/x-npy"
+    )
+    assert (
+        preferred_type(
+            "application/msgpack, application/x-npy;q=0.5",
+            binary,
+            over=("application/json", "application/msgpack"),
+        )
+        is None
+    )
+
+
+def test_encode_formats(client):
+    """Test encoded vectors are returned in the format the Accept header prefers"""
+    body = {"texts": ["machine learning", "natural language processing"]}
+    expected = np.array(
+        client.post("/api/embeddings/encode", json=body, headers=AUTH).json()["vectors"]
+    )
+
+    response = client.post(
+        "/api/embeddings/encode", json=body, headers={**AUTH, "Accept": "application/x-npy"}
+    )
+    assert response.headers["content-type"] == "application/x-npy"
+    assert np.allclose(np.load(io.BytesIO(response.content)), expected)
+
+    response = client.post(
+        "/api/embeddings/encode",
+        json=body,
+        headers={**AUTH, "Accept": "application/json, application/octet-stream;q=0.5"},
+    )
+    assert response.headers["content-type"] == "application/json"
+
+    response = client.post(
+        "/api/embeddings/encode",
+        json=body,
+        headers={**AUTH, "Accept": "application/octet-stream, application/x-npy;q=0"},
+    )
+    assert response.headers["content-type"] == "application/octet-stream"
+    vectors = np.frombuffer(response.content, dtype="<f4").reshape(expected.shape)
+    assert np.allclose(vectors, expected)
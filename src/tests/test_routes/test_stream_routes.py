@@ -0,0 +1,183 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from src.models.messages import Message, MessageType
+from src.routes import stream
+from src.routes.stream import with_heartbeats
+
+
+class FakeDispatcher:
+    """Stand-in for the scheduler yielding canned responses with a delay between them"""
+
+    def __init__(self, count: int = 2, delay: float = 0.0, forever: bool = False):
+        self.count = count
+        self.delay = delay
+        self.forever = forever
+        self.closed = asyncio.Event()
+        self.requests = []
+
+    async def dispatch(self, message: Message):
+        self.requests.append(message)
+        try:
+            index = 0
+            while self.forever or index < self.count:
+                await asyncio.sleep(self.delay)
+                yield Message(
+                    type=MessageType.RAG_RESPONSE,
+                    data={"index": index},
+                    session_id=message.session_id,
+                )
+                index += 1
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def app(initialized_services):
+    """App serving only the stream routes"""
+    app = FastAPI()
+    app.include_router(stream.router)
+    return app
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    dispatcher = FakeDispatcher()
+    monkeypatch.setattr(stream.scheduler_service, "dispatch", dispatcher.dispatch)
+    return dispatcher
+
+
+async def test_heartbeat_interleaving():
+    """Test heartbeats fill idle gaps without reordering or dropping messages"""
+    dispatcher = FakeDispatcher(count=3, delay=0.05)
+    request = Message(type=MessageType.RAG_REQUEST, data={}, session_id="hb")
+    types = [
+        message.type async for message in with_heartbeats(dispatcher.dispatch(request), "hb", 0.01)
+    ]
+
+    responses = [t for t in types if t == MessageType.RAG_RESPONSE]
+    assert len(responses) == 3
+    assert types[-1] == MessageType.RAG_RESPONSE
+    # Every response is preceded by at least one heartbeat while the source was idle
+    for position, kind in enumerate(types):
+        if kind == MessageType.RAG_RESPONSE:
+            assert types[position - 1] == MessageType.HEARTBEAT
+    assert dispatcher.closed.is_set()
+
+
+async def test_heartbeat_close_closes_source():
+    """Test closing the heartbeat stream closes the source generator"""
+    dispatcher = FakeDispatcher(forever=True)
+    request = Message(type=MessageType.RAG_REQUEST, data={}, session_id="hb-close")
+    messages = with_heartbeats(dispatcher.dispatch(request), "hb-close", 1.0)
+
+    assert (await messages.__anext__()).type == MessageType.RAG_RESPONSE
+    await messages.aclose()
+    assert dispatcher.closed.is_set()
+
+
+def test_websocket_rejects_bad_token(app, dispatcher):
+    """Test the WebSocket handshake is closed with a policy violation on a bad token"""
+    client = TestClient(app)
+    for url in ("/api/stream/ws", "/api/stream/ws?token=wrong"):
+        with pytest.raises(WebSocketDisconnect) as error:
+            with client.websocket_connect(url) as websocket:
+                websocket.receive_text()
+        assert error.value.code == 1008
+    assert not dispatcher.requests
+
+
+def test_websocket_stream(app, dispatcher):
+    """Test each client frame is answered with its streamed responses"""
+    client = TestClient(app)
+    request = Message(type=MessageType.RAG_REQUEST, data={"query": "q"}, session_id="ws")
+    with client.websocket_connect("/api/stream/ws?token=test-key") as websocket:
+        websocket.send_text(request.model_dump_json())
+        responses = [Message.model_validate_json(websocket.receive_text()) for _ in range(2)]
+
+        websocket.send_text("not a message")
+        error = Message.model_validate_json(websocket.receive_text())
+
+    assert [r.data["index"] for r in responses] == [0, 1]
+    assert all(r.session_id == "ws" for r in responses)
+    assert error.type == MessageType.ERROR
+    assert dispatcher.requests[0].data == {"query": "q"}
+
+
+def test_sse_framing(app, dispatcher):
+    """Test SSE frames carry the event type and message and the stream ends with the source"""
+    client = TestClient(app)
+    response = client.get(
+        "/api/stream/sse",
+        params={"query": "q", "session_id": "sse"},
+        headers={"Authorization": "Bearer test-key"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert len(frames) == 2
+    for index, frame in enumerate(frames):
+        event, data = frame.split("\n")
+        assert event == "event: rag_response"
+        assert json.loads(data[len("data: ") :])["data"] == {"index": index}
+
+
+def test_sse_requires_api_key(app, dispatcher):
+    """Test the SSE endpoint rejects requests with a bad API key"""
+    client = TestClient(app)
+    response = client.get(
+        "/api/stream/sse", params={"query": "q"}, headers={"Authorization": "Bearer wrong"}
+    )
+    assert response.status_code == 403
+    assert not dispatcher.requests
+
+
+async def test_sse_disconnect(app, monkeypatch):
+    """Test a client disconnect ends the SSE response and closes the message source"""
+    dispatcher = FakeDispatcher(delay=0.01, forever=True)
+    monkeypatch.setattr(stream.scheduler_service, "dispatch", dispatcher.dispatch)
+    disconnected = asyncio.Event()
+    requested = []
+    chunks = []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(event):
+        if event["type"] == "http.response.body" and event.get("body"):
+            chunks.append(event["body"])
+            disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/stream/sse",
+        "raw_path": b"/api/stream/sse",
+        "query_string": b"query=q",
+        "headers": [(b"authorization", b"Bearer test-key")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    assert chunks[0].startswith(b"event: rag_response\ndata: ")
+    await asyncio.wait_for(dispatcher.closed.wait(), timeout=5)
+
+
+def test_metrics(app):
+    """Test scheduler metrics are served"""
+    client = TestClient(app)
+    response = client.get("/api/stream/metrics", headers={"Authorization": "Bearer test-key"})
+    assert response.status_code == 200
+    assert "abandoned_messages" in response.json()["scheduler"]
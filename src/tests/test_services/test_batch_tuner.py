@@ -0,0 +1,99 @@
+import time
+import pytest
+from src.services import registry
+from src.services.batch_tuner import sample_texts, tune_batch_size
+
+
+def fake_encoder(best: int):
+    """Encoder whose per-document cost is lowest at batch size ``best``"""
+    calls = []
+
+    def encode(texts, batch_size):
+        calls.append(batch_size)
+        time.sleep(len(texts) * 0.0001 * (1 + abs(batch_size - best) / best))
+
+    return encode, calls
+
+
+def test_picks_fastest_batch_size():
+    """Test the batch size with the highest throughput is chosen"""
+    encode, _ = fake_encoder(32)
+    result = tune_batch_size(encode, sample_texts(64, 8), [8, 16, 32, 64])
+
+    assert result["batch_size"] == 32
+    assert result["docs_per_sec"] == max(c["docs_per_sec"] for c in result["candidates"])
+    assert all(c["peak_memory_mb"] > 0 for c in result["candidates"])
+
+
+def test_stops_after_slower_candidates():
+    """Test larger candidates aren't measured once throughput keeps falling"""
+    encode, calls = fake_encoder(8)
+    result = tune_batch_size(encode, sample_texts(64, 8), [8, 16, 32, 64, 128], patience=2)
+
+    assert result["batch_size"] == 8
+    assert [c["batch_size"] for c in result["candidates"]] == [8, 16, 32]
+    assert 64 not in calls
+
+
+def test_memory_limit():
+    """Test candidates whose encode grows memory past the limit are rejected"""
+
+    def encode(texts, batch_size):
+        # Allocate and touch batch_size MB
+        return b"x" * (batch_size * 1024 * 1024)
+
+    result = tune_batch_size(encode, sample_texts(16, 8), [8, 32, 64], max_memory_mb=24)
+    assert result["batch_size"] == 8
+    assert [c["batch_size"] for c in result["candidates"]] == [8, 32]
+    assert result["candidates"][1]["memory_mb"] > 24
+
+    with pytest.raises(ValueError, match="memory limit"):
+        tune_batch_size(encode, sample_texts(16, 8), [32], max_memory_mb=24)
+
+
+def test_memory_limit_ignores_earlier_peak():
+    """Test memory used before tuning doesn't count against candidates"""
+    peak = b"x" * (64 * 1024 * 1024)
+    del peak
+
+    encode, _ = fake_encoder(8)
+    result = tune_batch_size(encode, sample_texts(16, 8), [8, 16], max_memory_mb=32)
+    assert result["batch_size"] in (8, 16)
+    assert all(c["memory_mb"] < 32 for c in result["candidates"])
+
+
+@pytest.mark.asyncio
+async def test_autotune_service(initialized_services, monkeypatch):
+    """Test the tuned batch size is applied to the index and shared config"""
+    service = registry.embeddings_service
+    monkeypatch.setattr(service.settings, "EMBEDDINGS_AUTOTUNE_CANDIDATES", [4, 8])
+    monkeypatch.setitem(registry.config_service.embeddings_config, "encodebatch", 32)
+
+    result = await service.autotune_batch_size(sample_texts(16, 8))
+
+    assert result["batch_size"] in (4, 8)
+    assert result["docs_per_sec"] > 0
+    assert service.embeddings.config["encodebatch"] == result["batch_size"]
+    assert registry.config_service.embeddings_config["encodebatch"] == result["batch_size"]
+    assert service.get_metrics()["batch_tuning"] == result
+
+
+@pytest.mark.asyncio
+async def test_autotune_rejected_with_pool(initialized_services, monkeypatch):
+    """Test tuning is refused when encoding runs in worker processes"""
+    service = registry.embeddings_service
+    monkeypatch.setattr(service, "encoder_pool", object())
+
+    with pytest.raises(ValueError, match="encoder processes"):
+        await service.autotune_batch_size(sample_texts(4, 8))
+
+
+@pytest.mark.asyncio
+async def test_tuning_leaves_live_model(initialized_services):
+    """Test candidate encodes don't change the batch size of the model serving queries"""
+    service = registry.embeddings_service
+    model = service._shards()[0].model
+    batch_size = model.encodebatch
+
+    service._encode(sample_texts(4, 8), 3)
+    assert model.encodebatch == batch_size
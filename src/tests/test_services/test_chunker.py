@@ -0,0 +1,29 @@
+import pytest
+from src.services.chunker import chunk_text, split_sentences
+
+
+def test_token_chunks_overlap():
+    """Test token windows share the configured overlap"""
+    text = " ".join(str(i) for i in range(10))
+    chunks = chunk_text(text, "tokens", size=4, overlap=1)
+
+    assert chunks == ["0 1 2 3", "3 4 5 6", "6 7 8 9"]
+
+
+def test_sentence_chunks():
+    """Test sentence windows"""
+    text = "One. Two! Three? Four."
+    assert split_sentences(text) == ["One.", "Two!", "Three?", "Four."]
+    assert chunk_text(text, "sentences", size=2, overlap=0) == ["One. Two!", "Three? Four."]
+
+
+def test_short_text_is_not_chunked():
+    """Test that text within the chunk size is kept whole"""
+    assert chunk_text("short text", "tokens", size=256, overlap=32) == ["short text"]
+    assert chunk_text("any text", "none", size=1, overlap=0) == ["any text"]
+
+
+def test_unknown_mode():
+    """Test that an unknown chunk mode is rejected"""
+    with pytest.raises(ValueError, match="Unknown chunk mode"):
+        chunk_text("text", "paragraphs", size=1, overlap=0)
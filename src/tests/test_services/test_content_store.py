@@ -0,0 +1,33 @@
+import json
+import pytest
+from src.services import content_store, registry
+from src.services.content_store import SCHEMA, content_schema, supports_tag_updates
+from ..fixtures.test_docs import get_test_documents
+
+
+@pytest.mark.asyncio
+class TestContentStore:
+    """Test in-place metadata updates against txtai's content database"""
+
+    async def test_txtai_schema(self, initialized_services, setup_test_data):
+        """Test the content tables still have the columns metadata updates write to"""
+        for shard in registry.embeddings_service._shards():
+            schema = content_schema(shard)
+            for table, columns in SCHEMA.items():
+                assert columns <= schema[table], f"txtai {table} table changed: {schema[table]}"
+            assert supports_tag_updates(shard)
+
+    async def test_unsupported_falls_back(self, initialized_services, setup_test_data, monkeypatch):
+        """Test metadata changes are re-indexed when in-place updates aren't supported"""
+        monkeypatch.setattr(content_store, "TXTAI_VERSIONS", range(0))
+        assert not supports_tag_updates(registry.embeddings_service._shards()[0])
+
+        docs = get_test_documents()
+        docs[0]["metadata"]["priority"] = 42
+        counts = await registry.embeddings_service.upsert(docs)
+        assert counts["metadata_updated"] == 1
+
+        results = registry.embeddings_service.embeddings.search(
+            "SELECT id, tags FROM txtai WHERE id = 'doc1'", limit=1
+        )
+        assert json.loads(results[0]["tags"])["priority"] == 42
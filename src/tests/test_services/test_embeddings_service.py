@@ -1,7 +1,12 @@
+import io
 import pytest
 import json
+import threading
+import numpy as np
 import logging
 from src.services import registry
+from src.services.embeddings_service import EmbeddingsService
+from ..fixtures.test_docs import get_test_documents
 
 logger = logging.getLogger(__name__)
 
@@ -119,3 +124,319 @@ class TestEmbeddingsCore:
 
         # Verify most relevant document is first
         assert "machine learning" in results[0]["text"].lower()
+
+    async def test_chunked_indexing(self, monkeypatch):
+        """Test passage-level indexing and collapsing to parent documents"""
+        settings = registry.embeddings_service.settings
+        monkeypatch.setattr(settings, "EMBEDDINGS_CHUNK_MODE", "sentences")
+        monkeypatch.setattr(settings, "EMBEDDINGS_CHUNK_SIZE", 1)
+        monkeypatch.setattr(settings, "EMBEDDINGS_CHUNK_OVERLAP", 0)
+
+        doc = {
+            "id": "long1",
+            "text": "Machine learning learns from data. Paris is in France. Cats are animals.",
+            "metadata": {"category": "mixed"},
+        }
+        count = await registry.embeddings_service.add([doc])
+        assert count == 3
+
+        passages = await registry.embeddings_service.search("machine learning", limit=3)
+        assert all(r["id"].startswith("long1#") for r in passages)
+        assert all(r["metadata"]["parent_id"] == "long1" for r in passages)
+
+        parents = await registry.embeddings_service.search(
+            "machine learning", limit=3, collapse=True
+        )
+        assert len(parents) == 1
+        assert parents[0]["id"] == "long1"
+        assert parents[0]["metadata"] == {"category": "mixed"}
+        assert "machine learning" in parents[0]["text"].lower()
+
+    async def test_upsert_change_detection(self, setup_test_data):
+        """Test that upsert skips unchanged documents and updates changed ones"""
+        docs = get_test_documents()
+
+        # Re-sending the same documents skips them all
+        counts = await registry.embeddings_service.upsert(docs)
+        assert counts == {"new": 0, "updated": 0, "metadata_updated": 0, "skipped": 3}
+
+        # Change metadata of one, text of another and add a new document
+        docs[0]["metadata"]["priority"] = 10
+        docs[1]["text"] = "NLP lets computers read and write human language."
+        docs.append({"id": "doc4", "text": "Vector search finds similar text.", "metadata": {}})
+        counts = await registry.embeddings_service.upsert(docs)
+        assert counts == {"new": 1, "updated": 1, "metadata_updated": 1, "skipped": 1}
+
+        results = registry.embeddings_service.embeddings.search(
+            "SELECT id, text, tags FROM txtai WHERE id IN ('doc1', 'doc2')", limit=2
+        )
+        rows = {r["id"]: r for r in results}
+        assert json.loads(rows["doc1"]["tags"])["priority"] == 10
+        assert rows["doc2"]["text"].startswith("NLP lets computers")
+
+    async def test_metadata_filtering(self, monkeypatch):
+        """Test filters on declared metadata fields are applied inside the query"""
+        monkeypatch.setattr(
+            registry.embeddings_service.settings,
+            "EMBEDDINGS_METADATA_FIELDS",
+            {"category": "str", "priority": "int"},
+        )
+        docs = get_test_documents()
+        docs[1]["metadata"]["category"] = "language"
+        await registry.embeddings_service.add(docs)
+
+        results = await registry.embeddings_service.search(
+            "artificial intelligence", limit=2, filters={"category": "tech"}
+        )
+        assert {r["id"] for r in results} == {"doc1", "doc3"}
+        assert all(r["metadata"]["category"] == "tech" for r in results)
+
+        results = await registry.embeddings_service.hybrid_search(
+            "artificial intelligence", limit=3, filters={"priority": {"gte": 2}}
+        )
+        assert {r["id"] for r in results} == {"doc2", "doc3"}
+
+        with pytest.raises(ValueError, match="Unknown metadata filter field"):
+            await registry.embeddings_service.search("test", filters={"source": "x"})
+
+    async def test_boolean_metadata_filter(self, monkeypatch):
+        """Test string booleans are parsed by meaning for bool metadata fields"""
+        monkeypatch.setattr(
+            registry.embeddings_service.settings,
+            "EMBEDDINGS_METADATA_FIELDS",
+            {"published": "bool"},
+        )
+        docs = get_test_documents()
+        docs[0]["metadata"]["published"] = "false"
+        docs[1]["metadata"]["published"] = True
+        docs[2]["metadata"]["published"] = "True"
+        await registry.embeddings_service.add(docs)
+
+        results = await registry.embeddings_service.search(
+            "artificial intelligence", limit=3, filters={"published": "false"}
+        )
+        assert [r["id"] for r in results] == ["doc1"]
+
+        results = await registry.embeddings_service.search(
+            "artificial intelligence", limit=3, filters={"published": "true"}
+        )
+        assert {r["id"] for r in results} == {"doc2", "doc3"}
+
+        with pytest.raises(ValueError, match="Invalid boolean value"):
+            await registry.embeddings_service.search("test", filters={"published": "maybe"})
+
+    async def test_query_with_quotes(self, setup_test_data):
+        """Test query text is bound as a parameter rather than interpolated into SQL"""
+        results = await registry.embeddings_service.search("what's machine learning", limit=2)
+        assert len(results) == 2
+
+        results = await registry.embeddings_service.search("x') OR 1=1 --", limit=3)
+        assert all(r["id"].startswith("doc") for r in results)
+
+    async def test_pagination(self):
+        """Test cursor pagination of listings and search results"""
+        await registry.embeddings_service.add(get_test_documents())
+
+        page = await registry.embeddings_service.list_documents(limit=2)
+        assert [d["id"] for d in page["documents"]] == ["doc1", "doc2"]
+        page = await registry.embeddings_service.list_documents(limit=2, cursor=page["next_cursor"])
+        assert [d["id"] for d in page["documents"]] == ["doc3"]
+        assert page["next_cursor"] is None
+
+        first = await registry.embeddings_service.search_page("machine learning", limit=2)
+        assert len(first["results"]) == 2 and first["next_cursor"]
+        second = await registry.embeddings_service.search_page(
+            "machine learning", limit=2, cursor=first["next_cursor"]
+        )
+        seen = {r["id"] for r in first["results"]} | {r["id"] for r in second["results"]}
+        assert seen == {"doc1", "doc2", "doc3"}
+        assert second["next_cursor"] is None
+
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            await registry.embeddings_service.list_documents(cursor="not-a-cursor")
+
+    async def test_invalid_cursors(self, setup_test_data):
+        """Test malformed and wrong-kind cursors are rejected as invalid"""
+        service = registry.embeddings_service
+        search_cursor = service._encode_cursor({"offset": 2})
+        list_cursor = service._encode_cursor({"id": "doc1"})
+        malformed = [
+            service._encode_cursor([]),
+            service._encode_cursor("doc1"),
+            service._encode_cursor({"offset": "2"}),
+            service._encode_cursor({"offset": -1}),
+        ]
+
+        for cursor in malformed + [search_cursor]:
+            with pytest.raises(ValueError, match="Invalid cursor"):
+                await service.list_documents(cursor=cursor)
+        for cursor in malformed + [list_cursor]:
+            with pytest.raises(ValueError, match="Invalid cursor"):
+                await service.search_page("machine learning", cursor=cursor)
+
+    async def test_export(self, monkeypatch):
+        """Test streaming export of every document with vectors"""
+        monkeypatch.setattr(registry.embeddings_service.settings, "EMBEDDINGS_EXPORT_BATCH_SIZE", 2)
+        await registry.embeddings_service.add(get_test_documents())
+        service = registry.embeddings_service
+        batchtransform = service.embeddings.batchtransform
+        threads = []
+
+        def record(documents, category=None):
+            threads.append(threading.current_thread())
+            return batchtransform(documents, category)
+
+        monkeypatch.setattr(service.embeddings, "batchtransform", record)
+        docs = [doc async for doc in service.export(vectors=True)]
+
+        assert [d["id"] for d in docs] == ["doc1", "doc2", "doc3"]
+        assert all(len(d["vector"]) > 0 for d in docs)
+        # Pages are encoded off the event loop
+        assert len(threads) == 2 and threading.main_thread() not in threads
+
+    async def test_compaction(self):
+        """Test compaction drops dead rows and keeps documents searchable"""
+        service = registry.embeddings_service
+        await service.add(get_test_documents())
+        await service.upsert(
+            [
+                {"id": "doc1", "text": "Machine learning models learn from data."},
+                {"id": "doc2", "text": "Language models generate text."},
+            ]
+        )
+        assert service.dead_rows() == (2, 5)
+
+        result = await service.compact()
+        assert result == {"rows": 3, "removed": 2, "seconds": result["seconds"]}
+        assert service.dead_rows() == (0, 3)
+
+        results = await service.search("machine learning models", limit=1)
+        assert results[0]["id"] == "doc1"
+        assert results[0]["text"] == "Machine learning models learn from data."
+
+    async def test_compaction_threshold(self, monkeypatch):
+        """Test compaction starts in the background once the dead ratio is exceeded"""
+        service = registry.embeddings_service
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_COMPACT_MIN_DELETED", 1)
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_COMPACT_RATIO", 0.4)
+        await service.add(get_test_documents())
+        compactions = service.get_metrics()["compactions"]
+
+        await service.upsert([{"id": "doc1", "text": "First revision."}])
+        assert service.get_metrics()["compactions"] == compactions
+
+        await service.upsert([{"id": "doc1", "text": "Second revision."}])
+        await service._compaction
+        assert service.get_metrics()["compactions"] == compactions + 1
+        assert service.dead_rows() == (0, 3)
+
+    async def test_bulk_delete(self, monkeypatch):
+        """Test batched deletes by id list and by metadata filter"""
+        service = registry.embeddings_service
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_DELETE_BATCH_SIZE", 2)
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_METADATA_FIELDS", {"category": "str"})
+        docs = get_test_documents()
+        docs[1]["metadata"]["category"] = "language"
+        await service.add(docs)
+
+        counts = await service.delete(["doc2"])
+        assert counts == {"documents": 1, "rows": 1, "batches": 1}
+        counts = await service.delete(["doc1", "doc1", "missing"])
+        assert counts == {"documents": 1, "rows": 1, "batches": 1}
+        assert service.embeddings.count() == 1
+
+        await service.add(docs)
+        counts = await service.delete_where({"category": "tech"})
+        assert counts == {"documents": 2, "rows": 2, "batches": 1}
+        remaining = await service.list_documents()
+        assert [d["id"] for d in remaining["documents"]] == ["doc2"]
+
+        with pytest.raises(ValueError, match="At least one metadata filter"):
+            await service.delete_where({})
+
+    async def test_bulk_delete_passages(self, monkeypatch):
+        """Test deleting a chunked document removes all of its passages"""
+        service = registry.embeddings_service
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_DELETE_BATCH_SIZE", 2)
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_CHUNK_MODE", "tokens")
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_CHUNK_SIZE", 4)
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_CHUNK_OVERLAP", 0)
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_METADATA_FIELDS", {"category": "str"})
+        await service.add(get_test_documents())
+        rows = service.embeddings.count()
+
+        counts = await service.delete(["doc1"])
+        assert counts["documents"] == 1 and counts["rows"] > 1
+        assert service.embeddings.count() == rows - counts["rows"]
+
+        counts = await service.delete_where({"category": "tech"})
+        assert counts["documents"] == 2
+        assert counts["batches"] > 1
+        assert service.embeddings.count() == 0
+
+    async def test_raw_metadata(self):
+        """Test stored metadata can be returned without parsing"""
+        service = registry.embeddings_service
+        await service.add(get_test_documents())
+
+        parsed = await service.search("machine learning", limit=3)
+        raw = await service.search("machine learning", limit=3, parse_metadata=False)
+        assert all(isinstance(r["metadata"], str) for r in raw)
+        assert [json.loads(r["metadata"]) for r in raw] == [r["metadata"] for r in parsed]
+
+    async def test_precomputed_vectors(self, monkeypatch):
+        """Test documents and queries with precomputed vectors skip the model"""
+        service = registry.embeddings_service
+        docs = get_test_documents()
+        vectors = service.embeddings.batchtransform([(None, doc["text"], None) for doc in docs])
+
+        def fail(*args, **kwargs):
+            raise AssertionError("vectors model was called")
+
+        for shard in service._shards():
+            monkeypatch.setattr(shard.model, "encode", fail)
+
+        counts = await service.upsert_vectors(docs, vectors)
+        assert counts["documents"] == 3
+        assert service.embeddings.count() == 3
+
+        results = await service.search_vector(vectors[1], limit=1)
+        assert results[0]["id"] == "doc2"
+        assert results[0]["metadata"]["category"] == "tech"
+
+        with pytest.raises(ValueError, match="dimension"):
+            await service.search_vector(vectors[1][:-1])
+        with pytest.raises(ValueError, match="Expected 3 vectors"):
+            await service.upsert_vectors(docs, vectors[:2])
+
+    async def test_precomputed_vectors_replace_passages(self, monkeypatch):
+        """Test upserting vectors removes the passages of a chunked document with a # in its id"""
+        service = registry.embeddings_service
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_CHUNK_MODE", "sentences")
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_CHUNK_SIZE", 1)
+        monkeypatch.setattr(service.settings, "EMBEDDINGS_CHUNK_OVERLAP", 0)
+        doc = {"id": "guide#intro", "text": "Cats are animals. Paris is in France."}
+        await service.add([doc])
+        rows = service.embeddings.count()
+
+        vectors = service.embeddings.batchtransform([(None, doc["text"], None)])
+        counts = await service.upsert_vectors([doc], vectors)
+
+        assert counts["stale_passages"] == 2
+        assert service.embeddings.count() == rows - 1
+        assert list(service._lookup(["guide#intro", "guide#intro#0"])) == ["guide#intro"]
+
+    async def test_decode_vectors(self):
+        """Test .npy and raw float32 vector payloads"""
+        vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+        buffer = io.BytesIO()
+        np.save(buffer, vectors)
+
+        decoded = EmbeddingsService.decode_vectors(buffer.getvalue())
+        assert decoded.shape == (2, 3) and (decoded == vectors).all()
+
+        raw = EmbeddingsService.decode_vectors(vectors.astype("<f4").tobytes())
+        assert (raw == vectors.ravel()).all()
+
+        with pytest.raises(ValueError, match="multiple of 4"):
+            EmbeddingsService.decode_vectors(b"\x00" * 5)
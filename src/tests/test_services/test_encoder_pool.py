@@ -0,0 +1,97 @@
+import copy
+import sys
+import threading
+import numpy as np
+import pytest
+from src.services import registry
+from src.services.embeddings_service import EmbeddingsService
+from src.services.encoder_pool import EncoderPool, PooledEmbeddings
+from ..fixtures.test_docs import get_test_documents
+
+
+@pytest.fixture(scope="module")
+def pool(initialized_services):
+    """Two encoder processes running the configured model"""
+    pool = EncoderPool(copy.deepcopy(registry.config_service.embeddings_config), 2, min_chunk=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_encode(pool):
+    """Test pooled vectors match encoding in this process"""
+    texts = [doc["text"] for doc in get_test_documents()] + ["machine learning", "data"]
+    model = registry.embeddings_service._shards()[0].model
+
+    vectors = pool.encode(texts)
+    assert vectors.shape == (len(texts), pool.dimensions)
+    assert np.allclose(vectors, type(model).encode(model, texts))
+    assert pool.get_metrics()["texts"] >= len(texts)
+
+
+def test_pooled_embeddings(pool):
+    """Test an index built and queried through the pool"""
+    config = copy.deepcopy(registry.config_service.embeddings_config)
+    embeddings = PooledEmbeddings(config, pool)
+    batches = pool.get_metrics()["batches"]
+
+    embeddings.index([(doc["id"], doc["text"], "{}") for doc in get_test_documents()])
+    results = embeddings.search("natural language processing", 1)
+    assert results[0]["id"] == "doc2"
+    assert pool.get_metrics()["batches"] >= batches + 2
+    # The model is only loaded in the workers
+    assert embeddings.model.model is None
+    embeddings.close()
+
+
+def test_buffer_reuse(pool):
+    """Test shared buffers are reused across batches and skipped for small ones"""
+    texts = [f"passage {i}" for i in range(16)]
+    first = pool.encode(texts)
+    buffers = pool.get_metrics()["buffers"]
+
+    assert np.allclose(pool.encode(texts), first)
+    assert np.allclose(pool.encode(texts[:10]), first[:10])
+    assert np.allclose(pool.encode(texts[:1]), first[:1])
+    assert pool.get_metrics()["buffers"] == buffers
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_workers_detach_buffers(pool):
+    """Test workers don't keep shared buffers mapped once their chunk is written"""
+    pool.encode([f"passage {i}" for i in range(16)])
+    names = [buffer.name.lstrip("/") for buffer in pool._buffers]
+    assert names
+
+    for pid in pool.executor._processes:
+        with open(f"/proc/{pid}/maps") as maps:
+            mapped = maps.read()
+        assert not any(name in mapped for name in names)
+
+
+@pytest.mark.asyncio
+async def test_query_encoded_off_loop(pool, monkeypatch):
+    """Test searches wait for pooled query encoding off the event loop"""
+    module = sys.modules[EmbeddingsService.__module__]
+    monkeypatch.setattr(module, "get_encoder_pool", lambda settings, config: pool)
+    service = EmbeddingsService()
+    await service.initialize()
+    await service.add(get_test_documents())
+
+    threads = []
+    encode = pool.encode
+
+    def record(texts, category=None):
+        if category == "query":
+            threads.append(threading.current_thread())
+        return encode(texts, category)
+
+    monkeypatch.setattr(pool, "encode", record)
+    for path in ("dense", "hybrid"):
+        results = await service.search("natural language processing", 1, path=path)
+        assert results[0]["id"] == "doc2"
+    results = await service.hybrid_search("natural language processing", 1)
+    assert results[0]["id"] == "doc2"
+
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+    service.close()
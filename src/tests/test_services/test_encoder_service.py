@@ -0,0 +1,85 @@
+import asyncio
+import numpy as np
+import pytest
+from src.services import registry
+
+
+@pytest.mark.asyncio
+class TestEncoderService:
+    """Test batched text encoding"""
+
+    async def test_service_initialization(self, initialized_services):
+        """Test that encoder service initializes correctly"""
+        assert registry.encoder_service.initialized
+
+    async def test_encode(self, initialized_services):
+        """Test vectors match the index model output"""
+        texts = ["machine learning", "natural language processing"]
+        vectors = await registry.encoder_service.encode(texts)
+
+        expected = registry.embeddings_service.embeddings.batchtransform(
+            [(None, text, None) for text in texts]
+        )
+        assert vectors.shape == expected.shape
+        assert np.allclose(vectors, expected)
+
+    async def test_dynamic_batching(self, initialized_services, monkeypatch):
+        """Test concurrent callers share a model call and get their own vectors"""
+        service = registry.encoder_service
+        monkeypatch.setattr(service.settings, "ENCODE_MAX_WAIT_MS", 50.0)
+        batches = service.get_metrics()["batches"]
+
+        texts = [[f"text {i}"] for i in range(4)] + [["text 4", "text 5"]]
+        results = await asyncio.gather(*[service.encode(t) for t in texts])
+
+        assert service.get_metrics()["batches"] == batches + 1
+        for group, vectors in zip(texts, results):
+            assert vectors.shape[0] == len(group)
+            assert np.allclose(vectors, await service.encode(group))
+
+    async def test_batch_size_limit(self, initialized_services, monkeypatch):
+        """Test batches stop growing at the maximum batch size"""
+        service = registry.encoder_service
+        monkeypatch.setattr(service.settings, "ENCODE_MAX_WAIT_MS", 50.0)
+        monkeypatch.setattr(service.settings, "ENCODE_MAX_BATCH_SIZE", 2)
+        batches = service.get_metrics()["batches"]
+
+        await asyncio.gather(*[service.encode([f"text {i}"]) for i in range(4)])
+        assert service.get_metrics()["batches"] == batches + 2
+
+    async def test_oversized_request(self, initialized_services, monkeypatch):
+        """Test requests larger than a batch are split and batches never exceed the limit"""
+        service = registry.encoder_service
+        monkeypatch.setattr(service.settings, "ENCODE_MAX_WAIT_MS", 50.0)
+        monkeypatch.setattr(service.settings, "ENCODE_MAX_BATCH_SIZE", 2)
+        sizes = []
+        encode = service._encode
+
+        def record(texts, category):
+            sizes.append(len(texts))
+            return encode(texts, category)
+
+        monkeypatch.setattr(service, "_encode", record)
+        texts = [f"text {i}" for i in range(5)]
+        single, vectors = await asyncio.gather(service.encode(["text"]), service.encode(texts))
+
+        assert single.shape[0] == 1 and vectors.shape[0] == 5
+        assert max(sizes) == 2 and sum(sizes) == 6
+        assert np.allclose(vectors, encode(texts, None))
+
+    async def test_errors(self, initialized_services, monkeypatch):
+        """Test invalid requests and encode failures are raised to callers"""
+        service = registry.encoder_service
+        with pytest.raises(ValueError, match="No texts"):
+            await service.encode([])
+
+        monkeypatch.setattr(service.settings, "ENCODE_MAX_TEXTS", 1)
+        with pytest.raises(ValueError, match="Too many texts"):
+            await service.encode(["a", "b"])
+
+        def fail(texts, category):
+            raise RuntimeError("model failed")
+
+        monkeypatch.setattr(service, "_encode", fail)
+        with pytest.raises(RuntimeError, match="model failed"):
+            await service.encode(["a"])
@@ -0,0 +1,52 @@
+import pytest
+from src.services import registry
+
+
+@pytest.mark.asyncio
+class TestHealthService:
+    """Test warmup and synthetic latency probing"""
+
+    async def test_service_initialization(self, initialized_services):
+        """Test that health service initializes correctly"""
+        assert registry.health_service.initialized
+
+    async def test_warmup(self, initialized_services):
+        """Test warmup runs the synthetic queries and marks the service ready"""
+        service = registry.health_service
+        result = await service.warmup()
+
+        assert service.ready
+        assert result["queries"] == service.settings.HEALTH_WARMUP_QUERIES
+        assert result["seconds"] > 0
+
+    async def test_probe_latency(self, initialized_services, setup_test_data):
+        """Test probes record latency percentiles"""
+        service = registry.health_service
+        await service.warmup()
+        for _ in range(5):
+            assert await service.probe() > 0
+
+        status = service.get_status()
+        assert status["status"] == "healthy"
+        assert status["probe"]["samples"] >= 5
+        assert 0 < status["probe"]["p50_ms"] <= status["probe"]["p95_ms"]
+
+    async def test_degraded(self, initialized_services, monkeypatch):
+        """Test slow or failing probes report a degraded status"""
+        service = registry.health_service
+        await service.warmup()
+        await service.probe()
+
+        monkeypatch.setattr(service.settings, "HEALTH_MAX_P95_MS", 1e-6)
+        assert service.get_status()["status"] == "degraded"
+        monkeypatch.setattr(service.settings, "HEALTH_MAX_P95_MS", None)
+        assert service.get_status()["status"] == "healthy"
+
+        def fail(query):
+            raise RuntimeError("index unavailable")
+
+        monkeypatch.setattr(service, "_search", fail)
+        assert await service.probe() is None
+        status = service.get_status()
+        assert status["status"] == "degraded"
+        assert status["probe"]["last_error"] == "index unavailable"
@@ -1,6 +1,9 @@
 import pytest
+import asyncio
 import logging
+from litellm import RateLimitError
 from src.services import registry
+from src.services.llm_service import LLMRateLimitError
 
 logger = logging.getLogger(__name__)
 
@@ -88,3 +91,72 @@ class TestLLMService:
         rag_response = await registry.llm_service.generate_with_context(question, context)
         assert isinstance(rag_response, str)
         logger.info(f"RAG prompt response: {rag_response[:100]}...")
+
+    async def test_request_coalescing(self, monkeypatch):
+        """Test that identical concurrent prompts share one provider call"""
+        calls = 0
+
+        async def fake_call_provider(messages, priority):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "Paris"
+
+        monkeypatch.setattr(registry.llm_service, "_call_provider", fake_call_provider)
+        before = registry.llm_service.get_metrics()["coalesced_calls"]
+
+        context = "The capital of France is Paris."
+        question = "What is the capital of France?"
+        responses = await asyncio.gather(
+            *[registry.llm_service.generate_with_context(question, context) for _ in range(5)]
+        )
+
+        assert responses == ["Paris"] * 5
+        assert calls == 1
+        assert registry.llm_service.get_metrics()["coalesced_calls"] - before == 4
+
+    async def test_rate_limit_exhausted(self, initialized_services, monkeypatch):
+        """Test that a rate limit outlasting the retries raises instead of returning text"""
+
+        async def fake_call_provider(messages, priority):
+            raise RateLimitError("slow down", "anthropic", "model")
+
+        monkeypatch.setattr(registry.llm_service, "_call_provider", fake_call_provider)
+        with pytest.raises(LLMRateLimitError):
+            await registry.llm_service.generate("Rate limited prompt")
+        with pytest.raises(LLMRateLimitError):
+            await registry.llm_service.generate_with_context("Rate limited?", "Context")
+
+    async def test_coalescing_survives_cancelled_caller(self, initialized_services, monkeypatch):
+        """Test cancelling the first caller doesn't cancel the completion for followers"""
+        calls = 0
+        cancelled = asyncio.Event()
+
+        async def fake_call_provider(messages, priority):
+            nonlocal calls
+            calls += 1
+            try:
+                await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "Paris"
+
+        monkeypatch.setattr(registry.llm_service, "_call_provider", fake_call_provider)
+        first = asyncio.create_task(registry.llm_service.generate("Capital of France?"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(registry.llm_service.generate("Capital of France?"))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        assert await follower == "Paris"
+        assert first.cancelled()
+        assert calls == 1
+        assert not cancelled.is_set()
+
+        # Once every caller is gone the provider call is cancelled too
+        only = asyncio.create_task(registry.llm_service.generate("Capital of Spain?"))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert registry.llm_service.get_metrics()["inflight_requests"] == 0
@@ -0,0 +1,79 @@
+import pytest
+import logging
+from src.services import registry
+from ..fixtures.test_docs import get_test_documents
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+async def namespaces(initialized_services, tmp_path, monkeypatch):
+    """Namespace service persisting to a temporary directory"""
+    service = registry.namespace_service
+    monkeypatch.setattr(service.settings, "NAMESPACES_PATH", str(tmp_path))
+    monkeypatch.setattr(service.settings, "NAMESPACES_MAX_LOADED", 2)
+    yield service
+    await service.shutdown()
+
+
+@pytest.mark.asyncio
+class TestNamespaceService:
+    """Test per-tenant index loading and eviction"""
+
+    async def test_service_initialization(self, initialized_services):
+        """Test that namespace service initializes correctly"""
+        assert registry.namespace_service.initialized
+
+    async def test_isolation(self, namespaces):
+        """Test namespaces have separate indexes"""
+        async with namespaces.lease("tenant-a") as index:
+            await index.add(get_test_documents())
+        async with namespaces.lease("tenant-b") as index:
+            assert index.embeddings.count() == 0
+            assert index is not registry.embeddings_service
+
+        async with namespaces.lease("tenant-a") as index:
+            results = await index.search("natural language processing", limit=1)
+            assert results[0]["id"] == "doc2"
+
+        with pytest.raises(ValueError, match="Invalid namespace"):
+            async with namespaces.lease("../escape"):
+                pass
+
+    async def test_shared_models(self, namespaces):
+        """Test namespace indexes share the global vector model cache"""
+        models = registry.embeddings_service.models
+        for namespace in ("tenant-a", "tenant-b"):
+            async with namespaces.lease(namespace) as index:
+                assert index.models is models
+                assert all(shard.models is models for shard in index._shards())
+
+    async def test_lru_eviction_and_reload(self, namespaces, tmp_path):
+        """Test cold namespaces are saved, unloaded and reloaded on demand"""
+        async with namespaces.lease("tenant-a") as index:
+            await index.add(get_test_documents())
+        async with namespaces.lease("tenant-b"):
+            pass
+        async with namespaces.lease("tenant-c"):
+            pass
+
+        metrics = namespaces.get_metrics()
+        assert metrics["loaded"] == ["tenant-b", "tenant-c"]
+        assert metrics["evictions"] == 1
+        assert (tmp_path / "tenant-a").is_dir()
+
+        async with namespaces.lease("tenant-a") as index:
+            assert index.embeddings.count() == 3
+            results = await index.search("natural language processing", limit=1)
+            assert results[0]["id"] == "doc2"
+
+        metrics = namespaces.get_metrics()
+        assert metrics["loads"] >= 4
+        assert metrics["max_load_seconds"] > 0
+
+    async def test_leased_namespace_not_evicted(self, namespaces):
+        """Test namespaces serving a request stay loaded"""
+        async with namespaces.lease("tenant-a"):
+            async with namespaces.lease("tenant-b"):
+                async with namespaces.lease("tenant-c"):
+                    assert len(namespaces.get_metrics()["loaded"]) == 3
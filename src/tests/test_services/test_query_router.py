@@ -0,0 +1,81 @@
+import pytest
+from txtai.embeddings import Embeddings
+from src.services import registry
+from src.services.query_router import QueryRouter, path_search
+from ..fixtures.test_docs import get_test_documents
+
+
+@pytest.fixture
+def embeddings(initialized_services):
+    """Hybrid index over the test documents"""
+    embeddings = Embeddings(registry.config_service.embeddings_config)
+    embeddings.index([(doc["id"], doc["text"], "{}") for doc in get_test_documents()])
+    yield embeddings
+    embeddings.close()
+
+
+def test_route():
+    """Test queries are classified by length and token shape"""
+    router = QueryRouter(sparse_max_tokens=2, dense_min_tokens=8)
+
+    assert router.route("NLP") == "sparse"
+    assert router.route("error code E1234 in parser") == "sparse"
+    assert router.route("docs for src/services/chunker.py please") == "sparse"
+    assert router.route("how does machine learning work") == "hybrid"
+    assert router.route("how does machine learning help computers understand human language") == (
+        "dense"
+    )
+
+
+def test_route_rules():
+    """Test configured rules take precedence"""
+    router = QueryRouter(rules=[{"pattern": r"^what\b", "path": "dense"}])
+    assert router.route("what is NLP") == "dense"
+    assert router.route("NLP") == "sparse"
+
+    with pytest.raises(ValueError, match="Unknown search path"):
+        QueryRouter(rules=[{"pattern": "x", "path": "graph"}])
+
+
+def test_sparse_path(embeddings, monkeypatch):
+    """Test sparse searches don't encode the query"""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("query was encoded")
+
+    monkeypatch.setattr(embeddings, "batchtransform", fail)
+    results = path_search(
+        embeddings, "SELECT id, score FROM txtai WHERE similar('NLP')", path="sparse"
+    )
+    assert [r["id"] for r in results] == ["doc2"]
+
+
+def test_dense_path(embeddings, monkeypatch):
+    """Test dense searches skip keyword scoring"""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("query was keyword scored")
+
+    monkeypatch.setattr(embeddings.scoring, "batchsearch", fail)
+    results = path_search(embeddings, "machine learning", 3, path="dense")
+    assert len(results) == 3
+
+
+@pytest.mark.asyncio
+async def test_routed_search(initialized_services, monkeypatch):
+    """Test the service routes queries and records per-path latency"""
+    service = registry.embeddings_service
+    monkeypatch.setattr(service.settings, "EMBEDDINGS_ROUTER_ENABLED", True)
+    await service.add(get_test_documents())
+
+    results = await service.search("NLP")
+    assert [r["id"] for r in results] == ["doc2"]
+
+    await service.search("how does artificial intelligence process data", path="dense")
+    metrics = service.get_metrics()["query_paths"]
+    assert metrics["sparse"]["queries"] >= 1
+    assert metrics["dense"]["queries"] >= 1
+    assert metrics["sparse"]["p50_ms"] > 0
+
+    with pytest.raises(ValueError, match="Unknown search path"):
+        await service.search("NLP", path="graph")
@@ -1,6 +1,9 @@
+import threading
+import time
 import pytest
 import logging
 from src.services import registry
+from src.services.rate_limiter import Priority
 
 logger = logging.getLogger(__name__)
 
@@ -62,3 +65,149 @@ class TestRAGService:
         results = await registry.rag_service.search_context(query, limit=3)
         assert len(results) > 0
         assert any(query.lower() in r["text"].lower() or "ai" in r["text"].lower() for r in results)
+
+    async def test_context_token_budget(self, initialized_services, monkeypatch):
+        """Test that packed context stays within the token budget"""
+        long_text = " ".join(f"Machine learning fact number {i}." for i in range(500))
+        results = [{"id": "long", "text": long_text, "score": 0.9}]
+
+        async def fake_search_context(query, limit=3):
+            return results
+
+        monkeypatch.setattr(registry.rag_service, "search_context", fake_search_context)
+        monkeypatch.setattr(registry.rag_service.settings, "RAG_CONTEXT_MAX_TOKENS", 100)
+
+        context = await registry.rag_service.build_context("machine learning")
+        assert 0 < context["tokens"] <= 100
+        assert registry.llm_service.count_tokens(context["context"]) <= 100
+        assert context["documents"] == ["long"]
+
+    async def test_context_untruncatable_passage(self, initialized_services, monkeypatch):
+        """Test a passage that truncates to nothing is dropped rather than credited"""
+        results = [
+            {"id": "a", "text": "Machine learning is a subset of AI.", "score": 0.9},
+            {"id": "word", "text": "x" * 4000, "score": 0.8},
+        ]
+
+        async def fake_search_context(query, limit=3):
+            return results
+
+        monkeypatch.setattr(registry.rag_service, "search_context", fake_search_context)
+        monkeypatch.setattr(registry.rag_service.settings, "RAG_CONTEXT_MAX_TOKENS", 100)
+
+        context = await registry.rag_service.build_context("machine learning")
+        assert context["documents"] == ["a"]
+        assert context["dropped"] == 1
+        assert not context["context"].endswith("\n\n")
+
+    async def test_context_deduplication(self, initialized_services, monkeypatch):
+        """Test that near-duplicate passages are dropped from context"""
+        text = "Machine learning is a subset of artificial intelligence."
+        results = [
+            {"id": "a", "text": text, "score": 0.9},
+            {"id": "b", "text": text + " ", "score": 0.8},
+            {"id": "c", "text": "Paris is the capital of France.", "score": 0.7},
+        ]
+
+        async def fake_search_context(query, limit=3):
+            return results
+
+        monkeypatch.setattr(registry.rag_service, "search_context", fake_search_context)
+
+        context = await registry.rag_service.build_context("machine learning")
+        assert context["documents"] == ["a", "c"]
+        assert context["dropped"] == 1
+
+    async def test_rerank(self, initialized_services, setup_test_data, monkeypatch):
+        """Test candidates are reranked and only the top results are kept"""
+        calls = []
+
+        def reranker(query, texts):
+            calls.append(texts)
+            # Prefer shorter passages
+            return sorted(enumerate(-len(t) for t in texts), key=lambda x: x[1], reverse=True)
+
+        monkeypatch.setattr(registry.rag_service, "reranker", reranker)
+        monkeypatch.setattr(registry.rag_service.settings, "RAG_RERANK_CANDIDATES", 10)
+
+        results = await registry.rag_service.search_context("machine learning", limit=2)
+        assert len(calls[0]) > 2
+        assert len(results) == 2
+        assert results[0]["text"] == min(calls[0], key=len)
+        assert all("retrieval_score" in r for r in results)
+        assert registry.rag_service.get_metrics()["reranks"] >= 1
+
+    async def test_rerank_budget_fallback(self, initialized_services, setup_test_data, monkeypatch):
+        """Test first-stage order is used when reranking exceeds its budget"""
+
+        def reranker(query, texts):
+            time.sleep(0.2)
+            return [(i, 1.0) for i in reversed(range(len(texts)))]
+
+        monkeypatch.setattr(registry.rag_service, "reranker", reranker)
+        fallbacks = registry.rag_service.get_metrics()["rerank_fallbacks"]
+
+        expected = await registry.rag_service.search_context("machine learning", rerank=False)
+        results = await registry.rag_service.search_context("machine learning", budget_ms=10)
+        assert [r["id"] for r in results] == [r["id"] for r in expected]
+        assert registry.rag_service.get_metrics()["rerank_fallbacks"] == fallbacks + 1
+
+    async def test_rerank_workers_busy(self, initialized_services, setup_test_data, monkeypatch):
+        """Test reranking is skipped while overrunning reranks still hold every worker"""
+        release = threading.Event()
+        calls = []
+
+        def reranker(query, texts):
+            calls.append(query)
+            release.wait(5)
+            return [(i, 1.0) for i in range(len(texts))]
+
+        service = registry.rag_service
+        monkeypatch.setattr(service, "reranker", reranker)
+        monkeypatch.setattr(service, "_rerank_slots", threading.BoundedSemaphore(1))
+        skips = service.get_metrics()["rerank_skips"]
+        try:
+            await service.search_context("machine learning", budget_ms=10)
+            await service.search_context("neural networks", budget_ms=10)
+            assert calls == ["machine learning"]
+            assert service.get_metrics()["rerank_skips"] == skips + 1
+        finally:
+            release.set()
+
+        # The worker is freed once the abandoned rerank finishes
+        for _ in range(100):
+            if service._rerank_slots.acquire(blocking=False):
+                service._rerank_slots.release()
+                break
+            time.sleep(0.01)
+        await service.search_context("deep learning", budget_ms=1000)
+        assert calls == ["machine learning", "deep learning"]
+
+    async def test_rerank_requires_model(self, initialized_services):
+        """Test requesting a rerank without a rerank model fails"""
+        with pytest.raises(ValueError, match="No rerank model"):
+            await registry.rag_service.search_context("machine learning", rerank=True)
+
+    async def test_generate_batch(self, initialized_services, monkeypatch):
+        """Test batch generation runs every query at batch priority"""
+        priorities = []
+
+        async def fake_get_context(query, limit=3):
+            return f"Context for {query}"
+
+        async def fake_generate_with_context(query, context, priority=Priority.INTERACTIVE):
+            priorities.append(priority)
+            return f"Answer to {query}"
+
+        service = registry.rag_service
+        monkeypatch.setattr(service, "get_context", fake_get_context)
+        monkeypatch.setattr(
+            service.llm_service, "generate_with_context", fake_generate_with_context
+        )
+
+        responses = await service.generate_batch(["first", "second"])
+        assert responses == ["Answer to first", "Answer to second"]
+        assert priorities == [Priority.BATCH, Priority.BATCH]
+
+        await service.generate("interactive")
+        assert priorities[-1] == Priority.INTERACTIVE
@@ -0,0 +1,44 @@
+import pytest
+import asyncio
+import logging
+from src.services.rate_limiter import Priority, RateLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    """Test client-side LLM rate limiting"""
+
+    async def test_token_bucket(self):
+        """Test token bucket consumption and refill estimate"""
+        bucket = TokenBucket(per_minute=60)
+        assert bucket.wait_time(60) == 0
+        bucket.consume(60)
+        assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+
+        bucket.drain()
+        assert bucket.tokens <= 0
+
+    async def test_oversized_request_is_clamped(self):
+        """Test that a request larger than the bucket does not wait forever"""
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100)
+        await asyncio.wait_for(limiter.acquire(1000), timeout=1)
+
+    async def test_priority_ordering(self):
+        """Test that interactive requests overtake queued batch requests"""
+        limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=100000)
+        limiter.requests.drain()
+        order = []
+
+        async def request(name, priority):
+            await limiter.acquire(1, priority)
+            order.append(name)
+
+        batch = asyncio.create_task(request("batch", Priority.BATCH))
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(request("interactive", Priority.INTERACTIVE))
+        await asyncio.wait_for(asyncio.gather(batch, interactive), timeout=2)
+
+        assert order == ["interactive", "batch"]
+        assert limiter.queued == 0
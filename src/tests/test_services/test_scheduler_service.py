@@ -0,0 +1,100 @@
+import pytest
+import asyncio
+import logging
+from src.services import registry
+from src.models.messages import Message, MessageType
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.asyncio
+class TestSchedulerService:
+    """Test concurrent message scheduling"""
+
+    async def test_service_initialization(self, initialized_services):
+        """Test that scheduler service initializes correctly"""
+        assert registry.scheduler_service.initialized
+        assert registry.communication_service.initialized
+
+    async def test_ordering_and_concurrency(self, initialized_services, monkeypatch):
+        """Test per-session ordering with cross-session concurrency"""
+        handled = []
+        running = 0
+        peak = 0
+
+        async def fake_handle_message(message):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            handled.append((message.session_id, message.data["index"]))
+            running -= 1
+            yield Message(
+                type=MessageType.RAG_RESPONSE, data=message.data, session_id=message.session_id
+            )
+
+        monkeypatch.setattr(
+            registry.scheduler_service.communication_service,
+            "handle_message",
+            fake_handle_message,
+        )
+
+        async def collect(session_id, index):
+            message = Message(
+                type=MessageType.RAG_REQUEST, data={"index": index}, session_id=session_id
+            )
+            return [r async for r in registry.scheduler_service.dispatch(message)]
+
+        results = await asyncio.gather(
+            *[collect(session_id, i) for i in range(3) for session_id in ("s1", "s2")]
+        )
+
+        assert all(len(r) == 1 for r in results)
+        assert [i for s, i in handled if s == "s1"] == [0, 1, 2]
+        assert [i for s, i in handled if s == "s2"] == [0, 1, 2]
+        assert peak == 2  # One worker per session at a time
+
+        metrics = registry.scheduler_service.get_metrics()
+        assert metrics["workers"] == registry.scheduler_service.settings.SCHEDULER_MAX_WORKERS
+        assert metrics["processed_messages"] >= 6
+        assert metrics["max_wait_seconds"] > 0
+
+    async def test_abandoned_messages(self, initialized_services, monkeypatch):
+        """Test a handler is cancelled when its consumer leaves and skipped if still queued"""
+        scheduler = registry.scheduler_service
+        started, cancelled = [], []
+
+        async def fake_handle_message(message):
+            started.append(message.data["index"])
+            yield Message(type=MessageType.RAG_RESPONSE, data={}, session_id=message.session_id)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(message.data["index"])
+                raise
+
+        monkeypatch.setattr(scheduler.communication_service, "handle_message", fake_handle_message)
+        abandoned = scheduler.get_metrics()["abandoned_messages"]
+
+        def message(index):
+            return Message(type=MessageType.RAG_REQUEST, data={"index": index}, session_id="gone")
+
+        # The second message queues behind the first in the same session
+        first = scheduler.dispatch(message(0))
+        second = scheduler.dispatch(message(1))
+        await first.__anext__()
+        pending = asyncio.ensure_future(second.__anext__())
+        await asyncio.sleep(0)
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        await second.aclose()
+        await first.aclose()
+
+        for _ in range(100):
+            if scheduler.get_metrics()["abandoned_messages"] == abandoned + 2:
+                break
+            await asyncio.sleep(0.01)
+        assert started == [0]
+        assert cancelled == [0]
+        assert scheduler.get_metrics()["abandoned_messages"] == abandoned + 2
+        assert "gone" not in scheduler._pending
@@ -0,0 +1,98 @@
+import copy
+import pytest
+from txtai.embeddings import Embeddings
+from src.services import registry
+from src.services.query_router import path_search
+from src.services.sharding import ShardedEmbeddings, shard_key
+from ..fixtures.test_docs import get_test_documents
+
+
+@pytest.fixture
+def sharded(initialized_services):
+    """Three shards built from the service embeddings config"""
+    config = registry.config_service.embeddings_config
+    embeddings = ShardedEmbeddings(lambda: Embeddings(config), 3)
+    embeddings.index([(doc["id"], doc["text"], "{}") for doc in get_test_documents()])
+    yield embeddings
+    embeddings.close()
+
+
+def test_shard_key():
+    """Test passages are partitioned with their parent document"""
+    assert shard_key("doc1#3") == shard_key("doc1") == "doc1"
+
+
+def test_routing(sharded):
+    """Test rows are stored on their owning shard only"""
+    for doc in get_test_documents():
+        owner = sharded.owner(doc["id"])
+        for shard in sharded.shards:
+            found = shard.search(f"SELECT id FROM txtai WHERE id = '{doc['id']}'")
+            assert bool(found) == (shard is owner)
+
+    assert sharded.owner("doc1#0") is sharded.owner("doc1")
+    assert sharded.count() == 3
+
+
+def test_scatter_gather(sharded):
+    """Test merged results match a single unsharded index"""
+    single = Embeddings(registry.config_service.embeddings_config)
+    single.index([(doc["id"], doc["text"], "{}") for doc in get_test_documents()])
+
+    merged = sharded.search("SELECT id, score FROM txtai WHERE similar('machine learning')")
+    expected = single.search("SELECT id, score FROM txtai WHERE similar('machine learning')")
+    assert merged[0]["id"] == expected[0]["id"]
+    assert [r["score"] for r in merged] == sorted((r["score"] for r in merged), reverse=True)
+
+    assert sharded.search("SELECT COUNT(*) AS count FROM txtai") == [{"count": 3}]
+    listing = sharded.search("SELECT id FROM txtai ORDER BY id LIMIT 2")
+    assert [r["id"] for r in listing] == ["doc1", "doc2"]
+
+
+def test_upsert_and_delete(sharded):
+    """Test writes are routed to the owning shard"""
+    owner = sharded.owner("doc4")
+    before = owner.count()
+    sharded.upsert([("doc4", "Vector search finds similar text.", "{}")])
+    assert owner.count() == before + 1
+    assert sharded.count() == 4
+
+    assert set(sharded.delete(["doc1", "doc4", "missing"])) == {"doc1", "doc4"}
+    assert sharded.count() == 2
+
+
+def test_shared_model_and_query_vector(initialized_services):
+    """Test shards share one models cache and a query is encoded once for all shards"""
+    config = registry.config_service.embeddings_config
+    models = {}
+    sharded = ShardedEmbeddings(lambda: Embeddings(copy.deepcopy(config), models=models), 3)
+    sharded.index([(doc["id"], doc["text"], "{}") for doc in get_test_documents()])
+    assert all(shard.models is models for shard in sharded.shards)
+
+    encoded = []
+    for shard in sharded.shards:
+        encode = shard.model.encode
+
+        def counted(data, category=None, encode=encode):
+            encoded.append(list(data))
+            return encode(data, category)
+
+        shard.model.encode = counted
+
+    single = Embeddings(copy.deepcopy(config))
+    single.index([(doc["id"], doc["text"], "{}") for doc in get_test_documents()])
+    query = "SELECT id, score FROM txtai WHERE similar(:query)"
+    expected = path_search(single, query, path="dense", parameters={"query": "machine learning"})
+
+    # Dense scores don't depend on how rows are partitioned, unlike BM25 scores
+    results = sharded.search(query, path="dense", parameters={"query": "machine learning"})
+    assert len(encoded) == 1
+    assert [r["id"] for r in results] == [r["id"] for r in expected]
+    assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected])
+
+    sharded.search("SELECT id FROM txtai WHERE similar('learning machines')")
+    sharded.search("machine learning")
+    assert len(encoded) == 3
+    assert not sharded._queries
+    sharded.close()
+    single.close()
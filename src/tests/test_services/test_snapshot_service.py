@@ -0,0 +1,117 @@
+import os
+import pytest
+from src.services import registry
+from src.services.embeddings_service import EmbeddingsService
+from src.services.snapshot_store import LocalSnapshotStore
+from ..fixtures.test_docs import get_test_documents
+
+
+@pytest.fixture
+def snapshots(initialized_services, tmp_path, monkeypatch):
+    """Snapshot service writing to a local store in a temporary directory"""
+    service = registry.snapshot_service
+    monkeypatch.setattr(service, "store", LocalSnapshotStore(str(tmp_path / "store")))
+    monkeypatch.setattr(service.settings, "SNAPSHOT_WORKDIR", str(tmp_path / "primary"))
+    monkeypatch.setattr(service.settings, "SNAPSHOT_CHUNK_SIZE", 4096)
+    return service
+
+
+@pytest.mark.asyncio
+class TestSnapshotService:
+    """Test incremental snapshots and restores"""
+
+    async def test_service_initialization(self, initialized_services):
+        """Test that snapshot service initializes correctly"""
+        assert registry.snapshot_service.initialized
+        assert registry.snapshot_service.store is not None
+
+    async def test_incremental_snapshot(self, snapshots):
+        """Test only changed chunks are uploaded"""
+        await registry.embeddings_service.add(get_test_documents())
+
+        first = await snapshots.snapshot(registry.embeddings_service, "test")
+        assert first["uploaded"] == first["chunks"] > 0
+
+        # Only config.json changes, as txtai records the save time in it
+        unchanged = await snapshots.snapshot(registry.embeddings_service, "test")
+        assert unchanged["uploaded"] <= 1
+
+        await registry.embeddings_service.upsert(
+            [{"id": "doc4", "text": "Vector search finds similar text.", "metadata": {}}]
+        )
+        changed = await snapshots.snapshot(registry.embeddings_service, "test")
+        assert 0 < changed["uploaded"] < changed["chunks"]
+
+    async def test_restore(self, snapshots, tmp_path, monkeypatch):
+        """Test a cold restore downloads everything and a warm restore nothing"""
+        await registry.embeddings_service.add(get_test_documents())
+        await snapshots.snapshot(registry.embeddings_service, "test")
+
+        monkeypatch.setattr(snapshots.settings, "SNAPSHOT_WORKDIR", str(tmp_path / "replica"))
+        replica = EmbeddingsService()
+        await replica.initialize()
+
+        cold = await snapshots.restore(replica, "test")
+        assert cold["downloaded"] > 0
+        assert replica.embeddings.count() == 3
+        results = await replica.search("natural language processing", limit=1)
+        assert results[0]["id"] == "doc2"
+
+        warm = await snapshots.restore(replica, "test")
+        assert warm["downloaded"] == 0
+        assert replica.embeddings.count() == 3
+
+        with pytest.raises(ValueError, match="Snapshot not found"):
+            await snapshots.restore(replica, "missing")
+
+    async def test_restore_verifies_checksums(self, snapshots, tmp_path, monkeypatch):
+        """Test corrupted chunks are rejected"""
+        await registry.embeddings_service.add(get_test_documents())
+        await snapshots.snapshot(registry.embeddings_service, "test")
+
+        chunks = tmp_path / "store" / "chunks"
+        corrupted = chunks / sorted(os.listdir(chunks))[0]
+        corrupted.write_bytes(b"corrupted")
+
+        monkeypatch.setattr(snapshots.settings, "SNAPSHOT_WORKDIR", str(tmp_path / "replica"))
+        replica = EmbeddingsService()
+        await replica.initialize()
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            await snapshots.restore(replica, "test")
+
+    async def test_namespaces_isolated(self, snapshots, tmp_path):
+        """Test snapshots with the same name in different namespaces don't collide"""
+        await registry.embeddings_service.add(get_test_documents())
+        await snapshots.snapshot(registry.embeddings_service, "test")
+
+        tenant = EmbeddingsService()
+        await tenant.initialize()
+        await tenant.add(get_test_documents()[:1])
+        await snapshots.snapshot(tenant, "test", "tenant")
+        assert (tmp_path / "store" / "manifests" / "default" / "test.json").exists()
+        assert (tmp_path / "store" / "manifests" / "namespaces" / "tenant" / "test.json").exists()
+
+        await snapshots.restore(tenant, "test", "tenant")
+        assert tenant.embeddings.count() == 1
+        with pytest.raises(ValueError, match="Snapshot not found"):
+            await snapshots.restore(tenant, "test", "other")
+        with pytest.raises(ValueError, match="Invalid namespace"):
+            await snapshots.restore(tenant, "test", "../default")
+
+    async def test_snapshot_keeps_index_state(self, snapshots, tmp_path):
+        """Test a snapshot leaves the index modified and writing to its own database"""
+        service = registry.embeddings_service
+        await service.add(get_test_documents())
+        await snapshots.snapshot(service, "test")
+        assert service.modified
+
+        database = service._shards()[0].database
+        assert not database.path
+        await service.upsert(
+            [{"id": "doc4", "text": "Vector search finds similar text.", "metadata": {}}]
+        )
+        saved = EmbeddingsService()
+        await saved.initialize()
+        saved.load(snapshots._workdir("default/test"))
+        assert saved.embeddings.count() == 3
+        assert service.embeddings.count() == 4
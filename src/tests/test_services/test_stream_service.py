@@ -0,0 +1,80 @@
+import pytest
+import logging
+from src.services import registry
+from src.services.stream_service import StreamFullError
+from src.models.messages import Message, MessageType
+
+logger = logging.getLogger(__name__)
+
+
+def make_message(session_id: str, index: int) -> Message:
+    """Create a numbered test message"""
+    return Message(type=MessageType.RAG_RESPONSE, data={"index": index}, session_id=session_id)
+
+
+@pytest.mark.asyncio
+class TestStreamService:
+    """Test stream queue limits and idle eviction"""
+
+    async def test_drop_oldest_policy(self, initialized_services, monkeypatch):
+        """Test that a full stream drops its oldest message"""
+        settings = registry.stream_service.settings
+        monkeypatch.setattr(settings, "STREAM_QUEUE_MAXSIZE", 2)
+        monkeypatch.setattr(settings, "STREAM_OVERFLOW_POLICY", "drop_oldest")
+
+        for i in range(3):
+            await registry.stream_service.send_message(make_message("drop-session", i))
+
+        queue = registry.stream_service._streams["drop-session"]
+        assert queue.qsize() == 2
+        assert queue.get_nowait().data["index"] == 1
+        assert registry.stream_service.get_metrics()["dropped_messages"] >= 1
+        await registry.stream_service.delete_stream("drop-session")
+
+    async def test_error_policy(self, initialized_services, monkeypatch):
+        """Test that a full stream raises with the error policy"""
+        settings = registry.stream_service.settings
+        monkeypatch.setattr(settings, "STREAM_QUEUE_MAXSIZE", 1)
+        monkeypatch.setattr(settings, "STREAM_OVERFLOW_POLICY", "error")
+
+        await registry.stream_service.send_message(make_message("error-session", 0))
+        with pytest.raises(StreamFullError) as error:
+            await registry.stream_service.send_message(make_message("error-session", 1))
+        assert error.value.session_id == "error-session"
+        await registry.stream_service.delete_stream("error-session")
+
+    async def test_idle_eviction(self, initialized_services, monkeypatch):
+        """Test that idle streams are evicted and gauges update"""
+        monkeypatch.setattr(registry.stream_service.settings, "STREAM_IDLE_TTL", 0.0)
+
+        await registry.stream_service.send_message(make_message("idle-session", 0))
+        assert registry.stream_service.get_metrics()["queued_messages"] >= 1
+
+        evicted = await registry.stream_service.evict_idle_streams()
+        assert evicted >= 1
+        assert "idle-session" not in registry.stream_service._streams
+        assert "idle-session" not in registry.stream_service._last_active
+
+    async def test_rag_request_retrieves_once(self, initialized_services, monkeypatch):
+        """Test a streamed RAG request answers from the context it sends the client"""
+        searches, contexts = [], []
+
+        async def fake_search_context(query, limit=3):
+            searches.append(query)
+            return [{"id": "a", "text": f"Context {len(searches)}", "score": 0.9}]
+
+        async def fake_generate_with_context(query, context, priority=None):
+            contexts.append(context)
+            return "Answer"
+
+        rag = registry.stream_service.rag_service
+        monkeypatch.setattr(rag, "search_context", fake_search_context)
+        monkeypatch.setattr(rag.llm_service, "generate_with_context", fake_generate_with_context)
+
+        request = Message(type=MessageType.RAG_REQUEST, data={"query": "q"}, session_id="rag")
+        messages = [m async for m in registry.stream_service.process_rag_request(request)]
+
+        assert [m.type for m in messages] == [MessageType.RAG_CONTEXT, MessageType.RAG_RESPONSE]
+        assert searches == ["q"]
+        assert contexts == [messages[0].data["context"]]
+        assert messages[1].data["response"] == "Answer"
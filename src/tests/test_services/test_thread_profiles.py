@@ -0,0 +1,53 @@
+import pytest
+from src.services import registry
+from src.services.thread_profiles import apply_threads, resolve_threads
+
+
+@pytest.fixture
+def settings(initialized_services, monkeypatch):
+    """Settings with no explicit thread counts"""
+    settings = registry.config_service.settings
+    monkeypatch.setattr(settings, "EMBEDDINGS_INTRA_OP_THREADS", None)
+    monkeypatch.setattr(settings, "EMBEDDINGS_INTER_OP_THREADS", None)
+    monkeypatch.setattr(settings, "EMBEDDINGS_FAISS_THREADS", None)
+    return settings
+
+
+def test_profiles(settings, monkeypatch):
+    """Test each profile's thread counts"""
+    monkeypatch.setattr(settings, "EMBEDDINGS_THREAD_PROFILE", "default")
+    assert resolve_threads(settings, 8) == {"intra_op": None, "inter_op": None, "faiss": None}
+
+    monkeypatch.setattr(settings, "EMBEDDINGS_THREAD_PROFILE", "latency")
+    assert resolve_threads(settings, 8) == {"intra_op": 8, "inter_op": 1, "faiss": 8}
+
+    monkeypatch.setattr(settings, "EMBEDDINGS_THREAD_PROFILE", "throughput")
+    assert resolve_threads(settings, 8) == {"intra_op": 1, "inter_op": 1, "faiss": 1}
+
+
+def test_overrides(settings, monkeypatch):
+    """Test explicit thread counts override the profile"""
+    monkeypatch.setattr(settings, "EMBEDDINGS_THREAD_PROFILE", "throughput")
+    monkeypatch.setattr(settings, "EMBEDDINGS_FAISS_THREADS", 4)
+    assert resolve_threads(settings, 8) == {"intra_op": 1, "inter_op": 1, "faiss": 4}
+
+
+def test_apply_threads():
+    """Test thread counts are applied to torch and Faiss"""
+    torch = pytest.importorskip("torch")
+    faiss = pytest.importorskip("faiss")
+    intra, omp = torch.get_num_threads(), faiss.omp_get_max_threads()
+    try:
+        applied = apply_threads(intra_op=2, faiss=2)
+        assert applied["intra_op"] == torch.get_num_threads() == 2
+        assert applied["faiss"] == faiss.omp_get_max_threads() == 2
+        assert applied["inter_op"] == torch.get_num_interop_threads()
+    finally:
+        apply_threads(intra_op=intra, faiss=omp)
+
+
+@pytest.mark.asyncio
+async def test_service_threads(initialized_services):
+    """Test the applied thread counts are reported in metrics"""
+    threads = registry.embeddings_service.get_metrics()["threads"]
+    assert set(threads) == {"intra_op", "inter_op", "faiss"}
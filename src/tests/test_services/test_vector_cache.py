@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from src.services.vector_cache import CachedEmbeddings, VectorCache
+
+
+@pytest.fixture
+def cache():
+    """In-memory vector cache"""
+    return VectorCache(":memory:", max_entries=2)
+
+
+def test_cache_roundtrip(cache):
+    """Test vectors are returned for cached keys only"""
+    vector = np.arange(4, dtype=np.float32)
+    cache.put("model", {"a": vector})
+
+    found = cache.get("model", ["a", "b"])
+    assert list(found) == ["a"]
+    np.testing.assert_array_equal(found["a"], vector)
+    assert cache.get("other-model", ["a"]) == {}
+
+    metrics = cache.get_metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 2
+
+
+def test_cache_eviction(cache):
+    """Test least recently used entries are evicted over the size limit"""
+    vector = np.zeros(4, dtype=np.float32)
+    cache.put("model", {"a": vector})
+    cache.put("model", {"b": vector})
+    cache.get("model", ["a"])
+    cache.put("model", {"c": vector})
+
+    assert set(cache.get("model", ["a", "b", "c"])) == {"a", "c"}
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_key_includes_category():
+    """Test that query and data encodings are cached separately"""
+    assert VectorCache.key("text", "query") != VectorCache.key("text", "data")
+
+
+def test_lookups_deferred(cache):
+    """Test hits don't write to SQLite and replaced keys aren't counted twice"""
+    vector = np.zeros(4, dtype=np.float32)
+    cache.put("model", {"a": vector})
+    cache.put("model", {"a": vector})
+    assert cache.get_metrics()["entries"] == 1
+
+    changes = cache.connection.total_changes
+    cache.get("model", ["a"])
+    assert cache.connection.total_changes == changes
+
+
+def test_only_data_cached():
+    """Test query encodes go straight to the model and document encodes are cached"""
+    cache = VectorCache(":memory:", max_entries=10)
+    embeddings = CachedEmbeddings(
+        {"method": "external", "transform": lambda texts: np.ones((len(texts), 4))}, cache
+    )
+    embeddings.index([("a", "document text", None)])
+    embeddings.batchtransform([(None, "a query", None)], "query")
+    embeddings.batchtransform([(None, "document text", None)], "data")
+
+    assert cache.get_metrics()["entries"] == 1
+    assert cache.get_metrics()["hits"] == 1